@@ -62,6 +62,13 @@ setup(
     keywords=['twisted', 'rest', 'json', 'resource', 'api'],
     install_requires=['twisted'],
     packages=['txrest'],
+    entry_points={
+        'console_scripts': [
+            'txrest = txrest.runner:main',
+            'txrest-bench = txrest.bench:main',
+            'txrest-load = txrest.load:main',
+        ],
+    },
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
@@ -0,0 +1,97 @@
+"""
+Render resources with in-memory requests.
+"""
+from io import BytesIO
+
+from twisted.internet.defer import Deferred
+from twisted.web import server
+from twisted.web.http import parse_qs
+from twisted.web.resource import getChildForRequest
+from twisted.web.test.requesthelper import DummyChannel
+
+from txrest.json import JsonResource
+
+
+def make_request(uri, method=b'GET', headers=None, body=None, site=None):
+    """
+    Return a ``twisted.web.server.Request`` for ``uri`` that isn't rendered yet.
+
+    :param headers: (optional) a dictionary of request header name -> value
+    :param body: (optional) the bytes of the request body
+    :param site: (optional) the site of the request, a site that doesn't show
+                 tracebacks by default
+    """
+    channel = DummyChannel()
+    request = server.Request(channel, False)
+    request.method = method
+    request.uri = uri
+    request.path, _, query = uri.partition(b'?')
+    request.args = parse_qs(query, 1)
+    request.clientproto = b'HTTP/1.0'  # the body is written as is, never chunked
+    request.content = BytesIO(body or b'')
+    for name, value in (headers or {}).items():
+        request.requestHeaders.setRawHeaders(name, [value])
+    if body is not None:
+        request.requestHeaders.setRawHeaders(b'content-length', [str(len(body)).encode('ascii')])
+    request.site = site if site is not None else channel.site
+    request.sitepath = []
+    request.prepath = []
+    request.postpath = request.path[1:].split(b'/')
+    request.written = channel.transport.written  # the channel is gone once it's finished
+    request.producers = channel.transport.producers
+    return request
+
+
+def render(resrc, request):
+    """
+    Render ``request`` with the child of ``resrc`` it's addressed to.
+    """
+    request.render(getChildForRequest(resrc, request))
+    return request
+
+
+def drain(request):
+    """
+    Pull the chunks of the producer registered by ``request`` until it's finished.
+    """
+    while not request.finished and request.producers:
+        request.producers[-1][0].resumeProducing()
+    return request
+
+
+def response_body(request):
+    """
+    Return the body written to the client of ``request``
+    """
+    return request.written.getvalue().partition(b'\r\n\r\n')[2]
+
+
+class Counter(JsonResource):
+    """
+    Respond with the number of times the handler was called.
+    """
+    isLeaf = True
+
+    def __init__(self, *args, **kwargs):
+        JsonResource.__init__(self, *args, **kwargs)
+        self.calls = 0
+
+    def rest_GET(self, request):
+        self.calls += 1
+        return {'calls': self.calls}
+
+
+class Pending(JsonResource):
+    """
+    Return a Deferred the test fires, one per call.
+    """
+    isLeaf = True
+
+    def __init__(self, *args, **kwargs):
+        JsonResource.__init__(self, *args, **kwargs)
+        self.pending = []
+
+    def rest_GET(self, request):
+        d = Deferred()
+        self.pending.append(d)
+        return d
@@ -0,0 +1,121 @@
+"""
+Tests for ``txrest.accesslog`` and the access log of ``txrest.RestResource`` (``ACCESS_LOG``)
+"""
+import json
+
+from twisted.internet.error import ConnectionDone
+from twisted.python import failure
+from twisted.trial import unittest
+
+from txrest.accesslog import AccessLog, AccessRecord, JsonLinesWriter
+
+from tests.helpers import Counter, Pending, make_request, render
+
+
+class Stream(object):
+    """
+    A file-like object keeping what's written.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.flushes = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def flush(self):
+        self.flushes += 1
+
+    def lines(self):
+        return [json.loads(line) for line in ''.join(self.chunks).splitlines()]
+
+
+def record(path='/items', status=200):
+    return AccessRecord(1000.0, 'app.Items', 'GET', 'rest_GET', path, status, 12, 0.5, None)
+
+
+class JsonLinesWriterTests(unittest.TestCase):
+
+    def test_lines(self):
+        stream = Stream()
+        JsonLinesWriter(stream)([record(), record(status=404)])
+        lines = stream.lines()
+        self.assertEqual([line['status'] for line in lines], [200, 404])
+        self.assertEqual(lines[0]['method_called'], 'rest_GET')
+        self.assertEqual(stream.flushes, 1)
+
+    def test_invalid_utf8(self):
+        stream = Stream()
+        JsonLinesWriter(stream)([record(path=b'/caf\xe9')])
+        self.assertEqual(stream.lines()[0]['path'], u'/caf\ufffd')
+
+
+class AccessLogTests(unittest.TestCase):
+
+    def setUp(self):
+        self.records = []
+        # the writer thread only wakes up for a full batch, or when it's stopped
+        self.access = AccessLog(self.records.extend, capacity=3, batch_size=10, flush_interval=60)
+        self.addCleanup(self.access.stop)
+
+    def test_sampling(self):
+        access = AccessLog(self.records.extend, sample_rates={200: 0, '4xx': 0.0, 500: 1.0})
+        self.assertEqual(access.rate(200), 0)
+        self.assertEqual(access.rate(404), 0.0)
+        self.assertEqual(access.rate(500), 1.0)
+        self.assertEqual(access.rate(201), 1.0)
+
+    def test_flush(self):
+        batches = []
+        access = AccessLog(batches.append, batch_size=2)
+        for i in range(3):
+            access._buffer.append(record(path='/%i' % i))
+        access.flush()
+        self.assertEqual([[r.path for r in batch] for batch in batches], [['/0', '/1'], ['/2']])
+        self.assertEqual(access.written, 3)
+
+    def test_writer_error(self):
+        def broken(records):
+            raise IOError('disk full')
+
+        access = AccessLog(broken)
+        access._buffer.append(record())
+        access.flush()
+        self.assertEqual(access.failed, 1)
+        self.flushLoggedErrors(IOError)
+
+    def test_resource(self):
+        access = self.access
+
+        class Logged(Counter):
+            ACCESS_LOG = access
+
+        class Sampled(Counter):
+            ACCESS_LOG = AccessLog(self.records.extend, sample_rates={'2xx': 0})
+
+        for _ in range(4):
+            render(Logged(), make_request(b'/items?a=1'))
+        render(Sampled(), make_request(b'/'))
+        self.assertEqual((access.logged, access.dropped), (3, 1))
+        self.assertEqual(Sampled.ACCESS_LOG.sampled_out, 1)
+        access.stop()
+
+        self.assertEqual(len(self.records), 3)
+        logged = self.records[0]
+        self.assertEqual(logged.resource, __name__ + '.Logged')
+        self.assertEqual((logged.method, logged.method_called, logged.path, logged.status),
+                         ('GET', 'rest_GET', '/items', 200))
+        self.assertTrue(logged.bytes > 0)
+        self.assertIsNone(logged.disconnect)
+
+    def test_disconnect(self):
+        access = self.access
+
+        class Slow(Pending):
+            ACCESS_LOG = access
+
+        request = render(Slow(), make_request(b'/'))
+        request.connectionLost(failure.Failure(ConnectionDone()))
+        access.stop()
+        self.assertEqual(self.records[0].disconnect, 'ConnectionDone')
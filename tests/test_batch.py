@@ -0,0 +1,90 @@
+"""
+Tests for ``txrest.batch.BatchResource``
+"""
+import json
+
+from twisted.trial import unittest
+from twisted.web import resource
+from twisted.web.http import BAD_REQUEST, CREATED, OK, REQUEST_ENTITY_TOO_LARGE
+
+from txrest.batch import BatchResource
+from txrest.json import JsonResource
+
+from tests.helpers import make_request, render, response_body
+
+
+class Users(JsonResource):
+    isLeaf = True
+
+    def rest_GET(self, request):
+        return {'id': int(request.postpath[0]), 'user': request.getHeader(b'x-user')}
+
+    def rest_POST(self, request, post):
+        request.setResponseCode(CREATED)
+        request.setHeader(b'location', b'/users/2')
+        return post
+
+
+class Text(resource.Resource):
+    isLeaf = True
+
+    def __init__(self, charset):
+        resource.Resource.__init__(self)
+        self.charset = charset
+
+    def render_GET(self, request):
+        request.setHeader(b'content-type', b'text/plain; charset=' + self.charset)
+        return b'caf\xc3\xa9'
+
+
+class BatchResourceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.root = resource.Resource()
+        self.root.putChild(b'users', Users())
+        self.root.putChild(b'text', Text(b'utf-8'))
+        self.root.putChild(b'unknown', Text(b'klingon'))
+        self.batch = BatchResource(self.root)
+        self.root.putChild(b'batch', self.batch)
+
+    def post(self, subs):
+        body = json.dumps(subs).encode('utf-8')
+        request = render(self.root, make_request(b'/batch', b'POST', {
+            b'content-type': b'application/json', b'x-user': b'ben'}, body))
+        return request, json.loads(response_body(request))
+
+    def test_batch(self):
+        request, results = self.post([
+            {'path': '/users/1'},
+            {'method': 'POST', 'path': '/users', 'body': {'name': 'ben'}},
+            {'path': '/text'},
+        ])
+        self.assertEqual(request.code, OK)
+        self.assertEqual(results, [
+            {'status': OK, 'body': {'id': 1, 'user': 'ben'}},
+            {'status': CREATED, 'body': {'name': 'ben'}, 'headers': {'location': '/users/2'}},
+            {'status': OK, 'body': u'caf\xe9'},
+        ])
+
+    def test_sub_headers(self):
+        _, results = self.post([{'path': '/users/1', 'headers': {'X-User': 'amy'}}])
+        self.assertEqual(results[0]['body']['user'], 'amy')
+
+    def test_unknown_charset(self):
+        _, results = self.post([{'path': '/unknown'}, {'path': '/users/1'}])
+        self.assertEqual(results[0]['status'], BAD_REQUEST)
+        self.assertEqual(results[1]['status'], OK)
+
+    def test_nested(self):
+        _, results = self.post([{'method': 'POST', 'path': '/batch', 'body': []}])
+        self.assertEqual(results[0]['status'], BAD_REQUEST)
+
+    def test_invalid(self):
+        request, _ = self.post({'path': '/users/1'})
+        self.assertEqual(request.code, BAD_REQUEST)
+        request, _ = self.post([{'method': 'GET'}])
+        self.assertEqual(request.code, BAD_REQUEST)
+
+    def test_too_large(self):
+        request, _ = self.post([{'path': '/users/1'}] * (self.batch.MAX_REQUESTS + 1))
+        self.assertEqual(request.code, REQUEST_ENTITY_TOO_LARGE)
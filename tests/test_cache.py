@@ -0,0 +1,126 @@
+"""
+Tests for ``txrest.cache.ResponseCache`` and the response cache of ``txrest.RestResource``
+"""
+import json
+
+from twisted.trial import unittest
+from twisted.web.http import OK
+
+from txrest.cache import ResponseCache
+
+from tests.helpers import Counter, make_request, render, response_body
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = ResponseCache(max_bytes=10, ttl=5, clock=lambda: self.now)
+
+    def test_ttl(self):
+        self.cache.set(('r', '/a'), 'a', 1)
+        self.cache.set(('r', '/b'), 'b', 1, ttl=20)
+        self.now = 5
+        self.assertIsNone(self.cache.get(('r', '/a')))
+        self.assertEqual(self.cache.get(('r', '/b')), 'b')
+        self.assertEqual(self.cache.size, 1)
+
+    def test_lru(self):
+        self.cache.set(('r', '/a'), 'a', 4)
+        self.cache.set(('r', '/b'), 'b', 4)
+        self.cache.get(('r', '/a'))
+        self.cache.set(('r', '/c'), 'c', 4)
+        self.assertIsNone(self.cache.get(('r', '/b')))
+        self.assertEqual(self.cache.get(('r', '/a')), 'a')
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(self.cache.size, 8)
+
+    def test_too_large(self):
+        self.cache.set(('r', '/a'), 'a', 11)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate(self):
+        self.cache.set(('r', '/a'), 'a', 1)
+        self.cache.set(('r', '/b'), 'b', 1)
+        self.cache.set(('s', '/a'), 'c', 1)
+        self.cache.invalidate(path='/a')
+        self.assertEqual(len(self.cache), 1)
+        self.cache.invalidate(owner='r')
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.size, 0)
+
+
+class CachedResourceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        cache = ResponseCache(ttl=10, clock=lambda: self.now)
+
+        class Cached(Counter):
+            RESPONSE_CACHE = cache
+            CACHE_HEADERS = (b'accept-language',)
+
+        self.resource = Cached()
+
+    def get(self, uri=b'/', headers=None):
+        request = render(self.resource, make_request(uri, headers=headers))
+        self.assertEqual(request.code, OK)
+        return json.loads(response_body(request))
+
+    def test_hit(self):
+        self.assertEqual(self.get(), {'calls': 1})
+        self.assertEqual(self.get(), {'calls': 1})
+        self.assertEqual(self.resource.calls, 1)
+        self.assertEqual(self.resource.RESPONSE_CACHE.hits, 1)
+
+    def test_key(self):
+        self.get(b'/?a=1')
+        self.get(b'/?a=2')
+        self.get(b'/?a=1', {b'accept-language': b'fr'})
+        self.assertEqual(self.resource.calls, 3)
+
+    def test_expiry(self):
+        self.get()
+        self.now += 10
+        self.assertEqual(self.get(), {'calls': 2})
+
+    def test_invalidate(self):
+        self.get(b'/a')
+        self.get(b'/b')
+        self.resource.invalidate_cache(b'/a')
+        self.assertEqual(self.get(b'/a'), {'calls': 3})
+        self.assertEqual(self.get(b'/b'), {'calls': 2})
+        self.resource.invalidate_cache()
+        self.assertEqual(self.get(b'/b'), {'calls': 4})
+
+    def test_instances(self):
+        self.get(b'/a')
+        other = self.resource.__class__()
+        request = render(other, make_request(b'/a'))
+        self.assertEqual(json.loads(response_body(request)), {'calls': 1})
+        self.assertEqual(other.calls, 0)
+        other.invalidate_cache()
+        self.assertEqual(self.get(b'/a'), {'calls': 2})
+
+    def test_namespace(self):
+        self.get(b'/a')
+        other = self.resource.__class__()
+        other.CACHE_NAMESPACE = 'other'
+        request = render(other, make_request(b'/a'))
+        self.assertEqual(json.loads(response_body(request)), {'calls': 1})
+        self.assertEqual(other.calls, 1)
+        self.assertEqual(len(self.resource.RESPONSE_CACHE), 2)
+
+    def test_headers(self):
+        class Headers(self.resource.__class__):
+            def rest_GET(self, request):
+                request.setHeader(b'cache-control', b'max-age=60')
+                request.addCookie(b'session', b'1')
+                return Counter.rest_GET(self, request)
+
+        resrc = Headers()
+        render(resrc, make_request(b'/'))
+        request = render(resrc, make_request(b'/'))
+        self.assertEqual(resrc.calls, 1)
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'cache-control'), [b'max-age=60'])
+        self.assertFalse(request.cookies)
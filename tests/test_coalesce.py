@@ -0,0 +1,119 @@
+"""
+Tests for the request coalescing of ``txrest.RestResource`` (``COALESCE``)
+"""
+import json
+
+from twisted.internet import defer
+from twisted.internet.error import ConnectionDone
+from twisted.python import failure
+from twisted.trial import unittest
+from twisted.web.http import INTERNAL_SERVER_ERROR, OK
+
+from txrest.json import JsonResource
+
+from tests.helpers import Pending, make_request, render, response_body
+
+
+class CoalesceTests(unittest.TestCase):
+
+    def setUp(self):
+        class Coalesced(Pending):
+            COALESCE = True
+
+        self.resource = Coalesced()
+
+    def test_shared(self):
+        requests = [render(self.resource, make_request(b'/')) for _ in range(3)]
+        self.assertEqual(len(self.resource.pending), 1)
+        self.resource.pending[0].callback({'ok': True})
+        for request in requests:
+            self.assertEqual(request.code, OK)
+            self.assertEqual(json.loads(response_body(request)), {'ok': True})
+        self.assertEqual(self.resource._inflight, {})
+
+    def test_key(self):
+        render(self.resource, make_request(b'/?a=1'))
+        render(self.resource, make_request(b'/?a=2'))
+        self.assertEqual(len(self.resource.pending), 2)
+
+    def test_failure(self):
+        requests = [render(self.resource, make_request(b'/')) for _ in range(2)]
+        self.resource.pending[0].errback(ValueError('boom'))
+        for request in requests:
+            self.assertEqual(request.code, INTERNAL_SERVER_ERROR)
+        self.flushLoggedErrors(ValueError)
+
+    def test_leader_gone(self):
+        leader = render(self.resource, make_request(b'/'))
+        follower = render(self.resource, make_request(b'/'))
+        leader.connectionLost(failure.Failure(ConnectionDone()))
+        self.assertFalse(self.resource.pending[0].called)
+
+        self.resource.pending[0].callback({'ok': True})
+        self.assertEqual(follower.code, OK)
+        self.assertEqual(json.loads(response_body(follower)), {'ok': True})
+
+    def test_everyone_gone(self):
+        requests = [render(self.resource, make_request(b'/')) for _ in range(2)]
+        for request in requests:
+            request.connectionLost(failure.Failure(ConnectionDone()))
+        self.assertTrue(self.resource.pending[0].called)  # cancelled
+        render(self.resource, make_request(b'/'))
+        self.assertEqual(len(self.resource.pending), 2)
+
+
+class FiredCoalesceTests(unittest.TestCase):
+    """
+    Handlers whose Deferred has already fired when it's returned.
+    """
+
+    def assertResponds(self, resrc):
+        for _ in range(2):
+            request = render(resrc, make_request(b'/'))
+            self.assertEqual(request.finished, 1)
+            self.assertEqual(json.loads(response_body(request)), {'ok': True})
+        self.assertEqual(resrc._inflight, {})
+
+    def test_succeed(self):
+        class Fired(JsonResource):
+            isLeaf = True
+            COALESCE = True
+
+            def rest_GET(self, request):
+                return defer.succeed({'ok': True})
+
+        self.assertResponds(Fired())
+
+    def test_inline_callbacks(self):
+        class Inline(JsonResource):
+            isLeaf = True
+            COALESCE = True
+
+            @defer.inlineCallbacks
+            def rest_GET(self, request):
+                result = yield {'ok': True}
+                defer.returnValue(result)
+
+        self.assertResponds(Inline())
+
+
+class StreamCoalesceTests(unittest.TestCase):
+
+    def test_generator(self):
+        calls = []
+
+        class Rows(JsonResource):
+            isLeaf = True
+            COALESCE = True
+
+            def rest_GET(self, request):
+                d = defer.Deferred()
+                calls.append(d)
+                return d
+
+        resrc = Rows()
+        requests = [render(resrc, make_request(b'/')) for _ in range(3)]
+        calls[0].callback(iter([{'id': 1}, {'id': 2}]))
+        self.assertEqual(len(calls), 1)
+        for request in requests:
+            self.assertEqual(json.loads(response_body(request)), [{'id': 1}, {'id': 2}])
@@ -0,0 +1,102 @@
+"""
+Tests for ``txrest.compress`` and the response compression of ``txrest.RestResource``
+"""
+import gzip
+import io
+import json
+import zlib
+
+from twisted.trial import unittest
+
+from txrest.compress import CODINGS, DEFLATE, GZIP, compress, compress_stream, decompress_body, negotiate
+from txrest.json import JsonResource
+
+from tests.helpers import drain, make_request, render, response_body
+
+
+class NegotiateTests(unittest.TestCase):
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate(b'gzip, deflate'), GZIP)
+        self.assertEqual(negotiate(b'deflate'), DEFLATE)
+        self.assertEqual(negotiate(b'gzip;q=0.5, deflate'), DEFLATE)
+        self.assertEqual(negotiate(b'*'), GZIP)
+        self.assertIsNone(negotiate(b'gzip;q=0, br'))
+        self.assertIsNone(negotiate(None))
+
+    def test_round_trip(self):
+        data = b'abc' * 1000
+        for coding in CODINGS:
+            body = decompress_body(io.BytesIO(compress(data, coding)), coding)
+            self.assertEqual(body.read(), data)
+        chunks = compress_stream([data, b'', data], GZIP)
+        self.assertEqual(zlib.decompress(b''.join(chunks), 16 + zlib.MAX_WBITS), data * 2)
+
+    def test_limit(self):
+        body = io.BytesIO(compress(b'\0' * 10000, GZIP))
+        self.assertRaises(ValueError, decompress_body, body, GZIP, 1000)
+        self.assertRaises(ValueError, decompress_body, body, b'br')
+
+
+class Document(JsonResource):
+    isLeaf = True
+    COMPRESSION_THRESHOLD = 100
+
+    def rest_GET(self, request):
+        if request.args.get(b'stream'):
+            return iter([{'n': n} for n in range(100)])
+        size = int(request.args.get(b'size', [b'1000'])[0])
+        if request.args.get(b'vary'):
+            request.setHeader(b'vary', b'Accept-Language')
+        return {'data': 'x' * size}
+
+    def rest_POST(self, request, post):
+        return post
+
+
+class CompressedResourceTests(unittest.TestCase):
+
+    def get(self, uri, accept=b'gzip'):
+        return render(Document(), make_request(uri, headers={b'accept-encoding': accept}))
+
+    def test_compressed(self):
+        request = self.get(b'/')
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'content-encoding'), [b'gzip'])
+        body = gzip.GzipFile(fileobj=io.BytesIO(response_body(request))).read()
+        self.assertEqual(json.loads(body), {'data': 'x' * 1000})
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'vary'), [b'Accept-Encoding'])
+
+    def test_threshold(self):
+        request = self.get(b'/?size=10')
+        self.assertFalse(request.responseHeaders.hasHeader(b'content-encoding'))
+        self.assertEqual(json.loads(response_body(request)), {'data': 'x' * 10})
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'vary'), [b'Accept-Encoding'])
+
+    def test_not_accepted(self):
+        request = self.get(b'/', b'identity')
+        self.assertFalse(request.responseHeaders.hasHeader(b'content-encoding'))
+
+    def test_vary_kept(self):
+        request = self.get(b'/?vary=1')
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'vary'), [b'Accept-Language, Accept-Encoding'])
+
+    def test_vary_once(self):
+        class Varying(Document):
+            def rest_GET(self, request):
+                request.setHeader(b'vary', b'accept-encoding, Cookie')
+                return {'data': 'x' * 1000}
+
+        request = render(Varying(), make_request(b'/', headers={b'accept-encoding': b'gzip'}))
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'vary'), [b'accept-encoding, Cookie'])
+
+    def test_stream(self):
+        request = drain(self.get(b'/?stream=1', b'deflate'))
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'content-encoding'), [b'deflate'])
+        body = zlib.decompress(response_body(request))
+        self.assertEqual(json.loads(body), [{'n': n} for n in range(100)])
+
+    def test_compressed_body(self):
+        body = compress(b'{"name": "ben"}', GZIP)
+        request = render(Document(), make_request(b'/', b'POST', {
+            b'content-type': b'application/json', b'content-encoding': b'gzip'}, body))
+        self.assertEqual(json.loads(response_body(request)), {'name': 'ben'})
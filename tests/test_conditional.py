@@ -0,0 +1,106 @@
+"""
+Tests for the conditional GET support of ``txrest.RestResource``
+"""
+import json
+
+from twisted.trial import unittest
+from twisted.web.http import INTERNAL_SERVER_ERROR, NOT_MODIFIED, OK
+
+from txrest import etag_matches
+from txrest.json import JsonResource
+
+from tests.helpers import Counter, make_request, render, response_body
+
+
+class EtagMatchesTests(unittest.TestCase):
+
+    def test_strong(self):
+        self.assertTrue(etag_matches(b'"v1"', b'"v1"'))
+        self.assertFalse(etag_matches(b'"v2"', b'"v1"'))
+        self.assertFalse(etag_matches(None, b'"v1"'))
+
+    def test_weak(self):
+        self.assertTrue(etag_matches(b'"v1"', b'W/"v1"'))
+        self.assertTrue(etag_matches(b'W/"v1"', b'"v1"'))
+        self.assertTrue(etag_matches(b'W/"v1"', b'W/"v1"'))
+
+    def test_list(self):
+        self.assertTrue(etag_matches(b'"v0", W/"v1"', b'"v1"'))
+        self.assertTrue(etag_matches(b'"v0","v1"', b'"v1"'))
+        self.assertTrue(etag_matches(b'*', b'"v1"'))
+        self.assertFalse(etag_matches(b'"v0", "v2"', b'"v1"'))
+
+
+class ConditionalRequestTests(unittest.TestCase):
+
+    def test_auto_etag(self):
+        class Tagged(JsonResource):
+            isLeaf = True
+            AUTO_ETAG = True
+
+            def rest_GET(self, request):
+                return {'ok': True}
+
+        resrc = Tagged()
+        request = render(resrc, make_request(b'/'))
+        etag = request.responseHeaders.getRawHeaders(b'etag')[0]
+        self.assertTrue(etag.startswith(b'"'))
+
+        request = render(resrc, make_request(b'/', headers={b'if-none-match': etag}))
+        self.assertEqual(request.code, NOT_MODIFIED)
+        self.assertEqual(response_body(request), b'')
+
+        request = render(resrc, make_request(b'/', headers={b'if-none-match': b'"stale"'}))
+        self.assertEqual(request.code, OK)
+
+    def test_validator(self):
+        class Versioned(Counter):
+            def etag_GET(self, request):
+                return 'v1'
+
+        resrc = Versioned()
+        request = render(resrc, make_request(b'/'))
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'etag'), [b'"v1"'])
+
+        request = render(resrc, make_request(b'/', headers={b'if-none-match': b'"v1"'}))
+        self.assertEqual(request.code, NOT_MODIFIED)
+        self.assertEqual(resrc.calls, 1)
+
+    def test_weak_validator(self):
+        class Compressed(Counter):
+            COMPRESSION_THRESHOLD = 1024
+
+            def etag_GET(self, request):
+                return 'v1'
+
+        resrc = Compressed()
+        request = render(resrc, make_request(b'/'))
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'etag'), [b'W/"v1"'])
+        for tag in (b'W/"v1"', b'"v1"'):
+            request = render(resrc, make_request(b'/', headers={b'if-none-match': tag}))
+            self.assertEqual(request.code, NOT_MODIFIED)
+        self.assertEqual(resrc.calls, 1)
+
+    def test_last_modified(self):
+        class Dated(Counter):
+            def last_modified_GET(self, request):
+                return 1000000000
+
+        resrc = Dated()
+        request = render(resrc, make_request(b'/', headers={
+            b'if-modified-since': b'Sun, 09 Sep 2001 01:46:40 GMT'}))
+        self.assertEqual(request.code, NOT_MODIFIED)
+        request = render(resrc, make_request(b'/', headers={
+            b'if-modified-since': b'Sat, 08 Sep 2001 00:00:00 GMT'}))
+        self.assertEqual(request.code, OK)
+        self.assertEqual(resrc.calls, 1)
+
+    def test_validator_error(self):
+        class Broken(Counter):
+            def etag_GET(self, request):
+                raise KeyError('revision')
+
+        request = render(Broken(), make_request(b'/'))
+        self.assertEqual(request.code, INTERNAL_SERVER_ERROR)
+        self.assertEqual(json.loads(response_body(request))['code'], INTERNAL_SERVER_ERROR)
+        self.flushLoggedErrors(KeyError)
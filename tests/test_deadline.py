@@ -0,0 +1,59 @@
+"""
+Tests for the request deadlines of ``txrest.RestResource`` (``DEADLINE``)
+"""
+import json
+
+from twisted.internet import task
+from twisted.trial import unittest
+from twisted.web.http import GATEWAY_TIMEOUT, OK, SERVICE_UNAVAILABLE
+
+from tests.helpers import Pending, make_request, render, response_body
+
+
+class DeadlineTests(unittest.TestCase):
+
+    def setUp(self):
+        clock = self.clock = task.Clock()
+
+        class Slow(Pending):
+            DEADLINE = 5
+            METHOD_DEADLINES = {'POST': 30}
+            CLOCK = clock
+
+            def rest_POST(self, request, post):
+                return self.rest_GET(request)
+
+        self.resource = Slow()
+
+    def test_expired(self):
+        request = render(self.resource, make_request(b'/'))
+        self.clock.advance(5)
+        self.assertEqual(request.code, GATEWAY_TIMEOUT)
+        self.assertTrue(request.deadline_exceeded)
+        self.assertEqual(json.loads(response_body(request))['code'], GATEWAY_TIMEOUT)
+        self.assertTrue(self.resource.pending[0].called)  # cancelled
+
+    def test_in_time(self):
+        request = render(self.resource, make_request(b'/'))
+        self.clock.advance(4)
+        self.resource.pending[0].callback({'ok': True})
+        self.assertEqual(request.code, OK)
+        self.assertFalse(self.clock.getDelayedCalls())
+
+    def test_method_deadline(self):
+        request = render(self.resource, make_request(b'/', b'POST', body=b'{}'))
+        self.clock.advance(5)
+        self.assertFalse(request.finished)
+        self.clock.advance(25)
+        self.assertEqual(request.code, GATEWAY_TIMEOUT)
+
+    def test_code(self):
+        self.resource.DEADLINE_CODE = SERVICE_UNAVAILABLE
+        request = render(self.resource, make_request(b'/'))
+        self.clock.advance(5)
+        self.assertEqual(request.code, SERVICE_UNAVAILABLE)
+
+    def test_no_deadline(self):
+        self.resource.DEADLINE = None
+        render(self.resource, make_request(b'/'))
+        self.assertFalse(self.clock.getDelayedCalls())
@@ -0,0 +1,100 @@
+"""
+Tests for ``txrest.failures`` and the failure logging of ``txrest.RestResource`` (``TRACEBACK_LOG``)
+"""
+from twisted.python import failure, log
+from twisted.trial import unittest
+from twisted.web.http import INTERNAL_SERVER_ERROR
+
+from txrest.failures import TracebackLog, failure_signature
+
+from tests.helpers import Counter, make_request, render
+
+
+def fail(exc):
+    try:
+        raise exc
+    except Exception:
+        return failure.Failure()
+
+
+class TracebackLogTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.tracebacks = TracebackLog(interval=10, max_signatures=2, clock=lambda: self.now)
+
+    def test_interval(self):
+        self.assertEqual(self.tracebacks.admit('a'), 0)
+        self.assertIsNone(self.tracebacks.admit('a'))
+        self.assertIsNone(self.tracebacks.admit('a'))
+        self.assertEqual(self.tracebacks.suppressed, 2)
+        self.now = 10
+        self.assertEqual(self.tracebacks.admit('a'), 2)
+        self.assertIsNone(self.tracebacks.admit('a'))
+
+    def test_signatures(self):
+        self.tracebacks.admit('a')
+        self.assertEqual(self.tracebacks.admit('b'), 0)
+        self.tracebacks.admit('c')  # forgets 'a'
+        self.assertEqual(self.tracebacks.admit('a'), 0)
+        self.tracebacks.reset()
+        self.assertEqual(self.tracebacks.admit('c'), 0)
+
+    def test_failure_signature(self):
+        first, second = [fail(ValueError(str(i))) for i in range(2)]
+        self.assertEqual(failure_signature(first, 'app.Items', 'rest_GET'),
+                         failure_signature(second, 'app.Items', 'rest_GET'))
+        self.assertNotEqual(failure_signature(first, 'app.Items', 'rest_GET'),
+                            failure_signature(fail(KeyError('x')), 'app.Items', 'rest_GET'))
+        self.assertNotEqual(failure_signature(first, 'app.Items', 'rest_GET'),
+                            failure_signature(first, 'app.Items', 'rest_POST'))
+
+
+class FailureLoggingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        tracebacks = TracebackLog(interval=10, clock=lambda: self.now)
+
+        class Broken(Counter):
+            TRACEBACK_LOG = tracebacks
+
+            def rest_GET(self, request):
+                raise ValueError('boom')
+
+        self.resource = Broken()
+        self.messages = []
+        log.addObserver(self.observe)
+        self.addCleanup(log.removeObserver, self.observe)
+
+    def observe(self, event):
+        if event.get('isError'):
+            self.messages.append(log.textFromEventDict(event))
+
+    def get(self):
+        request = render(self.resource, make_request(b'/'))
+        self.assertEqual(request.code, INTERNAL_SERVER_ERROR)
+        self.flushLoggedErrors(ValueError)
+
+    def tracebacks(self):
+        return [message for message in self.messages if 'Traceback' in message]
+
+    def test_rate_limited(self):
+        for _ in range(3):
+            self.get()
+        self.assertEqual(len(self.tracebacks()), 1)
+        lines = [message for message in self.messages if 'traceback already logged' in message]
+        self.assertEqual(len(lines), 2)
+        self.assertIn('GET /: ', lines[0])
+        self.assertIn('ValueError: boom', lines[0])
+
+        self.now = 10
+        self.get()
+        self.assertEqual(len(self.tracebacks()), 2)
+        self.assertIn('(2 identical failures not logged)', self.tracebacks()[-1])
+
+    def test_every_traceback(self):
+        self.resource.TRACEBACK_LOG = None
+        for _ in range(2):
+            self.get()
+        self.assertEqual(len(self.tracebacks()), 2)
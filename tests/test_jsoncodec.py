@@ -0,0 +1,108 @@
+"""
+Tests for ``txrest.jsoncodec``
+"""
+import json
+
+from twisted.trial import unittest
+
+from txrest import jsoncodec
+from txrest.json import JsonResource
+
+from tests.helpers import make_request, render, response_body
+
+DOCUMENT = {'name': u'caf\xe9', 'path': '/a/b', 'items': [1, 2.5, None, True]}
+
+
+class CodecTestsMixin(object):
+    """
+    The tests every codec passes, ``codec_class`` is the codec under test.
+    """
+    codec_class = None
+
+    def setUp(self):
+        if not self.codec_class.available():
+            raise unittest.SkipTest('%s is not installed' % self.codec_class.module_name)
+        self.codec = self.codec_class()
+
+    def test_round_trip(self):
+        for encoding in ('utf-8', 'latin-1'):
+            rstr = self.codec.dumps(DOCUMENT, encoding)
+            self.assertIsInstance(rstr, bytes)
+            self.assertEqual(self.codec.loads(rstr, encoding), DOCUMENT)
+            self.assertEqual(json.loads(rstr.decode(encoding)), DOCUMENT)
+
+    def test_not_escaped(self):
+        rstr = self.codec.dumps(DOCUMENT, 'utf-8')
+        self.assertIn(u'caf\xe9'.encode('utf-8'), rstr)
+        self.assertIn(b'"/a/b"', rstr)
+        self.assertIn(b'caf\xe9', self.codec.dumps(DOCUMENT, 'latin-1'))
+
+    def test_nan(self):
+        self.assertRaises(ValueError, self.codec.dumps, {'value': float('nan')}, 'utf-8')
+        self.assertRaises(ValueError, self.codec.dumps, {'value': float('inf')}, 'utf-8')
+
+    def test_pretty(self):
+        rstr = self.codec.dumps(DOCUMENT, 'utf-8', pretty=True)
+        self.assertIn(b'\n', rstr)
+        self.assertEqual(self.codec.loads(rstr, 'utf-8'), DOCUMENT)
+
+    def test_iterencode(self):
+        self.assertEqual(b''.join(self.codec.iterencode(DOCUMENT, 'utf-8')),
+                         self.codec.dumps(DOCUMENT, 'utf-8'))
+
+
+class StdlibCodecTests(CodecTestsMixin, unittest.TestCase):
+    codec_class = jsoncodec.StdlibCodec
+
+    def test_output(self):
+        self.assertEqual(self.codec.dumps({'name': u'caf\xe9'}, 'utf-8'), b'{"name": "caf\xc3\xa9"}')
+        self.assertEqual(self.codec.dumps({'name': 'cafe'}, 'utf-8'), b'{"name": "cafe"}')
+
+
+class SimpleJsonCodecTests(CodecTestsMixin, unittest.TestCase):
+    codec_class = jsoncodec.SimpleJsonCodec
+
+
+class UJsonCodecTests(CodecTestsMixin, unittest.TestCase):
+    codec_class = jsoncodec.UJsonCodec
+
+
+class OrJsonCodecTests(CodecTestsMixin, unittest.TestCase):
+    codec_class = jsoncodec.OrJsonCodec
+
+    def test_nan(self):
+        # documented: orjson writes NaN and Infinity as null
+        self.assertEqual(self.codec.dumps({'value': float('nan')}, 'utf-8'), b'{"value":null}')
+
+
+class GetCodecTests(unittest.TestCase):
+
+    def tearDown(self):
+        jsoncodec.set_default_codec(None)
+
+    def test_fallback(self):
+        for name in jsoncodec.PREFERENCE:
+            codec = jsoncodec.get_codec(name)
+            candidates = jsoncodec.PREFERENCE[jsoncodec.PREFERENCE.index(name):]
+            self.assertIn(codec.name, candidates)
+            self.assertTrue(jsoncodec.CODECS[codec.name].available())
+        self.assertIs(jsoncodec.get_codec('json'), jsoncodec.get_codec('json'))
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, jsoncodec.get_codec, 'yaml')
+
+    def test_default(self):
+        self.assertEqual(jsoncodec.get_codec().name, 'json')
+        codec = jsoncodec.get_codec('json')
+        jsoncodec.set_default_codec(codec)
+        self.assertIs(jsoncodec.get_codec(), codec)
+
+    def test_resource(self):
+        class Cafe(JsonResource):
+            isLeaf = True
+
+            def rest_GET(self, request):
+                return {'name': u'caf\xe9'}
+
+        request = render(Cafe(), make_request(b'/'))
+        self.assertEqual(response_body(request), b'{"name": "caf\xc3\xa9"}')
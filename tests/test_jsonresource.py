@@ -0,0 +1,93 @@
+"""
+Tests for ``txrest.json.JsonResource`` and the request handling of ``txrest.RestResource``
+"""
+import json
+
+from twisted.internet import defer
+from twisted.trial import unittest
+from twisted.web.http import INTERNAL_SERVER_ERROR, NOT_ALLOWED, OK
+from twisted.web.static import Data
+
+from txrest import RECURSION_DEPTH, ResourceRecursionLimit
+from txrest.json import JsonResource
+
+from tests.helpers import Counter, make_request, render, response_body
+
+
+class DispatchTests(unittest.TestCase):
+
+    def test_table(self):
+        class Items(Counter):
+            def rest_POST(self, request, post):
+                return post
+
+        class Archive(Items):
+            def rest_DELETE(self, request):
+                return {}
+
+        table = Items()._dispatch
+        self.assertIs(Items()._dispatch, table)
+        self.assertEqual(table.fq_name, __name__ + '.Items')
+        self.assertEqual(table.handlers, (('GET', 'rest_GET'), ('POST', 'rest_POST')))
+        self.assertIsInstance(table.allowed_methods, tuple)
+        self.assertEqual(sorted(Archive()._dispatch.allowed_methods), ['DELETE', 'GET', 'HEAD', 'POST'])
+        self.assertEqual(sorted(table.allowed_methods), ['GET', 'HEAD', 'POST'])
+
+    def test_not_allowed(self):
+        request = render(Counter(), make_request(b'/', b'POST', body=b'{}'))
+        self.assertEqual(request.code, NOT_ALLOWED)
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'allow'), [b'HEAD, GET'])
+
+    def test_fallback(self):
+        class CatchAll(Counter):
+            def rest(self, request):
+                return {'method': request.method}
+
+        request = render(CatchAll(), make_request(b'/', b'PATCH'))
+        self.assertEqual(json.loads(response_body(request)), {'method': 'PATCH'})
+        request = render(CatchAll(), make_request(b'/'))
+        self.assertEqual(json.loads(response_body(request)), {'calls': 1})
+
+
+class NestedResourceTests(unittest.TestCase):
+
+    def test_rest_resource(self):
+        counter = Counter()
+
+        class Proxy(JsonResource):
+            isLeaf = True
+
+            def rest_GET(self, request):
+                return counter
+
+        request = render(Proxy(), make_request(b'/'))
+        self.assertEqual(request.code, OK)
+        self.assertEqual(json.loads(response_body(request)), {'calls': 1})
+        self.assertEqual(request.recursion, 1)
+        self.assertEqual(request.rest_resource, 'tests.helpers.Counter')
+
+    def test_resource(self):
+        class Static(JsonResource):
+            isLeaf = True
+
+            def rest_GET(self, request):
+                return defer.succeed(Data(b'plain', 'text/plain'))
+
+        request = render(Static(), make_request(b'/'))
+        self.assertEqual(response_body(request), b'plain')
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'content-type'), [b'text/plain'])
+
+    def test_recursion_limit(self):
+        calls = []
+
+        class Loop(JsonResource):
+            isLeaf = True
+
+            def rest_GET(self, request):
+                calls.append(request.recursion)
+                return self
+
+        request = render(Loop(), make_request(b'/'))
+        self.assertEqual(request.code, INTERNAL_SERVER_ERROR)
+        self.assertEqual(calls, list(range(RECURSION_DEPTH + 1)))
+        self.assertEqual(len(self.flushLoggedErrors(ResourceRecursionLimit)), 1)
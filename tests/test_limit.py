@@ -0,0 +1,109 @@
+"""
+Tests for ``txrest.limit`` and the concurrency limits of ``txrest.RestResource``
+"""
+from twisted.internet import task
+from twisted.internet.error import ConnectionDone
+from twisted.python import failure
+from twisted.trial import unittest
+from twisted.web.http import OK, SERVICE_UNAVAILABLE
+
+from txrest.limit import ConcurrencyLimit, LimitExceeded, QueueTimeout, acquire_all
+
+from tests.helpers import Pending, make_request, render
+
+
+class ConcurrencyLimitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.limit = ConcurrencyLimit(1, max_queued=1, queue_timeout=2, clock=self.clock)
+
+    def test_acquire(self):
+        self.assertIsNone(self.limit.acquire())
+        waiting = self.limit.acquire()
+        self.assertNoResult(waiting)
+        self.assertRaises(LimitExceeded, self.limit.acquire)
+        self.assertEqual(self.limit.shed, 1)
+
+        self.limit.release()
+        self.successResultOf(waiting)
+        self.assertEqual((self.limit.active, self.limit.queued), (1, 0))
+        self.limit.release()
+        self.assertEqual(self.limit.active, 0)
+
+    def test_timeout(self):
+        self.limit.acquire()
+        waiting = self.limit.acquire()
+        self.clock.advance(2)
+        self.assertEqual(self.failureResultOf(waiting, QueueTimeout).value.retry_after, 1)
+        self.assertEqual((self.limit.queued, self.limit.timeouts), (0, 1))
+
+    def test_cancel(self):
+        self.limit.acquire()
+        waiting = self.limit.acquire()
+        waiting.cancel()
+        self.failureResultOf(waiting)
+        self.assertEqual(self.limit.queued, 0)
+        self.assertFalse(self.clock.getDelayedCalls())
+        self.limit.release()
+        self.assertEqual(self.limit.active, 0)
+
+    def test_acquire_all(self):
+        other = ConcurrencyLimit(1, max_queued=1, clock=self.clock)
+        self.assertIsNone(acquire_all([self.limit, other]))
+        self.limit.release()
+        # the first limit is free, the second one makes the request wait
+        waiting = acquire_all([self.limit, other])
+        self.assertNoResult(waiting)
+        self.assertEqual(self.limit.active, 1)
+        other.release()
+        self.successResultOf(waiting)
+        self.assertEqual((self.limit.active, other.active), (1, 1))
+
+    def test_acquire_all_full(self):
+        other = ConcurrencyLimit(1, clock=self.clock)
+        other.acquire()
+        self.assertRaises(LimitExceeded, acquire_all, [self.limit, other])
+        self.assertEqual(self.limit.active, 0)  # released
+
+
+class LimitedResourceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = task.Clock()
+        limit = ConcurrencyLimit(1, max_queued=1, queue_timeout=2, retry_after=5, clock=self.clock)
+
+        class Limited(Pending):
+            CONCURRENCY_LIMIT = limit
+
+        self.resource = Limited()
+        self.limit = limit
+
+    def test_shed(self):
+        first = render(self.resource, make_request(b'/'))
+        render(self.resource, make_request(b'/'))
+        third = render(self.resource, make_request(b'/'))
+        self.assertEqual(third.code, SERVICE_UNAVAILABLE)
+        self.assertEqual(third.responseHeaders.getRawHeaders(b'retry-after'), [b'5'])
+        self.assertEqual(self.limit.shed, 1)
+
+        self.resource.pending[0].callback({'ok': True})
+        self.assertEqual(first.code, OK)
+        self.assertEqual(len(self.resource.pending), 2)  # the queued request was admitted
+
+    def test_queue_timeout(self):
+        render(self.resource, make_request(b'/'))
+        queued = render(self.resource, make_request(b'/'))
+        self.assertEqual(self.limit.queued, 1)
+        self.clock.advance(2)
+        self.assertEqual(queued.code, SERVICE_UNAVAILABLE)
+        self.assertEqual(self.limit.timeouts, 1)
+        self.assertEqual(len(self.resource.pending), 1)
+
+    def test_queued_client_gone(self):
+        render(self.resource, make_request(b'/'))
+        queued = render(self.resource, make_request(b'/'))
+        queued.connectionLost(failure.Failure(ConnectionDone()))
+        self.assertEqual(self.limit.queued, 0)
+        self.resource.pending[0].callback({})
+        self.assertEqual(self.limit.active, 0)
@@ -0,0 +1,100 @@
+"""
+Tests for ``txrest.metrics`` and the metrics of ``txrest.RestResource`` (``METRICS``)
+"""
+import json
+
+from twisted.trial import unittest
+from twisted.web.http import OK
+
+from txrest import OTHER_METHOD
+from txrest.metrics import Histogram, MetricsRegistry, MetricsResource
+
+from tests.helpers import Counter, Pending, make_request, render, response_body
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_observe(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.cumulative(), [(0.1, 2), (1.0, 3), (None, 4)])
+        self.assertEqual(histogram.count, 4)
+
+
+class MetricsRegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry(buckets=(0.1, 1.0))
+        self.registry.started('app.Items', 'GET')
+        self.registry.record('app.Items', 'GET', 200, {'handler': 0.25}, 0.5)
+
+    def test_snapshot(self):
+        snapshot = self.registry.snapshot()['resources']['app.Items']['GET']
+        self.assertEqual(snapshot['requests'], 1)
+        self.assertEqual(snapshot['in_flight'], 0)
+        self.assertEqual(snapshot['codes'], {'200': 1})
+        self.assertEqual(snapshot['latency']['buckets'], [[0.1, 0], [1.0, 1], ['+Inf', 1]])
+        self.assertEqual(snapshot['phases'], {'handler': 0.25})
+
+    def test_prometheus(self):
+        text = self.registry.prometheus().decode('utf-8')
+        self.assertIn('txrest_requests_total{resource="app.Items",method="GET"} 1', text)
+        self.assertIn('txrest_responses_total{resource="app.Items",method="GET",code="200"} 1', text)
+        self.assertIn('txrest_request_duration_seconds_bucket{resource="app.Items",method="GET",le="+Inf"} 1',
+                      text)
+
+
+class ResourceMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        registry = self.registry = MetricsRegistry()
+
+        class Measured(Counter):
+            METRICS = registry
+
+        self.resource = Measured()
+        self.name = __name__ + '.Measured'
+
+    def endpoints(self):
+        return self.registry.snapshot()['resources'][self.name]
+
+    def test_requests(self):
+        for _ in range(2):
+            render(self.resource, make_request(b'/'))
+        metrics = self.endpoints()['GET']
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['codes'], {'200': 2})
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['latency']['count'], 2)
+
+    def test_unknown_methods(self):
+        for method in (b'POST', b'FOO', b'BAR'):
+            render(self.resource, make_request(b'/', method))
+        self.assertEqual(sorted(self.endpoints()), [OTHER_METHOD])
+        self.assertEqual(self.endpoints()[OTHER_METHOD]['requests'], 3)
+
+    def test_failure(self):
+        registry = self.registry
+
+        class Failing(Pending):
+            METRICS = registry
+
+        resrc = Failing()
+        render(resrc, make_request(b'/'))
+        resrc.pending[0].errback(ValueError('boom'))
+        self.flushLoggedErrors(ValueError)
+        metrics = self.registry.snapshot()['resources'][__name__ + '.Failing']['GET']
+        self.assertEqual(metrics['failures'], 1)
+        self.assertEqual(metrics['codes'], {'500': 1})
+
+    def test_resource(self):
+        render(self.resource, make_request(b'/'))
+        request = render(MetricsResource(self.registry), make_request(b'/'))
+        self.assertEqual(request.code, OK)
+        snapshot = json.loads(response_body(request))
+        self.assertEqual(snapshot['resources'][self.name]['GET']['requests'], 1)
+
+        request = render(MetricsResource(self.registry), make_request(b'/?format=prometheus'))
+        self.assertIn(b'txrest_requests_total', response_body(request))
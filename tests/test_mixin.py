@@ -0,0 +1,110 @@
+"""
+Tests for ``txrest.mixin.ProcessPool``
+"""
+from twisted.internet import defer, task
+from twisted.trial import unittest
+
+from txrest.mixin import ProcessHandlerError, ProcessPool, ProcessPoolFull, _call_in_worker
+
+
+def square(x):
+    return x * x
+
+
+class FakePool(object):
+    """
+    Record the calls sent to the workers of a ``multiprocessing.Pool``
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def apply_async(self, func, args, callback):
+        self.calls.append((args[0], callback.args[0]))
+
+    def answer(self, pool, index=0):
+        """
+        Deliver the result of the ``index``-th call to ``pool``
+        """
+        payload, d = self.calls[index]
+        pool._done(d, _call_in_worker(payload))
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class ProcessPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.pool = ProcessPool(processes=1, max_queued=1, timeout=5, clock=self.clock)
+        self.workers = self.pool._pool = FakePool()
+
+    def test_not_started(self):
+        pool = ProcessPool(processes=1)
+        self.assertRaises(RuntimeError, pool.submit, square, 2)
+
+    def test_queue(self):
+        first = self.pool.submit(square, 2)
+        second = self.pool.submit(square, 3)
+        self.assertEqual(len(self.workers.calls), 1)
+        self.assertRaises(ProcessPoolFull, self.pool.submit, square, 4)
+
+        self.workers.answer(self.pool)
+        self.assertEqual(self.successResultOf(first), 4)
+        self.workers.answer(self.pool, 1)
+        self.assertEqual(self.successResultOf(second), 9)
+        self.assertEqual(self.pool.running, 0)
+
+    def test_cancel_queued(self):
+        self.pool.submit(square, 2)
+        queued = self.pool.submit(square, 3)
+        queued.cancel()
+        self.failureResultOf(queued, defer.CancelledError)
+        self.workers.answer(self.pool)
+        self.assertEqual(len(self.workers.calls), 1)
+
+    def test_timeout(self):
+        first = self.pool.submit(square, 2)
+        self.pool.submit(square, 3)
+        self.clock.advance(5)
+        self.failureResultOf(first, ProcessHandlerError)
+        self.assertEqual(self.pool.lost, 1)
+        # the worker is still busy with the first call
+        self.assertEqual(len(self.workers.calls), 1)
+        self.workers.answer(self.pool)
+        self.assertEqual(len(self.workers.calls), 2)
+
+    def test_killed_worker(self):
+        self.pool.submit(square, 2)
+        self.pool.submit(square, 3)
+        self.clock.advance(5)
+        self.clock.advance(5)
+        self.assertEqual(len(self.workers.calls), 2)
+        self.workers.answer(self.pool)  # too late, ignored
+        self.assertEqual(self.pool.running, 1)
+
+    def test_handler_error(self):
+        d = self.pool.submit(square, None)
+        self.workers.answer(self.pool)
+        self.assertIn('TypeError', str(self.failureResultOf(d, ProcessHandlerError).value))
+
+    def test_stop(self):
+        first = self.pool.submit(square, 2)
+        second = self.pool.submit(square, 3)
+        self.pool.stop()
+        self.failureResultOf(first)
+        self.failureResultOf(second)
+        self.assertRaises(RuntimeError, self.pool.submit, square, 2)
+
+
+class WorkerProcessTests(unittest.TestCase):
+
+    def test_submit(self):
+        pool = ProcessPool(processes=1)
+        pool.start()
+        self.addCleanup(pool.stop)
+        return pool.submit(square, 7).addCallback(self.assertEqual, 49)
@@ -0,0 +1,117 @@
+"""
+Tests for ``txrest.offload`` and the offloading of ``txrest.RestResource`` (``OFFLOAD_THRESHOLD``)
+"""
+import json
+import threading
+
+from twisted.internet import defer
+from twisted.trial import unittest
+from twisted.web import server
+from twisted.web.http import BAD_REQUEST, OK
+
+from txrest.json import JsonResource
+from txrest.offload import OffloadPool
+
+from tests.helpers import make_request, render, response_body
+
+BODY = json.dumps({'rows': list(range(100))}).encode('ascii')
+
+
+class RecordingPool(object):
+    """
+    Run the work right away, recording the arguments it's given.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def run(self, f, *args):
+        self.calls.append(args)
+        return defer.maybeDeferred(f, *args)
+
+
+class Echo(JsonResource):
+    isLeaf = True
+    OFFLOAD_THRESHOLD = 64
+
+    def rest_POST(self, request, body):
+        return body
+
+    def rest_GET(self, request):
+        return {'rows': list(range(100))}
+
+
+class OffloadTests(unittest.TestCase):
+
+    def setUp(self):
+        pool = RecordingPool()
+
+        class Recorded(Echo):
+            OFFLOAD_POOL = pool
+
+        self.pool = pool
+        self.resource = Recorded()
+
+    def assertPlainData(self):
+        self.assertTrue(self.pool.calls)
+        for args in self.pool.calls:
+            for arg in args:
+                self.assertNotIsInstance(arg, server.Request)
+
+    def test_body(self):
+        request = render(self.resource, make_request(b'/', method=b'POST', body=BODY))
+        self.assertEqual(request.code, OK)
+        self.assertEqual(json.loads(response_body(request)), json.loads(BODY))
+        self.assertPlainData()
+
+    def test_small_body(self):
+        render(self.resource, make_request(b'/', method=b'POST', body=b'{}'))
+        self.assertEqual(self.pool.calls, [])
+
+    def test_bad_body(self):
+        request = render(self.resource, make_request(b'/', method=b'POST', body=b'[' * 100))
+        self.assertEqual(request.code, BAD_REQUEST)
+        self.assertPlainData()
+
+    def test_response(self):
+        # the first response shows the method returns large bodies
+        render(self.resource, make_request(b'/'))
+        self.assertEqual(self.pool.calls, [])
+        request = render(self.resource, make_request(b'/'))
+        self.assertEqual(json.loads(response_body(request)), {'rows': list(range(100))})
+        self.assertPlainData()
+
+
+class OffloadPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = OffloadPool(size=1, name='test-offload')
+        self.addCleanup(self.pool.stop)
+
+    def test_run(self):
+        d = self.pool.run(lambda: threading.current_thread().name)
+        d.addCallback(self.assertNotEqual, threading.current_thread().name)
+        return d
+
+    def test_resource(self):
+        threads = []
+        pool = self.pool
+
+        class Threaded(Echo):
+            OFFLOAD_POOL = pool
+
+            def _parse_body(self, request, content, encoding):
+                threads.append((threading.current_thread(), request))
+                return Echo._parse_body(self, request, content, encoding)
+
+        request = make_request(b'/', method=b'POST', body=BODY)
+        finished = request.notifyFinish()
+        render(Threaded(), request)
+
+        def check(_):
+            self.assertEqual(json.loads(response_body(request)), json.loads(BODY))
+            [(thread, parsed_request)] = threads
+            self.assertIsNot(thread, threading.current_thread())
+            self.assertIsNone(parsed_request)
+
+        return finished.addCallback(check)
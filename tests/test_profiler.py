@@ -0,0 +1,63 @@
+"""
+Tests for ``txrest.profiler`` and the request profiling of ``txrest.RestResource`` (``PROFILER``)
+"""
+import json
+
+from twisted.trial import unittest
+from twisted.web.http import BAD_REQUEST, NOT_FOUND, OK
+
+from txrest.profiler import ProfilerResource, RequestProfiler
+
+from tests.helpers import Counter, make_request, render, response_body
+
+
+class ProfilerTests(unittest.TestCase):
+
+    def setUp(self):
+        profiler = self.profiler = RequestProfiler(rate=0, header=b'x-profile', token=b'secret')
+
+        class Profiled(Counter):
+            PROFILER = profiler
+
+        self.resource = Profiled()
+        self.key = (__name__ + '.Profiled', 'rest_GET')
+        self.admin = ProfilerResource(profiler)
+
+    def get(self, uri):
+        return render(self.admin, make_request(uri))
+
+    def test_sample(self):
+        render(self.resource, make_request(b'/'))
+        render(self.resource, make_request(b'/', headers={b'x-profile': b'guess'}))
+        self.assertEqual(self.profiler.profiled, {})
+        render(self.resource, make_request(b'/', headers={b'x-profile': b'secret'}))
+        self.assertEqual(self.profiler.profiled, {self.key: 1})
+
+    def test_rate(self):
+        self.profiler.rate = 1
+        render(self.resource, make_request(b'/'))
+        self.assertEqual(self.profiler.profiled, {self.key: 1})
+
+    def test_report(self):
+        render(self.resource, make_request(b'/', headers={b'x-profile': b'secret'}))
+        request = self.get(b'/')
+        self.assertEqual(json.loads(response_body(request)),
+                         [{'resource': self.key[0], 'method': self.key[1], 'requests': 1}])
+
+        request = self.get(b'/?resource=%s&method=rest_GET&sort=calls&limit=5' % self.key[0].encode('ascii'))
+        self.assertEqual(request.code, OK)
+        self.assertIn(b'function calls', response_body(request))
+
+    def test_not_profiled(self):
+        self.assertEqual(self.get(b'/?resource=app.Items&method=rest_GET').code, NOT_FOUND)
+
+    def test_bad_arguments(self):
+        render(self.resource, make_request(b'/', headers={b'x-profile': b'secret'}))
+        uri = b'/?resource=%s&method=rest_GET' % self.key[0].encode('ascii')
+        for query in (b'&sort=nope', b'&limit=ten', b'&limit=0'):
+            self.assertEqual(self.get(uri + query).code, BAD_REQUEST)
+
+    def test_reset(self):
+        render(self.resource, make_request(b'/', headers={b'x-profile': b'secret'}))
+        render(self.admin, make_request(b'/', b'DELETE'))
+        self.assertEqual(self.profiler.profiled, {})
@@ -0,0 +1,69 @@
+"""
+Tests for ``txrest.watchdog.ReactorWatchdog``
+"""
+import json
+import threading
+
+from twisted.trial import unittest
+
+from txrest.watchdog import UNKNOWN, ReactorWatchdog, is_handler
+
+from tests.helpers import Counter, make_request, render, response_body
+
+
+def restart(watchdog):
+    return watchdog._attribute()
+
+
+class WatchdogTests(unittest.TestCase):
+
+    def setUp(self):
+        self.watchdog = ReactorWatchdog(log_stalls=False)
+        self.watchdog._thread_id = threading.current_thread().ident
+
+    def attribute(self, resrc, request):
+        request = render(resrc, request)
+        return tuple(json.loads(response_body(request)))
+
+    def test_handler(self):
+        watchdog = self.watchdog
+
+        class Blocking(Counter):
+            def rest_GET(self, request):
+                return watchdog._attribute()
+
+        self.assertEqual(self.attribute(Blocking(), make_request(b'/')),
+                         (__name__ + '.Blocking', 'rest_GET', 'handler'))
+
+    def test_phase(self):
+        watchdog = self.watchdog
+
+        class Serializing(Counter):
+            def rest_GET(self, request):
+                return {}
+
+        class Child(Serializing):
+            def _format_response(self, request, response, encoding):
+                response = list(watchdog._attribute())
+                return Serializing._format_response(self, request, response, encoding)
+
+        self.assertEqual(self.attribute(Child(), make_request(b'/')),
+                         (__name__ + '.Child', None, 'serialize'))
+
+    def test_not_a_handler(self):
+        self.assertEqual(restart(self.watchdog), UNKNOWN)
+        self.assertTrue(is_handler('rest'))
+        self.assertTrue(is_handler('rest_GET'))
+        self.assertFalse(is_handler('restart'))
+        self.assertFalse(is_handler('rest_'))
+
+    def test_record(self):
+        self.watchdog._record(('app.Items', 'rest_GET', 'handler'), 0.5)
+        self.watchdog._record(('app.Items', 'rest_GET', 'handler'), 0.2)
+        self.watchdog._record(UNKNOWN, 0.3)
+        self.assertEqual(self.watchdog.stalls, 3)
+        self.assertEqual(self.watchdog.max_lag, 0.5)
+        worst = self.watchdog.worst()
+        self.assertEqual([(item['resource'], item['stalls']) for item in worst],
+                         [('app.Items', 2), ('unknown', 1)])
+        self.assertAlmostEqual(worst[0]['total'], 0.7)
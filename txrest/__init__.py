@@ -7,27 +7,49 @@ those are documented in ``txrest.RestResource``.
 
 from os.path import abspath
 import time
-import traceback
 import codecs
 from unicodedata import normalize
 from textwrap import dedent
 import inspect
+import hashlib
 
 from twisted.web import server, resource, static
-from twisted.internet import reactor
-from twisted.internet.defer import Deferred, maybeDeferred, CancelledError, _DefGen_Return
-from twisted.web.http import (INTERNAL_SERVER_ERROR, SERVICE_UNAVAILABLE, BAD_REQUEST)
+from twisted.internet.defer import Deferred, CancelledError, _DefGen_Return
+from twisted.web import http
+from twisted.web.http import (OK, INTERNAL_SERVER_ERROR, SERVICE_UNAVAILABLE, BAD_REQUEST,
+                              GATEWAY_TIMEOUT, NOT_MODIFIED, PRECONDITION_FAILED)
 from twisted.web.error import UnsupportedMethod
 from twisted.internet.error import (ConnectionDone, ConnectionLost, ConnectionAborted)
-from twisted.python.reflect import prefixedMethodNames
+from twisted.python.reflect import prefixedMethodNames, qual
 from twisted.python import log, failure
 from twisted.python.compat import intToBytes
 
+from txrest.coalesce import Flight
+from txrest.compress import negotiate, compress, compress_stream, decompress_body
+from txrest.limit import LimitExceeded, acquire_all, release_all
+from txrest.timing import PhaseTimer
+from txrest.offload import DEFAULT_POOL
+from txrest.failures import DEFAULT_TRACEBACK_LOG, failure_signature
+from txrest.producer import ChunkProducer, ProducerStopped, slices
+
 REST_METHOD = 'rest'
 REST_METHOD_PREFIX = 'rest_'
+ETAG_METHOD_PREFIX = 'etag_'
+LAST_MODIFIED_METHOD_PREFIX = 'last_modified_'
 DEFAULT_ENCODING = 'utf-8'
+OTHER_METHOD = 'other'  # the metrics of http methods a resource doesn't allow are grouped under this
 
 RECURSION_DEPTH = 5  # the IETF suggests an HTTP redirect limit of 5 (this is a similar concept)
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes buffered before a streamed chunk is written to the client
+BODY_CHUNK_SIZE = 64 * 1024  # bytes read from a POST/PUT body at a time by incremental parsers
+SNIFF_SIZE = 512  # bytes read at a time when looking for the first character of a body
+# response headers that aren't stored with a cached (or coalesced) response: hop-by-hop
+# headers, headers that belong to a single response and headers set again on every request.
+UNSHARED_HEADERS = frozenset((
+    b'connection', b'keep-alive', b'proxy-authenticate', b'proxy-authorization', b'te', b'trailer',
+    b'transfer-encoding', b'upgrade', b'date', b'set-cookie', b'content-type', b'content-length',
+    b'content-encoding', b'etag', b'last-modified', b'server-timing',
+))
 
 
 class ResourceRecursionLimit(Exception):
@@ -37,6 +59,221 @@ class ResourceRecursionLimit(Exception):
     pass
 
 
+def _file_path(cls):
+    """
+    Return the absolute path of the file ``cls`` is defined in, or None
+    """
+    try:
+        return abspath(inspect.getfile(cls))
+    except TypeError:  # built in
+        return None
+
+
+def display_tracebacks(request):
+    """
+    Return True when the error pages of ``request`` show their detail (tracebacks)
+    """
+    site = getattr(request, 'site', None)
+    return bool(site is not None and site.displayTracebacks)
+
+
+def _defined_at(cls, name):
+    """
+    Return the position in ``cls.__mro__`` of the class that defines ``name``
+    """
+    for i, klass in enumerate(cls.__mro__):
+        if name in klass.__dict__:
+            return i
+    return len(cls.__mro__)
+
+
+def strong_etag(body):
+    """
+    Return a strong ETag (a quoted digest) for the bytes ``body``
+    """
+    return b'"' + hashlib.sha1(body).hexdigest().encode('ascii') + b'"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Return True when an If-None-Match header value matches ``etag``.
+
+    If-None-Match uses the weak comparison of RFC 7232: ``W/`` is ignored on
+    both sides, a client that kept the strong ``"v1"`` matches ``W/"v1"``.
+
+    :param if_none_match: the header value (a comma separated list of tags, or ``*``)
+    :param etag: the ETag of the current response
+    """
+    if not if_none_match:
+        return False
+    if etag.startswith(b'W/'):
+        etag = etag[2:]
+    for tag in if_none_match.split(b','):
+        tag = tag.strip()
+        if tag.startswith(b'W/'):
+            tag = tag[2:]
+        if tag == etag or tag == b'*':
+            return True
+    return False
+
+
+def set_etag(request, etag):
+    """
+    ``twisted.web.http.Request.setETag`` with the weak comparison of ``etag_matches``
+
+    :returns: ``http.CACHED`` when the response code was set to 304 (412 for
+              methods other than GET and HEAD) and no body should be written.
+    """
+    request.etag = etag  # sent as the ETag header by ``Request.write``
+    if etag_matches(request.getHeader(b'if-none-match'), etag):
+        request.setResponseCode(NOT_MODIFIED if request.method in (b'GET', b'HEAD') else PRECONDITION_FAILED)
+        return http.CACHED
+    return None
+
+
+def add_vary(request, name):
+    """
+    Add the request header ``name`` to the Vary header of the response, the
+    names already in it (set by the rest_* method) are kept.
+    """
+    values = request.responseHeaders.getRawHeaders(b'vary')
+    if not values:
+        request.setHeader(b'vary', name)
+        return
+    names = set(token.strip().lower() for value in values for token in value.split(b','))
+    if name.lower() not in names and b'*' not in names:
+        request.responseHeaders.setRawHeaders(b'vary', [b', '.join(values + [name])])
+
+
+def body_size(content):
+    """
+    Return the size in bytes of a file-like body without reading it.
+    """
+    position = content.tell()
+    content.seek(0, 2)
+    size = content.tell()
+    content.seek(position)
+    return size
+
+
+_reactor = None
+
+
+def get_reactor():
+    """
+    Return the global reactor, imported on first use so importing txrest never
+    installs the default reactor.
+    """
+    global _reactor
+    if _reactor is None:
+        from twisted.internet import reactor
+        _reactor = reactor
+    return _reactor
+
+
+def request_closed(request):
+    """
+    Return True when the connection of ``request`` has been lost, writing to
+    (or finishing) such a request is an error in recent versions of Twisted.
+    """
+    return getattr(request, '_disconnected', False)
+
+
+def sniff_body(content, size=1):
+    """
+    Return the first ``size`` bytes of a file-like body, skipping leading white-space.
+
+    Only the start of the body is read (in small pieces) and the file position
+    is returned to the beginning so the body can still be parsed in full.  An
+    empty string is returned for an empty (or white-space only) body.
+
+    :param content: a file-like object such as ``request.content``
+    :param size: number of bytes to return
+    """
+    start = b''
+    while len(start) < size:
+        chunk = content.read(SNIFF_SIZE)
+        if not chunk:
+            break
+        start = (start + chunk) if start else chunk.lstrip()
+    content.seek(0)
+    return start[:size]
+
+
+class SerializedResponse(object):
+    """
+    A response body that has already been serialized by ``_format_response``
+
+    These are stored in the response cache and shared by coalesced requests,
+    when one is passed to
+    ``RestResource.on_response`` it's written to the client as-is.
+
+    :body: the serialized bytes
+    :content_type: the value of the content-type header sent with the body
+    :code: the http status code sent with the body
+    :headers: a tuple of (header name, values) set by the rest_* method, sent
+              again with the body (see ``UNSHARED_HEADERS``)
+    :etag: a strong ETag of the body (computed on first use)
+    """
+    __slots__ = ('body', 'content_type', 'code', 'headers', '_etag', '_encoded')
+
+    def __init__(self, body, content_type, code=OK, headers=()):
+        self.body = body
+        self.content_type = content_type
+        self.code = code
+        self.headers = headers
+        self._etag = None
+        self._encoded = None
+
+    def encoded(self, coding, level):
+        """
+        Return the body compressed with ``coding``, compressed once per coding
+        so cached responses are only compressed on the first request.
+        """
+        if self._encoded is None:
+            self._encoded = {}
+        body = self._encoded.get(coding)
+        if body is None:
+            body = self._encoded[coding] = compress(self.body, coding, level)
+        return body
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._etag = strong_etag(self.body)
+        return self._etag
+
+
+class DispatchTable(object):
+    """
+    The ``rest_*`` handler resolution for a single RestResource subclass.
+
+    Resolving handlers with ``getattr`` and walking the class for the
+    ``Allow`` header on every request is pure overhead, the answer only changes
+    when the class changes.  A table is built once per class the first time an
+    instance is created, see ``RestResource._dispatch_table()``.  The table is
+    shared by every instance (and request) of the class, its fields are tuples.
+
+    :fq_name: the fully qualified name of the resource class (used in logging)
+    :handlers: a tuple of (http verb, ``rest_*`` method name)
+    :allowed_methods: the precomputed tuple of methods for the ``Allow`` header
+    :parse_body: True when ``_parse_body`` should handle POST/PUT bodies, False
+                 when a subclass only overrides ``_format_post``.
+    :validators: a tuple of (http verb, (``etag_*`` method name, ``last_modified_*``
+                 method name)), either name can be None.
+    :file_path: the file the resource class is defined in (used in error messages)
+    """
+    __slots__ = ('fq_name', 'handlers', 'allowed_methods', 'parse_body', 'validators', 'file_path')
+
+    def __init__(self, fq_name, handlers, allowed_methods, parse_body, validators, file_path=None):
+        self.fq_name = fq_name
+        self.file_path = file_path
+        self.handlers = tuple(handlers)
+        self.allowed_methods = tuple(allowed_methods)
+        self.parse_body = parse_body
+        self.validators = tuple(validators)
+
+
 class RestResource(resource.Resource, object):
     """
     RestResource is a Twisted Resource() object that can be used with the
@@ -76,16 +313,60 @@ class RestResource(resource.Resource, object):
     ``def _format_response(self, request, response, encoding):`` - receives a data-type defind in the
     class attribute ``HANDLE_TYPES`` and serializes to a byte string that can be written to
     the client.  Encoding is the requested encoding of the resulting string.
-    
+
+    Optionally, to parse bodies incrementally define the function:
+
+    ``def _parse_body(self, request, content, encoding):`` - receives the file-like
+    ``request.content`` and should return the same data-object as ``_format_post``
+
+    Optionally, to support streamed responses define the class attribute ``STREAM_TYPES``
+    and the function:
+
+    ``def _format_stream(self, request, response, encoding):`` - receives a data-type defined
+    in ``STREAM_TYPES`` and returns an iterable of byte strings.  The chunks are written to
+    the client as they are produced using chunked transfer encoding.
+
+    Optionally, to answer conditional requests (``If-None-Match``, ``If-Modified-Since``)
+    with a 304 before the ``rest_*`` method is called define one or both of:
+
+    ``def etag_GET(self, request):`` - returns a cheap version string of the resource
+    (sent quoted as the ETag header, a weak ETag with ``COMPRESSION_THRESHOLD``) or None.
+    An exception raised by a validator is handled like one raised by the ``rest_*`` method.
+
+    ``def last_modified_GET(self, request):`` - returns the epoch the resource was last
+    modified at or None.
+
+    Set ``AUTO_ETAG = True`` to compute strong ETags from the serialized response instead.
+
     ---------------------------------------------------------------------------
     
     This class popualtes the request variable ``method_called`` to the name of 
     the method that was actually called to handle the request. 
     
     We populate the request variable ``recursion`` to an integer that keeps track of
-    resource rendering recursion.
+    resource rendering recursion (the number of resources returned by rest_* methods
+    rendered for the request so far).
     
     We populate the request variable ``started`` to an epoch at the request start time.
+
+    We populate the request variable ``timer`` to a ``txrest.timing.PhaseTimer`` when
+    the resource is timed (see ``SERVER_TIMING`` and ``METRICS``), or None.
+
+    We populate the request variable ``metrics_method`` to the http method the request
+    is counted under by ``METRICS``: the method, or ``OTHER_METHOD`` when it isn't allowed.
+
+    We populate the request variable ``profile`` to the profile of a request sampled by
+    ``PROFILER``, or None.
+
+    We populate the request variable ``deadline_exceeded`` to True when the request was
+    cancelled because it exceeded its deadline (see ``DEADLINE``)
+
+    We populate the request variable ``cache_key`` to the response cache key of a GET
+    request (or None when the response isn't cached, see ``RESPONSE_CACHE``)
+
+    We populate the request variable ``rest_resource`` to the fully qualified name of
+    the last resource that rendered the request, and ``rest_headers`` to the response
+    headers it set.
     """
 
     # -- SUBCLASSES MUST IMPLEMENT THESE CLASS ATTRIBUTES ---------------------
@@ -96,6 +377,84 @@ class RestResource(resource.Resource, object):
     #                parse and serialize.
     SUBCLASS_ATTRS = ('ACCEPT', 'CONTENT_TYPE', 'HANDLE_TYPES', 'ERROR_CLASS')
 
+    # -- SUBCLASSES MAY IMPLEMENT THESE CLASS ATTRIBUTES ----------------------
+    # STREAM_TYPES - a sequence containing response types (generators, iterators)
+    #                that are serialized incrementally by ``_format_stream``
+    # PRODUCER_THRESHOLD - response bodies larger than this (in bytes) are written
+    #                      through a producer that respects the transport's buffer,
+    #                      ``None`` always writes the body in a single call.
+    # RESPONSE_CACHE - a ``txrest.cache.ResponseCache``, when set the serialized
+    #                  GET responses of the resource are cached.
+    # CACHE_TTL - seconds a cached response stays fresh, ``None`` uses the cache's ttl
+    # CACHE_NAMESPACE - cached responses are shared by every instance of the resource
+    #                   class, instances with a different namespace (a hashable value,
+    #                   usually set in ``__init__``) don't share them.
+    # CACHE_HEADERS - names of request headers that are part of the cache key
+    #                 (headers that change the response such as ``accept-language``,
+    #                 or ``authorization`` for per-user responses)
+    # COALESCE - when True, identical GET requests (same key as the response cache)
+    #            that arrive while a Deferred handler call is pending share its result.
+    #            The key ignores the Authorization and Cookie headers: don't coalesce
+    #            per-user responses, or add those headers to ``CACHE_HEADERS``.
+    # AUTO_ETAG - when True a strong ETag is computed from serialized GET responses,
+    #             matching If-None-Match requests get a 304 without the body.
+    # COMPRESSION_THRESHOLD - response bodies larger than this (in bytes) are compressed
+    #                         when the client accepts gzip or deflate, streamed responses
+    #                         are always compressed.  ``None`` disables compression.
+    # COMPRESSION_LEVEL - the zlib compression level (1 fastest - 9 smallest)
+    # OFFLOAD_THRESHOLD - POST/PUT bodies, and responses of methods whose last response
+    #                     was, larger than this (in bytes) are parsed / serialized in a
+    #                     thread of ``OFFLOAD_POOL``.  ``None`` keeps all the work inline.
+    #                     Requests aren't thread-safe: an offloaded ``_parse_body``,
+    #                     ``_format_post`` or ``_format_response`` receives None instead.
+    # OFFLOAD_POOL - the ``txrest.offload.OffloadPool`` used for offloaded work
+    # CONCURRENCY_LIMIT - a ``txrest.limit.ConcurrencyLimit`` for the requests of this
+    #                     resource, requests beyond its queue are answered with a 503.
+    # GLOBAL_CONCURRENCY_LIMIT - a ``txrest.limit.ConcurrencyLimit`` shared by every
+    #                            resource, assign it on ``RestResource`` before resources
+    #                            are created.
+    # DEADLINE - seconds a request may take, when a rest_* method's Deferred hasn't fired
+    #            by then it's cancelled and the client receives a ``DEADLINE_CODE`` error.
+    # METHOD_DEADLINES - a dictionary of http verb -> deadline overriding ``DEADLINE``
+    # DEADLINE_CODE - the http status code of requests that exceeded their deadline
+    # CLOCK - the ``IReactorTime`` provider deadlines are scheduled with, None uses the reactor
+    # SERVER_TIMING - when True the durations of the request phases are sent to the
+    #                 client in a ``Server-Timing`` header (see ``txrest.timing``)
+    # METRICS - a ``txrest.timing.MetricsSink`` that receives the phase timings of every
+    #           finished request.  Methods the resource doesn't allow are recorded as
+    #           ``OTHER_METHOD``, clients can't grow the metrics with made up methods.
+    # PROFILER - a ``txrest.profiler.RequestProfiler``, the requests it samples are profiled
+    #            while their rest_* method and ``_format_response`` run.
+    # TRACEBACK_LOG - a ``txrest.failures.TracebackLog`` that rate limits the tracebacks
+    #                 logged for the same failure (a one line message is still logged
+    #                 for every failure), None logs every traceback.
+    # ACCESS_LOG - a ``txrest.accesslog.AccessLog`` that receives a record of every
+    #              finished request (connection drops are logged there instead of
+    #              the twisted log).
+    STREAM_TYPES = ()
+    PRODUCER_THRESHOLD = 256 * 1024
+    AUTO_ETAG = False
+    COMPRESSION_THRESHOLD = None
+    COMPRESSION_LEVEL = 6
+    OFFLOAD_THRESHOLD = None
+    OFFLOAD_POOL = DEFAULT_POOL
+    CONCURRENCY_LIMIT = None
+    GLOBAL_CONCURRENCY_LIMIT = None
+    DEADLINE = None
+    METHOD_DEADLINES = {}
+    DEADLINE_CODE = GATEWAY_TIMEOUT
+    CLOCK = None
+    SERVER_TIMING = False
+    METRICS = None
+    PROFILER = None
+    TRACEBACK_LOG = DEFAULT_TRACEBACK_LOG
+    ACCESS_LOG = None
+    RESPONSE_CACHE = None
+    CACHE_TTL = None
+    CACHE_NAMESPACE = None
+    CACHE_HEADERS = ()
+    COALESCE = False
+
     def __init__(self, encoding=DEFAULT_ENCODING, *args, **kwargs):
         """
         :param encoding: (optional) string encoding to use for requests and responses.
@@ -113,6 +472,58 @@ class RestResource(resource.Resource, object):
                 raise ValueError(
                     '%s must implement the class attribute %s' % (self.__class__.__name__, attr))
 
+        # bind the handlers once, ``render()`` only does a dictionary lookup.
+        self._dispatch = self._dispatch_table()
+        self._handlers = {}
+        for verb, meth_name in self._dispatch.handlers:
+            self._handlers[verb] = (meth_name, getattr(self, meth_name, None))
+        self._fallback = (REST_METHOD, getattr(self, REST_METHOD, None))
+        self._validators = {}
+        for verb, names in self._dispatch.validators:
+            self._validators[verb] = tuple(getattr(self, name) if name else None for name in names)
+        self._inflight = {}  # coalesced GET requests, cache key -> ``txrest.coalesce.Flight``
+        self._response_sizes = {}  # method name -> size of its last serialized response
+        self._timed = self.SERVER_TIMING or self.METRICS is not None
+        self._limits = tuple(limit for limit in (self.CONCURRENCY_LIMIT, self.GLOBAL_CONCURRENCY_LIMIT)
+                             if limit is not None)
+        self._response_headers = (
+            (b'accept', self.ACCEPT),
+            (b'content-type', self.CONTENT_TYPE % self.encoding),
+        )
+
+    @classmethod
+    def _dispatch_table(cls):
+        """
+        Return the ``DispatchTable`` for this class, building it on first use.
+
+        The table is stored in the class ``__dict__`` so subclasses never
+        share (or inherit) the table of their parent.
+        """
+        table = cls.__dict__.get('_rest_dispatch')
+        if table is None:
+            handlers = {}
+            validators = {}
+            for name in dir(cls):
+                for prefix, index in ((ETAG_METHOD_PREFIX, 0), (LAST_MODIFIED_METHOD_PREFIX, 1)):
+                    verb = name[len(prefix):]
+                    if name.startswith(prefix) and verb:
+                        names = validators.setdefault(verb, [None, None])
+                        names[index] = name
+                verb = name[len(REST_METHOD_PREFIX):]
+                if name.startswith(REST_METHOD_PREFIX) and verb:
+                    handlers[verb] = name
+            # a ``_format_post`` defined closer to the class than ``_parse_body``
+            # (a subclass override) must still receive the whole body.
+            table = DispatchTable(
+                cls.__module__ + '.' + cls.__name__,
+                sorted(handlers.items()),
+                cls._compute_allowed_methods(),
+                _defined_at(cls, '_parse_body') <= _defined_at(cls, '_format_post'),
+                sorted((verb, tuple(names)) for verb, names in validators.items()),
+                _file_path(cls))
+            cls._rest_dispatch = table
+        return table
+
     def render_HEAD(self, request):
         """
         The default behavior of HEAD for a REST api is to return an empty
@@ -133,17 +544,40 @@ class RestResource(resource.Resource, object):
         
         :param request: a ``twisted.web.server.Request`` instance
         """
-        # set json content type for response
-        request.started = time.time()
-        request.recursion = 0
-        request.setHeader(b'accept', self.ACCEPT)  # THIS GETS SET FROM SUPER CLASS
-        request.setHeader(b'content-type', self.CONTENT_TYPE % self.encoding)
-        fq_name = self.__module__ + '.' + self.__class__.__name__
-        meth_name = REST_METHOD_PREFIX + str(request.method)
-        method = getattr(self, meth_name, None)
+        if getattr(request, 'recursion', None) is None:
+            # the first resource to render the request sets up its state, a
+            # resource returned by a rest_* method (see ``_render_nested``) keeps it.
+            request.started = time.time()
+            request.recursion = 0
+            request.deadline_exceeded = False
+            if self.ACCESS_LOG is not None:
+                request.notifyFinish().addBoth(self._log_access, request, request.started)
+            if self._timed:
+                request.timer = PhaseTimer()
+                request.notifyFinish().addBoth(self._on_finished, request)
+                if self.METRICS is not None:
+                    # the method is part of the metrics key, don't let clients make up new ones
+                    if request.method in self._dispatch.allowed_methods:
+                        request.metrics_method = request.method
+                    else:
+                        request.metrics_method = OTHER_METHOD
+                    self.METRICS.started(self._dispatch.fq_name, request.metrics_method)
+            else:
+                request.timer = None
+            request.rest_headers = None
+        elif request.timer is not None:
+            request.timer.end('resource')  # rendering a resource returned by a rest_* method
+        timer = request.timer
+        request.rest_resource = self._dispatch.fq_name
+        if request.rest_headers != self._response_headers:
+            # set json content type for response
+            for name, value in self._response_headers:
+                request.setHeader(name, value)  # THESE GET SET FROM SUPER CLASS
+            request.rest_headers = self._response_headers
+
+        meth_name, method = self._handlers.get(request.method, self._fallback)
         if not method:
-            meth_name = REST_METHOD
-            method = getattr(self, meth_name, None)
+            meth_name, method = self._fallback
         if not method:
             # if the method requested doesn't exist we must respond to the client
             # with an exception that will fill out the proper header to conform
@@ -155,49 +589,378 @@ class RestResource(resource.Resource, object):
             raise UnsupportedMethod(allowed_methods)  # ``twisted.web.server.Request`` handles this
 
         if not callable(method):
-            err = "Resource (`%s.%s()`) is not callable" % (fq_name, meth_name)
+            err = "Resource (`%s.%s()`) is not callable" % (self._dispatch.fq_name, meth_name)
             log.err(err)
             return self.ERROR_CLASS(INTERNAL_SERVER_ERROR, 'Resource Error', err, is_logged=False).render(request)
 
         request.method_called = meth_name
+        request.profile = None  # sampled by ``_call``, once the rest_* method is called
 
+        # --- CONDITIONAL GET -------------------------------------------------
+        validators = self._validators.get(request.method)
+        if validators is not None:
+            try:
+                not_modified = self._not_modified(request, validators)
+            except Exception:
+                self.on_failure(failure.Failure(), request)
+                return server.NOT_DONE_YET
+            if not_modified:
+                # the client has the current version, don't run the handler.
+                request.finish()
+                return server.NOT_DONE_YET
+
+        # --- RESPONSE CACHE / COALESCING -------------------------------------
+        request.cache_key = None
+        flight_key = None
+        if request.method == 'GET' and (self.RESPONSE_CACHE is not None or self.COALESCE):
+            key = self._cache_key(request)
+            if self.RESPONSE_CACHE is not None:
+                cached = self.RESPONSE_CACHE.get(key)
+                if cached is not None:
+                    self.on_response(cached, request)
+                    return server.NOT_DONE_YET
+                # ``on_response`` stores the serialized response under this key
+                request.cache_key = key
+            if self.COALESCE:
+                flight = self._inflight.get(key)
+                if flight is not None:
+                    # an identical request is already being handled, wait for it.
+                    self._add_callbacks(flight.join(), request)
+                    return server.NOT_DONE_YET
+                flight_key = key
+
+        # --- CONCURRENCY LIMITS ----------------------------------------------
+        limits = self._limits
+        if limits:
+            try:
+                admitted = acquire_all(limits)
+            except LimitExceeded as e:
+                return self._overloaded(request, e)
+            if admitted is not None:
+                # wait in the queue for a slot, the client may give up meanwhile.
+                admitted.addCallbacks(self._on_admitted, self._on_rejected,
+                                      callbackArgs=(method, request, flight_key, limits),
+                                      errbackArgs=(request,))
+                request.notifyFinish().addErrback(lambda _: admitted.cancel())
+                return server.NOT_DONE_YET
+            request.notifyFinish().addBoth(lambda _: release_all(limits))
+
+        return self._handle(method, request, flight_key)
+
+    def _handle(self, method, request, flight_key=None):
+        """
+        Parse the body of ``request`` and call the rest_* ``method``
+
+        :returns: ``NOT_DONE_YET`` or the bytes of an error page
+        """
         # --- HANDLE POST BODY ------------------------------------------------
         call_args = [request]
-        body = None
         if request.method in ('POST', 'PUT'):
             # this is where we very carefully do the automatic handling
-            # of post/put bodies.  We call the function that should be 
-            # implemented to parse the content.
+            # of post/put bodies.  Large bodies are parsed in a thread, the
+            # rest_* method is called on the reactor once they are parsed.
+            if self.OFFLOAD_THRESHOLD is not None and body_size(request.content) > self.OFFLOAD_THRESHOLD:
+                # the thread only receives plain data, requests aren't thread-safe
+                if request.timer is not None:
+                    request.timer.begin('parse')
+                df = self.OFFLOAD_POOL.run(
+                    self._decode_body, None, request.content, request.getHeader(b'content-encoding'))
+                df.addCallbacks(self._on_body, self._on_body_failure,
+                                callbackArgs=(method, request), errbackArgs=(request,))
+                return server.NOT_DONE_YET
             try:
-                body = request.content.read()
+                body_data = self._read_body(request)
             except Exception as e:
-                err = 'Failed reading HTTP BODY\n' + traceback.format_exc()
-                log.err(err)
-                return self.ERROR_CLASS(BAD_REQUEST, 'Malformed HTTP BODY', err, is_logged=False).render(request)
+                return self._body_error(request)
+
+            call_args.append(body_data)
+
+        self._call(method, call_args, request, flight_key)
+
+        # return NOT_DONE_YET so the client connection isn't automatically closed.
+        # this means we have to call request.finish() ourselves, which we'll do
+        # in the ``on_response``, or ``on_failure`` methods.
+        return server.NOT_DONE_YET
+
+    def _on_admitted(self, _, method, request, flight_key, limits):
+        """
+        Callback for a request that waited for a slot of its concurrency limits.
+        """
+        if request.finished or request_closed(request):
+            release_all(limits)
+            return
+        request.notifyFinish().addBoth(lambda _: release_all(limits))
+        rstr = self._handle(method, request, flight_key)
+        if rstr is not server.NOT_DONE_YET:
+            request.write(rstr)
+            request.finish()
+
+    def _on_rejected(self, fail, request):
+        """
+        Errback for a request that wasn't admitted by its concurrency limits.
+        """
+        if fail.check(CancelledError) or request.finished or request_closed(request):
+            return  # the client went away while waiting
+        fail.trap(LimitExceeded)
+        request.write(self._overloaded(request, fail.value))
+        request.finish()
+
+    def _overloaded(self, request, exc):
+        """
+        Return the rendered 503 error page for a request rejected by a concurrency limit.
+        """
+        request.setHeader(b'retry-after', intToBytes(int(exc.retry_after)))
+        return self.ERROR_CLASS(
+            SERVICE_UNAVAILABLE, 'Service Unavailable', 'Resource (%s) is overloaded: %s' % (
+                self._dispatch.fq_name, exc), is_logged=False).render(request)
+
+    def _read_body(self, request):
+        """
+        Parse the POST/PUT body of ``request`` into the object passed to the rest_* method.
+
+        We call the function that should be implemented to parse the content.
+        ``_parse_body`` consumes the body file in chunks, unless the subclass
+        only customized ``_format_post``; then the body is read and passed to it.
+        """
+        return self._decode_body(request, request.content, request.getHeader(b'content-encoding'),
+                                 request.timer)
+
+    def _decode_body(self, request, content, content_encoding, timer=None):
+        """
+        Decompress and parse the body ``content``, see ``_read_body``.
+
+        Large bodies are decoded in a thread of ``OFFLOAD_POOL``, ``request`` and
+        ``timer`` are None there.
+
+        :param content: the file-like body
+        :param content_encoding: the value of the Content-Encoding header, or None
+        """
+        if timer is not None:
+            timer.begin('read')
+        if content_encoding and content_encoding.strip().lower() != b'identity':
+            content = decompress_body(content, content_encoding)
+        if self._dispatch.parse_body:
+            if timer is not None:
+                timer.end('read')
+                timer.begin('parse')
+            body_data = self._parse_body(request, content, self.encoding)
+        else:
+            body = content.read()
+            if timer is not None:
+                timer.end('read')
+                timer.begin('parse')
+            body_data = self._format_post(request, body, self.encoding)
+        if timer is not None:
+            timer.end('parse')
+        return body_data
+
+    def _body_error(self, request, fail=None):
+        """
+        Log a body that failed to parse and return the rendered 400 error page.
+        """
+        if fail is None:
+            fail = failure.Failure()
+        err = 'Failed parsing HTTP BODY'
+        tb = self._log_failure(request, err, fail)
+        if display_tracebacks(request):
+            err = '%s\n%s' % (err, tb or fail.getTraceback())
+        return self.ERROR_CLASS(BAD_REQUEST, 'Malformed HTTP BODY', err, is_logged=False).render(request)
+
+    def _log_failure(self, request, message, fail):
+        """
+        Log ``message`` and the traceback of ``fail``.  When ``TRACEBACK_LOG``
+        logged the same failure less than its interval ago only a line with the
+        request and the exception is logged.
+
+        :returns: the formatted traceback, None when it wasn't logged
+        """
+        tracebacks = self.TRACEBACK_LOG
+        if tracebacks is not None:
+            skipped = tracebacks.admit(failure_signature(
+                fail, self._dispatch.fq_name, getattr(request, 'method_called', None)))
+            if skipped is None:
+                log.msg('%s %s: %s: %s (traceback already logged)' % (
+                    request.method, request.uri, qual(fail.type), fail.getErrorMessage()), isError=True)
+                return None
+            if skipped:
+                message = '%s (%i identical failures not logged)' % (message, skipped)
+        tb = fail.getTraceback()
+        log.err('%s\n%s' % (message, tb))
+        return tb
+
+    def _on_body(self, body_data, method, request):
+        """
+        Callback for a body parsed in the offload pool.
+        """
+        if request.timer is not None:
+            request.timer.end('parse')
+        if request_closed(request):
+            return
+        self._call(method, [request, body_data], request, None)
+
+    def _on_body_failure(self, fail, request):
+        """
+        Errback for a body that failed to parse in the offload pool.
+        """
+        if request.timer is not None:
+            request.timer.end('parse')
+        rstr = self._body_error(request, fail)
+        if request.finished or request_closed(request):
+            return
+        request.write(rstr)
+        request.finish()
 
+    def _call(self, method, call_args, request, flight_key=None):
+        """
+        Call the rest_* ``method`` and respond to ``request`` with its result.
+        """
+        # -- Synchronous Fast Path --------------------------------------------
+        # most handlers return a plain value, there is no reason to allocate
+        # a Deferred (and its callback chain) for them.  Errors are routed
+        # through ``on_failure`` exactly as they would be by ``maybeDeferred``
+        if request.timer is not None:
+            request.timer.begin('handler')
+        profile = None
+        if self.PROFILER is not None:
+            profile = request.profile = self.PROFILER.sample(request)
+            if profile is not None:
+                request.notifyFinish().addBoth(self._on_profiled, request)
+        try:
+            if profile is not None:
+                profile.enable()
             try:
-                body_data = self._format_post(request, body, self.encoding)
-            except Exception as e:
-                err = 'Failed parsing HTTP BODY\n' + traceback.format_exc()
-                log.err(err)
-                return self.ERROR_CLASS(BAD_REQUEST, 'Malformed HTTP BODY', err, is_logged=False).render(request)
+                result = method(*call_args)
+            finally:
+                if profile is not None:
+                    profile.disable()
+        except:
+            self.on_failure(failure.Failure(), request)
+            return
 
-            call_args.append(body_data)
+        if not isinstance(result, Deferred):
+            if isinstance(result, failure.Failure):
+                self.on_failure(result, request)
+                return
+            try:
+                self.on_response(result, request)
+            except:
+                self.on_failure(failure.Failure(), request)
+            return
 
         # -- Setup Response Callbacks -----------------------------------------
-        # wrap the response in a maybeDeferred so we only
-        # have one code path to deal with.
-        df = maybeDeferred(method, *call_args)
+        df = result
+        if flight_key is not None:
+            # identical requests that arrive before this one is done share the result
+            df = self._share(flight_key, df, request)
+        self._add_callbacks(df, request)
+
+    def _add_callbacks(self, df, request):
+        """
+        Respond to ``request`` when the Deferred ``df`` from a rest_* method fires.
+        """
+        deadline = self.METHOD_DEADLINES.get(request.method, self.DEADLINE)
+        if deadline is not None:
+            self._set_deadline(df, request, deadline)
         df.addCallback(self.on_response, request)
         df.addErrback(self.on_failure, request)
 
         # add a callback to be notified of early-connection-termination
         request.notifyFinish().addErrback(self.on_connection_closed, df, request)
 
-        # return NOT_DONE_YET so the client connection isn't automatically closed.
-        # this means we have to call request.finish() ourselves, which we'll do
-        # in the ``on_response``, or ``on_failure`` methods.
-        return server.NOT_DONE_YET
+    def _set_deadline(self, df, request, deadline):
+        """
+        Cancel ``df`` (and the work chained to it) when ``request`` is still
+        waiting for it ``deadline`` seconds after the request started.
+        """
+        clock = self.CLOCK if self.CLOCK is not None else get_reactor()
+
+        def expire():
+            request.deadline_exceeded = True
+            df.cancel()  # ``on_failure`` responds with ``DEADLINE_CODE``
+
+        def clear(result):
+            if timer.active():
+                timer.cancel()
+            return result
+
+        timer = clock.callLater(max(0, deadline - (time.time() - request.started)), expire)
+        df.addBoth(clear)
+
+    def _share(self, key, df, request):
+        """
+        Make the pending handler Deferred ``df`` available to identical requests.
+
+        The response is serialized once (with ``request``) and every waiting
+        request receives the same ``SerializedResponse``.
+
+        :returns: a Deferred for ``request``, cancelling it doesn't cancel
+                  the shared work while other requests are still waiting.
+        """
+        def land(result):
+            self._inflight.pop(key, None)
+            return result
+
+        df.addCallback(self._serialize_shared, request)
+        if df.called:
+            # it fired already (``defer.succeed``, an ``inlineCallbacks`` method that
+            # didn't wait on anything), no other request can join it.
+            return df
+        df.addBoth(land)
+        flight = self._inflight[key] = Flight(df)
+        return flight.join()
+
+    def _serialize_shared(self, response, request):
+        """
+        Serialize a response that's shared by coalesced requests.
+
+        A generator or iterator can only be consumed once, it's serialized in
+        full (as ``_format_stream`` would stream it) instead of being streamed.
+        Anything else that isn't a ``HANDLE_TYPES`` instance, or that fails to
+        serialize, is passed through so ``on_response`` handles it for each
+        request as usual.
+        """
+        if self.STREAM_TYPES and isinstance(response, self.STREAM_TYPES):
+            if request.timer is not None:
+                request.timer.end('handler')
+                request.timer.begin('serialize')
+            try:
+                rstr = b''.join(self._format_stream(request, response, self.encoding))
+            except Exception:
+                if request.timer is not None:
+                    request.timer.end('serialize')
+                return failure.Failure()  # every waiting request responds with the error
+            return self._serialized(request, rstr)
+        if not isinstance(response, self.HANDLE_TYPES):
+            return response
+        if request.timer is not None:
+            request.timer.end('handler')
+            request.timer.begin('serialize')
+        if self._offload_response(request):
+            df = self.OFFLOAD_POOL.run(self._format_response, None, response, self.encoding)
+            df.addCallbacks(lambda rstr: self._serialized(request, rstr), lambda fail: response)
+            return df
+        try:
+            rstr = self._format_response(request, response, self.encoding)
+        except Exception:
+            return response
+        return self._serialized(request, rstr)
+
+    def _serialized(self, request, rstr):
+        """
+        Return a ``SerializedResponse`` for the body ``rstr`` of ``request``
+        and store it in the response cache when the request is cacheable.
+        """
+        if self.OFFLOAD_THRESHOLD is not None:
+            self._response_sizes[request.method_called] = len(rstr)
+        if request.timer is not None:
+            request.timer.end('serialize')
+        headers = tuple((name, values) for name, values in request.responseHeaders.getAllRawHeaders()
+                        if name.lower() not in UNSHARED_HEADERS)
+        serialized = SerializedResponse(
+            rstr, request.responseHeaders.getRawHeaders(b'content-type')[0], request.code, headers)
+        if request.cache_key is not None and request.code == OK:
+            self.RESPONSE_CACHE.set(request.cache_key, serialized, len(rstr), self.CACHE_TTL)
+        return serialized
 
     def on_response(self, response, request):
         """
@@ -211,33 +974,62 @@ class RestResource(resource.Resource, object):
         """
         # handle succesful completion of http request
         # def render(self, resrc):
-        if request.finished:
+        timer = request.timer
+        if timer is not None:
+            timer.end('handler')
+        if request.finished or request_closed(request):
             # the request has already finished.  Most likely because the
             # client closed the connection early. Don't REPLY
             return
 
-        fq_name = self.__module__ + '.' + self.__class__.__name__
+        fq_name = self._dispatch.fq_name
 
-        if isinstance(response, self.HANDLE_TYPES):
+        if isinstance(response, SerializedResponse):
+            # the response was serialized already (from the cache, or shared
+            # by a coalesced request)
+            if response.code != OK:
+                request.setResponseCode(response.code)
+            for name, values in response.headers:
+                request.responseHeaders.setRawHeaders(name, values)
+            request.setHeader(b'content-type', response.content_type)
+            self._write_validated(request, response.body, response)
+
+        elif isinstance(response, self.HANDLE_TYPES):
+            if timer is not None:
+                timer.begin('serialize')
+            if self._offload_response(request):
+                # the last response of this method was large, serialize in a thread.
+                df = self.OFFLOAD_POOL.run(self._format_response, None, response, self.encoding)
+                df.addCallbacks(self._on_formatted, self._on_format_failure,
+                                callbackArgs=(request,), errbackArgs=(request,))
+                return
             # Check to see that our subclass has 
+            profile = request.profile
             try:
                 # convert the response from a dictionary to a json string (encoded as utf-8)
                 # note that this will handle unicode strings within the dict properly.
-                rstr = self._format_response(request, response, self.encoding)
+                if profile is not None:
+                    profile.enable()
+                try:
+                    rstr = self._format_response(request, response, self.encoding)
+                finally:
+                    if profile is not None:
+                        profile.disable()
             except Exception as e:
                 # handle the exception.
-                debug = 'Resource: (%s) [%s] Output serialization failed\n%s' % (
-                    fq_name, request.method_called, traceback.format_exc())
-                log.err(debug)
-                rstr = self.ERROR_CLASS(
-                    INTERNAL_SERVER_ERROR, 'Resource Error', debug, is_logged=False).render(request)
-            # in this case we know the content-length of the reply, so set
-            # the header so the response encoding doesn't become "chunked"
-            request.setHeader(b'content-length', intToBytes(len(rstr)))
-            request.write(rstr)
-            # if we don't call finish the connection will be left open and the
-            # response buffer won't be sent/flushed!
-            request.finish()
+                self._on_format_failure(failure.Failure(), request)
+            else:
+                self._on_formatted(rstr, request)
+
+        elif self.STREAM_TYPES and isinstance(response, self.STREAM_TYPES):
+            # the rest method returned a generator / iterator, the body is
+            # encoded incrementally and written as it is produced.
+            chunks = self._format_stream(request, response, self.encoding)
+            coding = self._negotiate_coding(request)
+            if coding is not None:
+                request.setHeader(b'content-encoding', coding)
+                chunks = compress_stream(chunks, coding, self.COMPRESSION_LEVEL)
+            self._write_stream(request, chunks)
 
         elif isinstance(response, resource.Resource):
             # if the application returns a resource, render the resource... or 
@@ -251,8 +1043,7 @@ class RestResource(resource.Resource, object):
                     depth, request.uri, fq_name))
                 request.processingFailed(failure.Failure(exc))  # this will finish the request
             else:
-                request.recursion += 1
-                reactor.callLater(0, request.render, response)
+                self._render_nested(request, response)
 
         else:
             # If the response from the rest method isn't a serializable type, or resource
@@ -266,6 +1057,66 @@ class RestResource(resource.Resource, object):
             request.write(response)
             request.finish()
 
+    def _render_nested(self, request, response):
+        """
+        Render the Resource ``response`` returned by a rest_* method right away,
+        in the same call stack (``RECURSION_DEPTH`` bounds its depth).
+        """
+        timer = request.timer
+        if timer is not None:
+            timer.begin('resource')
+        request.recursion += 1
+        try:
+            # ``Request.render`` writes the body and handles UnsupportedMethod
+            request.render(response)
+        except Exception:
+            # what ``twisted.web.server.Request.process`` does for the outer resource
+            if not request.finished and not request_closed(request):
+                request.processingFailed(failure.Failure())
+            else:
+                log.err(None, 'Resource (%s) [%s] failed rendering %r' % (
+                    self._dispatch.fq_name, request.method_called, response))
+
+    def _offload_response(self, request):
+        """
+        Return True when the response of ``request`` should be serialized in
+        the offload pool.  The size of a response isn't known until it has been
+        serialized, the size of the last response of the same method is used.
+        """
+        threshold = self.OFFLOAD_THRESHOLD
+        return threshold is not None and self._response_sizes.get(request.method_called, 0) > threshold
+
+    def _on_formatted(self, rstr, request):
+        """
+        Write a response body serialized by ``_format_response``
+        """
+        if request.timer is not None:
+            request.timer.end('serialize')
+        if request.finished or request_closed(request):
+            return
+        serialized = None
+        if request.cache_key is not None:
+            serialized = self._serialized(request, rstr)
+        elif self.OFFLOAD_THRESHOLD is not None:
+            self._response_sizes[request.method_called] = len(rstr)
+        self._write_validated(request, rstr, serialized)
+
+    def _on_format_failure(self, fail, request):
+        """
+        Respond with an error when ``_format_response`` raised an exception.
+        """
+        if request.timer is not None:
+            request.timer.end('serialize')
+        debug = 'Resource: (%s) [%s] Output serialization failed' % (self._dispatch.fq_name, request.method_called)
+        tb = self._log_failure(request, debug, fail)
+        if request.finished or request_closed(request):
+            return
+        if display_tracebacks(request):
+            debug = '%s\n%s' % (debug, tb or fail.getTraceback())
+        rstr = self.ERROR_CLASS(
+            INTERNAL_SERVER_ERROR, 'Resource Error', debug, is_logged=False).render(request)
+        self._write_body(request, rstr)
+
     def on_failure(self, failure, request):
         """
         Handle exceptions raised during RestResource processing
@@ -273,15 +1124,30 @@ class RestResource(resource.Resource, object):
         :param failure: ``twisted.python.failure.Failure`` instance
         :param request: ``twisted.web.server.Request`` instance
         """
-        fq_name = self.__module__ + '.' + self.__class__.__name__
-        file_path = abspath(inspect.getfile(self.__class__))
+        fq_name = self._dispatch.fq_name
+        file_path = self._dispatch.file_path
+        if request.timer is not None:
+            request.timer.end('handler')
+        if self.METRICS is not None and not request_closed(request):
+            # a disconnect (the CancelledError of ``on_connection_closed``) is counted there
+            self.METRICS.failed(fq_name, request.metrics_method, failure)
 
-        if failure.check(CancelledError):
+        if failure.check(CancelledError) and request.deadline_exceeded:
+            # the deferred chain was cancelled because the deadline expired.
+            err = 'Resource (%s) [%s] exceeded its deadline after %s secs' % (
+                fq_name, request.method_called, round(time.time() - request.started, 4))
+            log.msg(err)
+            rstr = self.ERROR_CLASS(self.DEADLINE_CODE, 'Deadline Exceeded', err, is_logged=False).render(request)
+        elif failure.check(CancelledError):
             # the request / deferred chain has been cancelled early.
             # doesn't matter if we respond no one is listening.
             rstr = err = 'Request was cancelled'
+        elif failure.check(LimitExceeded):
+            # the rest_* method shed the request (a full ``txrest.mixin.ProcessPool`` queue)
+            if request.finished or request_closed(request):
+                return
+            rstr = self._overloaded(request, failure.value)
         elif failure.check(_DefGen_Return):
-            failure.printBriefTraceback()
             err = dedent('''
                 Received a Deferred Generator Response from Resource (%s)
                 in the method:  [%s] ....................................
@@ -293,7 +1159,7 @@ class RestResource(resource.Resource, object):
                 `return` statement and remove `defer.returnValue()`
             ''' % (fq_name, request.method_called, file_path)).strip()
 
-            log.err(err + ' - ' + failure.getErrorMessage())
+            self._log_failure(request, err + ' - ' + failure.getErrorMessage(), failure)
             rstr = self.ERROR_CLASS(
                 INTERNAL_SERVER_ERROR,
                 err,
@@ -301,18 +1167,14 @@ class RestResource(resource.Resource, object):
                 is_logged=False
             ).render(request)
         else:
-            log.err('Exception in Resource (%s) [%s] <%s> - %s' % (
-                fq_name, request.method_called, file_path, failure.getErrorMessage()))
-            failure.printTraceback()
-            rstr = self.ERROR_CLASS(
-                INTERNAL_SERVER_ERROR,
-                'Unhandled Error',
-                'Exception in Resource (%s) [%s] <%s> - %s' % (
-                    fq_name, request.method_called, file_path, failure.getTraceback()),
-                is_logged=False
-            ).render(request)
+            err = 'Exception in Resource (%s) [%s] <%s>' % (fq_name, request.method_called, file_path)
+            tb = self._log_failure(request, '%s - %s' % (err, failure.getErrorMessage()), failure)
+            if display_tracebacks(request):
+                # the detail is only formatted when the client is shown it
+                err = '%s - %s' % (err, tb or failure.getTraceback())
+            rstr = self.ERROR_CLASS(INTERNAL_SERVER_ERROR, 'Unhandled Error', err, is_logged=False).render(request)
 
-        if request.finished:
+        if request.finished or request_closed(request):
             return
 
         request.write(rstr)
@@ -329,28 +1191,263 @@ class RestResource(resource.Resource, object):
                                    ConnectionLost     (we lost connection [not cleanly])
                                    ConnectionAborted  (we did it - too many connections?)
         """
-        duration = round(time.time() - request.started, 4)
-        if reason.check(ConnectionDone):
-            # the client got sick of waiting on us and closed the connection
-            log.msg('client hung up after %s secs' % duration)
-        elif reason.check(ConnectionLost):
-            log.msg('lost connection after %s secs' % duration)
-        elif reason.check(ConnectionAborted):
-            log.msg('server aborted connection after %s secs' % duration)
+        if self.METRICS is not None:
+            self.METRICS.disconnected(self._dispatch.fq_name, request.metrics_method)
+        if self.ACCESS_LOG is None:
+            # otherwise the access log records the disconnect
+            duration = round(time.time() - request.started, 4)
+            if reason.check(ConnectionDone):
+                # the client got sick of waiting on us and closed the connection
+                log.msg('client hung up after %s secs' % duration)
+            elif reason.check(ConnectionLost):
+                log.msg('lost connection after %s secs' % duration)
+            elif reason.check(ConnectionAborted):
+                log.msg('server aborted connection after %s secs' % duration)
 
         deferred.cancel()  # cancel queued operations (this will trigger self.on_failure)
 
+    def _cache_key(self, request):
+        """
+        Return the response cache key for a GET request.
+
+        The key is made of the resource (see ``_cache_owner``), the request path,
+        the query arguments and the values of the headers named in ``CACHE_HEADERS``.
+        """
+        args = request.args
+        return (
+            self._cache_owner(),
+            request.path,
+            tuple(sorted((name, tuple(args[name])) for name in args)) if args else (),
+            tuple(request.getHeader(name) for name in self.CACHE_HEADERS),
+        )
+
+    def invalidate_cache(self, path=None):
+        """
+        Drop the cached responses of this resource, typically called from a
+        ``rest_POST`` or ``rest_PUT`` method after the underlying data changed.
+
+        :param path: (optional) only drop the responses for this request path
+        """
+        if self.RESPONSE_CACHE is not None:
+            self.RESPONSE_CACHE.invalidate(self._cache_owner(), path)
+
+    def _cache_owner(self):
+        """
+        Return the owner of the cached responses of this resource: its class and
+        ``CACHE_NAMESPACE``.  Instances created per request (by ``getChild``)
+        share their cached responses.
+        """
+        if self.CACHE_NAMESPACE is None:
+            return self._dispatch.fq_name
+        return (self._dispatch.fq_name, self.CACHE_NAMESPACE)
+
+    def _not_modified(self, request, validators):
+        """
+        Run the ``etag_*`` / ``last_modified_*`` validators of a request.
+
+        Sets the ETag and Last-Modified headers and returns True when the
+        client's cached copy is still valid (the response code is set to 304).
+        The ETag is weak when responses may be compressed, the version is the
+        same for the compressed and the identity representation.
+
+        :param validators: a tuple of the bound etag and last-modified methods
+                           (either can be None)
+        """
+        etag_method, modified_method = validators
+        cached = None
+        if etag_method is not None:
+            version = etag_method(request)
+            if version is not None:
+                etag = b'"%s"' % version
+                if self.COMPRESSION_THRESHOLD is not None:
+                    etag = b'W/' + etag
+                cached = set_etag(request, etag)
+                if request.getHeader(b'if-none-match') is not None:
+                    # If-None-Match takes precedence over If-Modified-Since (RFC 7232)
+                    return cached is http.CACHED
+        if modified_method is not None:
+            when = modified_method(request)
+            if when is not None:
+                cached = request.setLastModified(when)
+        return cached is http.CACHED
+
+    def _write_validated(self, request, rstr, serialized=None):
+        """
+        Write a successfully serialized response body.
+
+        When ``AUTO_ETAG`` is enabled a strong ETag is computed from the body
+        (or taken from ``serialized``) and a 304 is sent instead of the body
+        when it matches the client's If-None-Match header.
+
+        The body is compressed when it's larger than ``COMPRESSION_THRESHOLD``,
+        the compressed bytes of a ``serialized`` response are reused.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param rstr: the serialized body
+        :param serialized: (optional) the ``SerializedResponse`` of the body
+        """
+        coding = self._negotiate_coding(request, len(rstr))
+        if self.AUTO_ETAG and request.code == OK and request.method == 'GET':
+            etag = serialized.etag if serialized is not None else strong_etag(rstr)
+            if coding is not None:
+                # each representation needs its own strong ETag
+                etag = etag[:-1] + b'-' + coding + b'"'
+            if set_etag(request, etag) is http.CACHED:
+                request.finish()
+                return
+        if coding is not None:
+            if serialized is not None:
+                rstr = serialized.encoded(coding, self.COMPRESSION_LEVEL)
+            else:
+                rstr = compress(rstr, coding, self.COMPRESSION_LEVEL)
+            request.setHeader(b'content-encoding', coding)
+        self._write_body(request, rstr)
+
+    def _negotiate_coding(self, request, size=None):
+        """
+        Return the content-coding to compress the response of ``request`` with,
+        or None to send it uncompressed.
+
+        :param size: the size of the body in bytes, None for a streamed body
+        """
+        if self.COMPRESSION_THRESHOLD is None:
+            return None
+        # caches must not serve a compressed body to a client that can't read it
+        add_vary(request, b'Accept-Encoding')
+        if size is not None and size <= self.COMPRESSION_THRESHOLD:
+            return None
+        if request.responseHeaders.hasHeader(b'content-encoding'):
+            return None  # already encoded by the rest_* method
+        return negotiate(request.getHeader(b'accept-encoding'))
+
+    def _write_body(self, request, rstr):
+        """
+        Write a complete response body to the client and finish the request.
+
+        Bodies larger than ``PRODUCER_THRESHOLD`` are written through a
+        ``txrest.producer.ChunkProducer`` so a slow client only ever has one
+        chunk of the body buffered in the transport.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param rstr: the bytes to write
+        """
+        # in this case we know the content-length of the reply, so set
+        # the header so the response encoding doesn't become "chunked"
+        request.setHeader(b'content-length', intToBytes(len(rstr)))
+        self._begin_write(request)
+        if self.PRODUCER_THRESHOLD is None or len(rstr) <= self.PRODUCER_THRESHOLD:
+            request.write(rstr)
+            # if we don't call finish the connection will be left open and the
+            # response buffer won't be sent/flushed!
+            request.finish()
+            return
+        self._produce(request, slices(rstr, STREAM_CHUNK_SIZE))
+
+    def _write_stream(self, request, chunks):
+        """
+        Write an iterable of byte strings to the client one chunk at a time.
+
+        The content-length isn't known up front so the response is sent with
+        chunked transfer encoding.  The chunks are pulled by a producer as the
+        transport drains, so a large stream is never buffered in full.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param chunks: an iterable of bytes
+        """
+        self._begin_write(request)
+        self._produce(request, chunks)
+
+    def _begin_write(self, request):
+        """
+        Start the write phase, the phases up to now are sent in the Server-Timing
+        header when ``SERVER_TIMING`` is enabled.
+        """
+        timer = request.timer
+        if timer is not None:
+            if self.SERVER_TIMING:
+                request.setHeader(b'server-timing', timer.header())
+            timer.begin('write')
+
+    def _on_profiled(self, result, request):
+        """
+        Called when a profiled request is finished (or its connection was lost).
+        """
+        try:
+            self.PROFILER.collect(self._dispatch.fq_name, request.method_called, request.profile)
+        except Exception:
+            log.err(None, 'Resource (%s) [%s] failed collecting the request profile' % (
+                self._dispatch.fq_name, request.method_called))
+
+    def _on_finished(self, result, request):
+        """
+        Called when a timed request is finished (or its connection was lost).
+        """
+        timer = request.timer
+        timer.end('write')
+        if self.METRICS is not None:
+            # no response was sent to a client that disconnected
+            code = None if isinstance(result, failure.Failure) else request.code
+            self.METRICS.record(self._dispatch.fq_name, request.metrics_method, code,
+                                timer.phases, time.time() - timer.started)
+
+    def _log_access(self, result, request, started):
+        """
+        Called when a request is finished (or its connection was lost), adds it to the ``ACCESS_LOG``
+        """
+        disconnect = None
+        if isinstance(result, failure.Failure):
+            disconnect = result.type.__name__
+        self.ACCESS_LOG.log(started, request.rest_resource, request, time.time() - started, disconnect)
+
+    def _produce(self, request, chunks):
+        """
+        Register a producer for ``chunks`` and finish the request when it's done.
+        """
+        fq_name = self._dispatch.fq_name
+
+        def on_done(_):
+            request.finish()
+
+        def on_error(fail):
+            if fail.check(ProducerStopped):
+                # the client hung up, no one is listening.
+                return
+            debug = 'Resource: (%s) [%s] Output stream failed' % (fq_name, request.method_called)
+            tb = self._log_failure(request, debug, fail)
+            if not request.startedWriting:
+                if display_tracebacks(request):
+                    debug = '%s\n%s' % (debug, tb or fail.getTraceback())
+                # nothing has been sent yet, we can still reply with an error.
+                rstr = self.ERROR_CLASS(
+                    INTERNAL_SERVER_ERROR, 'Resource Error', debug, is_logged=False).render(request)
+                request.write(rstr)
+                request.finish()
+            else:
+                # the status line has already been sent, dropping the connection
+                # is the only way to tell the client the body is incomplete.
+                request.loseConnection()
+
+        ChunkProducer(request, chunks).start().addCallbacks(on_done, on_error)
+
     def _allowed_methods(self):
         """
-        Compute allowable http methods to return in an Allowed-Methods header.
+        Allowable http methods to return in an Allowed-Methods header.
         This is to adhere to the HTTP standard.
+
+        The list is computed once per class, see ``_compute_allowed_methods()``
+        """
+        return self._dispatch.allowed_methods
+
+    @classmethod
+    def _compute_allowed_methods(cls):
+        """
+        Compute allowable http methods to return in an Allowed-Methods header.
         """
         allowed_methods = ['HEAD']  # we always allow head
-        fq_name = self.__module__ + '.' + self.__class__.__name__
+        fq_name = cls.__module__ + '.' + cls.__name__
         name = '?'
         try:
-            resource = self
-            for n in prefixedMethodNames(resource.__class__, REST_METHOD_PREFIX):
+            for n in prefixedMethodNames(cls, REST_METHOD_PREFIX):
                 name = n
                 allowed_methods.append(n.encode('ascii'))
         except UnicodeEncodeError:
@@ -369,6 +1466,30 @@ class RestResource(resource.Resource, object):
         """
         raise NotImplementedError()
 
+    def _format_stream(self, request, response, encoding):
+        """
+        Implemented by derived classes to handle a type defined in
+        the class constant ``STREAM_TYPES``.  The return value should
+        be an iterable of bytes objects, each one is written to the
+        client as soon as it is produced.
+        """
+        raise NotImplementedError()
+
+    def _parse_body(self, request, content, encoding):
+        """
+        Parse a POST or PUT body from the file-like object ``content``.
+
+        The default implementation reads the body and passes it to
+        ``_format_post``.  Derived classes can override this to consume the
+        body in chunks of ``BODY_CHUNK_SIZE`` with an incremental parser
+        instead of holding a full copy of it in memory.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param content: a file-like object positioned at the start of the body
+        :param encoding: the desired encoding to decode the body with.
+        """
+        return self._format_post(request, content.read(), encoding)
+
     def _format_post(self, request, body, encoding):
         """
         Implemented by derived classes to handle POST or PUT bodies.
@@ -0,0 +1,202 @@
+"""
+``txrest.accesslog`` module.  A buffered, sampled, structured access log.
+
+Formatting and writing a log line for every request on the reactor thread costs
+throughput.  An ``AccessLog`` only appends a tuple to a bounded buffer when a
+request finishes, a background thread writes the buffer in batches.  Requests
+are sampled per status code, and records that don't fit in a full buffer are
+dropped (and counted) instead of slowing down the server::
+
+    from txrest import RestResource
+    from txrest.accesslog import AccessLog, JsonLinesWriter
+
+    RestResource.ACCESS_LOG = AccessLog(
+        JsonLinesWriter('/var/log/api/access.jsonl'),
+        sample_rates={200: 0.05, '3xx': 0.1},  # every other status is logged
+    )
+
+Every record is an ``AccessRecord``: the time the request started, the resource
+and ``rest_*`` method that handled it, the http method and path, the status,
+the bytes of the body sent, the duration and, when the client went away, the
+reason of the disconnect.
+"""
+from __future__ import absolute_import
+import json
+import random
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+from twisted.python import log
+
+CAPACITY = 10000  # records buffered at most
+BATCH_SIZE = 500  # records written at a time
+FLUSH_INTERVAL = 1.0  # seconds between two writes of a partial batch
+
+
+class AccessRecord(namedtuple('AccessRecord', ('time', 'resource', 'method', 'method_called', 'path',
+                                               'status', 'bytes', 'duration', 'disconnect'))):
+    """
+    One request of the access log.
+    """
+    __slots__ = ()
+
+
+class JsonLinesWriter(object):
+    """
+    Write every record as a line of json, the bytes of a field that aren't
+    valid UTF-8 (a path) are replaced instead of failing the batch.
+    """
+
+    def __init__(self, stream):
+        """
+        :param stream: a file name (opened for appending) or a file-like object
+        """
+        if isinstance(stream, basestring):
+            stream = open(stream, 'a')
+        self.stream = stream
+
+    def __call__(self, records):
+        self.stream.write(''.join(self._line(record) for record in records))
+        self.stream.flush()
+
+    def _line(self, record):
+        fields = record._asdict()
+        try:
+            return json.dumps(fields) + '\n'
+        except (TypeError, ValueError):  # UnicodeDecodeError is a ValueError
+            return json.dumps(OrderedDict(
+                (name, value.decode('utf-8', 'replace') if isinstance(value, bytes) else value)
+                for name, value in fields.items())) + '\n'
+
+
+class AccessLog(object):
+    """
+    Buffer the records of finished requests and write them from a background thread.
+
+    :logged: the records added to the buffer
+    :sampled_out: the requests that weren't sampled
+    :dropped: the records dropped because the buffer was full
+    :written: the records written
+    :failed: the records lost because the writer raised an exception
+    """
+
+    def __init__(self, writer, capacity=CAPACITY, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 sample_rates=None, default_rate=1.0):
+        """
+        :param writer: a callable receiving a list of ``AccessRecord``, called in
+                       the background thread
+        :param capacity: the maximum number of buffered records
+        :param batch_size: the maximum number of records passed to ``writer`` at once
+        :param flush_interval: the seconds a partial batch waits before it's written
+        :param sample_rates: (optional) a dictionary of status code (``200``) or status
+                             class (``'2xx'``) -> the fraction of those requests logged
+        :param default_rate: the fraction of logged requests of other statuses
+        """
+        self.writer = writer
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.default_rate = default_rate
+        self._rates = {}  # status code -> rate
+        self._class_rates = {}  # first digit of the status code -> rate
+        for status, rate in (sample_rates or {}).items():
+            if isinstance(status, basestring):
+                self._class_rates[int(status[0])] = rate
+            else:
+                self._rates[status] = rate
+        self.logged = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._buffer = deque()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+
+    def rate(self, status):
+        """
+        Return the fraction of the requests with ``status`` that are logged.
+        """
+        rate = self._rates.get(status)
+        if rate is None:
+            rate = self._class_rates.get(status // 100, self.default_rate)
+        return rate
+
+    def log(self, started, resource, request, duration, disconnect=None):
+        """
+        Buffer the record of a finished request (called on the reactor thread).
+
+        :param started: the epoch the request started at
+        :param resource: the fully qualified name of the resource class
+        :param request: ``twisted.web.server.Request`` instance
+        :param duration: the seconds the request took
+        :param disconnect: (optional) the reason the client disconnected
+        """
+        status = request.code
+        rate = self.rate(status)
+        if rate < 1.0 and (rate <= 0.0 or random.random() >= rate):
+            self.sampled_out += 1
+            return
+        buffer = self._buffer
+        if len(buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        buffer.append(AccessRecord(
+            started, resource, request.method, getattr(request, 'method_called', None), request.path,
+            status, request.sentLength, duration, disconnect))
+        self.logged += 1
+        if self._thread is None:
+            self.start()
+        elif len(buffer) == self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        """
+        Start the writer thread, it's stopped (and the buffer written) when the reactor shuts down.
+        """
+        from twisted.internet import reactor
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='txrest-access-log')
+        self._thread.daemon = True
+        self._thread.start()
+        reactor.addSystemEventTrigger('after', 'shutdown', self.stop)
+
+    def stop(self):
+        """
+        Write the buffered records and stop the writer thread.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """
+        Write the buffered records, in batches of ``batch_size``
+        """
+        buffer = self._buffer
+        while buffer:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(buffer.popleft())
+            except IndexError:
+                pass
+            try:
+                self.writer(batch)
+            except Exception:
+                self.failed += len(batch)
+                log.err(None, 'AccessLog writer failed, %i records lost' % len(batch))
+            else:
+                self.written += len(batch)
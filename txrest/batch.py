@@ -0,0 +1,285 @@
+"""
+``txrest.batch`` module.  Execute many sub-requests in one HTTP round trip.
+
+A client that makes dozens of small calls pays the latency of a round trip
+(and the HTTP framing) for each of them.  A ``BatchResource`` accepts a JSON
+array of sub-requests, resolves each of them against the site's resource tree
+(``getChildForRequest``, like any request) and renders the resource it finds
+with an in-memory request: nothing goes through a socket or gets HTTP framed.
+The sub-requests run concurrently (up to ``MAX_CONCURRENT`` at a time) and the
+response is a single array, in the order of the sub-requests::
+
+    from txrest.batch import BatchResource
+
+    root.putChild(b'batch', BatchResource())
+
+    POST /batch
+    [{"method": "GET", "path": "/users/1"},
+     {"method": "POST", "path": "/users", "body": {"name": "ben"}}]
+
+    [{"status": 200, "body": {"id": 1, "name": "..."}},
+     {"status": 201, "body": {"id": 2, "name": "ben"}, "headers": {"location": "/users/2"}}]
+
+Each sub-request goes through the full render path of its resource (limits,
+deadlines, caches, metrics and the access log all apply) and carries the
+headers of the batch request (credentials, cookies), except the ones that only
+describe the batch request itself (see ``NOT_FORWARDED``).  A sub-request can
+add its own headers with ``"headers": {"if-none-match": "..."}``.  A ``body``
+that is a string is sent as is, anything else is sent as JSON.
+"""
+from __future__ import absolute_import
+from io import BytesIO
+
+from twisted.internet.defer import Deferred, DeferredSemaphore, gatherResults
+from twisted.internet.error import ConnectionAborted
+from twisted.python import failure, log
+from twisted.web import server
+from twisted.web.http import BAD_REQUEST, REQUEST_ENTITY_TOO_LARGE, parse_qs, unquote
+from twisted.web.resource import getChildForRequest
+
+from txrest import request_closed
+from txrest.json import JsonResource
+
+NOT_FORWARDED = frozenset((
+    b'content-length', b'content-type', b'content-encoding', b'transfer-encoding', b'expect',
+    b'accept-encoding',  # sub-responses are never compressed, the batch response may be
+    b'if-none-match', b'if-modified-since', b'if-match', b'if-unmodified-since', b'range',
+))
+
+
+class _SubChannel(object):
+    """
+    The channel of a sub-request: keeps the response body in memory and drains
+    pull producers right away.
+    """
+    factory = None
+    transport = None  # a sub-request must never touch the connection of the batch
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.body = []
+        self.producer = None
+
+    def getPeer(self):
+        return self.parent.getClientAddress()
+
+    def getHost(self):
+        return self.parent.getHost()
+
+    def isSecure(self):
+        return self.parent.isSecure()
+
+    def writeHeaders(self, version, code, reason, headers):
+        pass  # the status and headers are read from the request
+
+    def write(self, data):
+        self.body.append(data)
+
+    def writeSequence(self, data):
+        self.body.extend(data)
+
+    def registerProducer(self, producer, streaming):
+        self.producer = producer
+        if streaming:
+            return
+        while self.producer is producer:
+            producer.resumeProducing()
+
+    def unregisterProducer(self):
+        self.producer = None
+
+    def requestDone(self, request):
+        pass
+
+
+class _Batch(object):
+    """
+    The sub-requests of one batch request that haven't finished yet.
+    """
+
+    def __init__(self):
+        self.active = set()
+        self.cancelled = False
+
+    def cancel(self, deferred):
+        """
+        Abort the unfinished sub-requests, their resources see a lost connection.
+        """
+        self.cancelled = True
+        reason = failure.Failure(ConnectionAborted('Batch request cancelled'))
+        for sub in list(self.active):
+            if not sub.finished and not request_closed(sub):
+                sub.connectionLost(reason)
+        self.active.clear()
+
+    def respond(self, result, deferred):
+        """
+        Fire ``deferred`` with the results, unless the batch was cancelled (the
+        aborted sub-requests finish while it's being cancelled).
+        """
+        if self.cancelled:
+            return
+        if isinstance(result, failure.Failure):
+            deferred.errback(result)
+        else:
+            deferred.callback(result)
+
+
+class BatchResource(JsonResource):
+    """
+    Accept a JSON array of ``{"method", "path", "body", "headers"}`` sub-requests,
+    render them against the resource tree and respond with the array of their
+    ``{"status", "body", "headers"}`` results.
+
+    Only ``path`` is required, ``method`` defaults to GET.  The body of a JSON
+    sub-response is decoded into the result, other bodies are returned as text.
+
+    ``MAX_REQUESTS`` - the maximum number of sub-requests in a batch (413 above that).
+    ``MAX_CONCURRENT`` - the number of sub-requests of a batch rendered at a time.
+    ``RESPONSE_HEADERS`` - the response headers of a sub-request copied into its result.
+    """
+    isLeaf = True
+    MAX_REQUESTS = 50
+    MAX_CONCURRENT = 8
+    RESPONSE_HEADERS = (b'etag', b'last-modified', b'location', b'retry-after')
+
+    def __init__(self, root=None, *args, **kwargs):
+        """
+        :param root: (optional) the resource the paths of sub-requests are resolved
+                     from, the root resource of the site when omitted.
+        """
+        JsonResource.__init__(self, *args, **kwargs)
+        self.root = root
+
+    def rest_POST(self, request, post):
+        """
+        Validate the sub-requests and render them, ``MAX_CONCURRENT`` at a time.
+        """
+        if not isinstance(post, list):
+            return self.ERROR_CLASS(
+                BAD_REQUEST, 'Invalid Batch', 'The body must be an array of sub-requests', is_logged=False)
+        if len(post) > self.MAX_REQUESTS:
+            return self.ERROR_CLASS(
+                REQUEST_ENTITY_TOO_LARGE, 'Batch Too Large', '%i sub-requests, the maximum is %i' % (
+                    len(post), self.MAX_REQUESTS), is_logged=False)
+        try:
+            subs = [self._sub_request(item) for item in post]
+        except ValueError as e:
+            return self.ERROR_CLASS(BAD_REQUEST, 'Invalid Batch', str(e), is_logged=False)
+
+        root = self.root if self.root is not None else request.site.resource
+        batch = _Batch()
+        semaphore = DeferredSemaphore(self.MAX_CONCURRENT)
+        results = gatherResults([
+            semaphore.run(self._execute, batch, request, root, sub) for sub in subs])
+        # the batch request is cancelled when the client goes away or its deadline expires
+        d = Deferred(batch.cancel)
+        results.addBoth(batch.respond, d)
+        return d
+
+    def _sub_request(self, item):
+        """
+        Validate a sub-request of the batch, return (method, uri, headers, body).
+        """
+        if not isinstance(item, dict) or not isinstance(item.get('path'), basestring):
+            raise ValueError('Every sub-request must be an object with a "path"')
+        path = item['path']
+        method = item.get('method', 'GET')
+        if not path.startswith('/') or not isinstance(method, basestring) or not method.isalpha():
+            raise ValueError('Invalid sub-request %s %s' % (method, path))
+        headers = item.get('headers') or {}
+        if not isinstance(headers, dict):
+            raise ValueError('The "headers" of a sub-request must be an object')
+        headers = [(name.lower().encode('ascii'), unicode(value).encode(self.encoding))
+                   for name, value in headers.items()]
+        body = item.get('body')
+        if body is not None:
+            if isinstance(body, basestring):
+                body = body.encode(self.encoding)
+            else:
+                headers.append((b'content-type', self.CONTENT_TYPE % self.encoding))
+                body = self.codec.dumps(body, self.encoding)
+        return method.upper().encode('ascii'), path.encode(self.encoding), headers, body
+
+    def _execute(self, batch, parent, root, sub):
+        """
+        Render one sub-request, return a Deferred that fires with its result.
+        """
+        if batch.cancelled:
+            return None
+        method, uri, headers, body = sub
+        channel = _SubChannel(parent)
+        request = server.Request(channel, False)
+        request.method = method
+        request.uri = uri
+        request.path, _, query = uri.partition(b'?')
+        request.args = parse_qs(query, 1)
+        request.clientproto = b'HTTP/1.0'  # the body is written as is, never chunked
+        request.content = BytesIO(body or b'')
+        for name, values in parent.requestHeaders.getAllRawHeaders():
+            if name.lower() not in NOT_FORWARDED:
+                request.requestHeaders.setRawHeaders(name, values)
+        for name, value in headers:
+            request.requestHeaders.setRawHeaders(name, [value])
+        if body is not None:
+            request.requestHeaders.setRawHeaders(b'content-length', [str(len(body)).encode('ascii')])
+        request.received_cookies = parent.received_cookies
+        request.site = parent.site
+        request.sitepath = []
+        request.prepath = []
+        request.postpath = list(map(unquote, request.path[1:].split(b'/')))
+
+        batch.active.add(request)
+        d = request.notifyFinish()
+        try:
+            resrc = getChildForRequest(root, request)
+            if isinstance(resrc, BatchResource):
+                resrc = self.ERROR_CLASS(BAD_REQUEST, 'Invalid Batch', 'Batches can not be nested',
+                                         is_logged=False)
+            request.render(resrc)
+        except Exception:
+            if not request.finished and not request_closed(request):
+                request.processingFailed(failure.Failure())
+            else:
+                log.err(None, 'Batch sub-request %s %s failed' % (method, uri))
+        d.addBoth(self._sub_result, batch, request, channel)
+        return d
+
+    def _sub_result(self, result, batch, request, channel):
+        """
+        Return the result of a finished sub-request.
+        """
+        batch.active.discard(request)
+        if isinstance(result, failure.Failure):
+            return None  # the batch was cancelled
+        item = {'status': request.code}
+        body = b''.join(channel.body)
+        if body:
+            try:
+                item['body'] = self._sub_body(request, body)
+            except LookupError as e:  # an unknown charset
+                return {'status': BAD_REQUEST, 'body': {
+                    'code': BAD_REQUEST, 'error': 'Invalid Sub-response', 'detail': str(e)}}
+        headers = {}
+        for name in self.RESPONSE_HEADERS:
+            value = request.responseHeaders.getRawHeaders(name)
+            if value:
+                headers[name] = value[-1]
+        if headers:
+            item['headers'] = headers
+        return item
+
+    def _sub_body(self, request, body):
+        """
+        Decode the body of a sub-response: JSON into an object, anything else into text.
+
+        :raises LookupError: the charset of the sub-response is unknown
+        """
+        content_type = (request.responseHeaders.getRawHeaders(b'content-type') or [b''])[-1]
+        encoding = content_type.partition(b'charset=')[2].strip() or self.encoding
+        if content_type.startswith(b'application/json'):
+            try:
+                return self.codec.loads(body, encoding)
+            except ValueError:
+                pass
+        return body.decode(encoding, 'replace')
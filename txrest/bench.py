@@ -0,0 +1,712 @@
+"""
+``txrest.bench`` module.  Benchmark the render -> serialize -> finish path in process.
+
+Every scenario renders a resource with real ``twisted.web.server.Request``
+objects on a dummy channel (no sockets), so the numbers only contain the cost
+of txrest and twisted.web.  Each scenario runs in its own process to keep the
+peak memory of one scenario (a 50MB body) out of the others::
+
+    txrest-bench --list
+    txrest-bench --filter json-get,xml-post --sizes 100B,1MB
+    txrest-bench --save before.json
+    # upgrade txrest / twisted, or change your code...
+    txrest-bench --save after.json --compare before.json
+    txrest-bench --load after.json --compare before.json
+
+For each scenario the benchmark reports:
+
+:ops/s: requests rendered per second, the best of ``--repeat`` runs
+:alloc: bytes allocated at the peak of one request (tracemalloc), on python 2 the bytes of
+        the objects created by the request that are alive when it finishes (gc)
+:retained: bytes still allocated after the request finished (on python 2, the bytes of the
+           objects created by the request that are still alive)
+:peak: the peak resident memory of the scenario's process
+
+``--compare`` exits with status 1 when a scenario is slower (or allocates
+more) than the baseline by more than ``--tolerance``.
+"""
+from __future__ import absolute_import
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+from io import BytesIO
+from timeit import default_timer
+
+try:
+    import resource as _rusage
+except ImportError:  # windows
+    _rusage = None
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+from twisted.internet import defer
+from twisted.python import failure, log, usage
+from twisted.web import server
+from twisted.web.http import OK, NOT_FOUND, BAD_REQUEST, INTERNAL_SERVER_ERROR, NOT_ALLOWED
+from twisted.internet.address import IPv4Address
+
+from txrest.json import JsonResource
+from txrest.mixin import EmptyPost, FormEncodedPost, StringResponse
+from txrest.xml import XmlResource, etree
+
+SIZES = (
+    ('100B', 100),
+    ('10KB', 10 * 1024),
+    ('1MB', 1024 * 1024),
+    ('50MB', 50 * 1024 * 1024),
+)
+RECORD = {'id': 1234, 'name': 'benchmark record', 'tags': ['a', 'b'], 'value': 0.5}
+RECORD_SIZE = len(json.dumps(RECORD)) + 2  # with the separator
+MIN_TIME = 0.5  # seconds of each timed run
+REPEAT = 3
+MEMORY_SAMPLES = 5
+TOLERANCE = 0.1
+
+
+class BenchmarkError(Exception):
+    """
+    A scenario didn't render the response it was written for.
+    """
+    pass
+
+
+# -- PAYLOADS -----------------------------------------------------------------
+
+def json_payload(size):
+    """
+    Return a list of records that serializes to about ``size`` bytes of json.
+    """
+    return [dict(RECORD, id=i) for i in range(max(1, size // RECORD_SIZE))]
+
+
+def xml_payload(size):
+    """
+    Return an xml element that serializes to about ``size`` bytes.
+    """
+    root = etree.Element('records')
+    record = etree.tostring(_xml_record(root, 0))
+    for i in range(1, max(1, size // len(record))):
+        _xml_record(root, i)
+    return root
+
+
+def _xml_record(parent, i):
+    record = etree.SubElement(parent, 'record', id=str(i))
+    etree.SubElement(record, 'name').text = RECORD['name']
+    etree.SubElement(record, 'value').text = str(RECORD['value'])
+    return record
+
+
+def xml_body(size):
+    return b'<?xml version="1.0"?>' + etree.tostring(xml_payload(size))
+
+
+def json_body(size):
+    return json.dumps(json_payload(size)).encode('utf-8')
+
+
+def form_body(size):
+    return b'&'.join(b'field%i=%s' % (i, b'x' * 32) for i in range(max(1, size // 42)))
+
+
+# -- RESOURCES ----------------------------------------------------------------
+
+class JsonBench(JsonResource):
+    isLeaf = True
+
+    def __init__(self, payload=None):
+        JsonResource.__init__(self)
+        self.payload = payload
+
+    def rest_GET(self, request):
+        return self.payload
+
+    def rest_POST(self, request, post):
+        return {'received': 0 if post is None else len(post)}
+
+
+class JsonDeferred(JsonBench):
+
+    def rest_GET(self, request):
+        return defer.succeed(self.payload)
+
+
+class JsonFailure(JsonBench):
+
+    def rest_GET(self, request):
+        raise ValueError('benchmark failure')
+
+
+class JsonNotFound(JsonBench):
+
+    def rest_GET(self, request):
+        return self.ERROR_CLASS(NOT_FOUND, 'Not Found', 'benchmark not found')
+
+
+class JsonPutOnly(JsonResource):
+    isLeaf = True
+
+    def rest_PUT(self, request, put):
+        return put
+
+
+class JsonNested(JsonBench):
+    """
+    Return a child resource ``depth`` times before the payload.
+    """
+
+    def __init__(self, payload, depth):
+        JsonBench.__init__(self, payload)
+        self.child = JsonBench(payload) if depth <= 1 else JsonNested(payload, depth - 1)
+
+    def rest_GET(self, request):
+        return self.child
+
+
+@EmptyPost.mixin
+class JsonEmptyPost(JsonBench):
+    pass
+
+
+@FormEncodedPost.mixin
+class JsonFormPost(JsonBench):
+    pass
+
+
+@StringResponse.mixin
+class JsonString(JsonBench):
+    pass
+
+
+class XmlBench(XmlResource):
+    isLeaf = True
+
+    def __init__(self, payload=None):
+        XmlResource.__init__(self)
+        self.payload = payload
+
+    def rest_GET(self, request):
+        return self.payload
+
+    def rest_POST(self, request, post):
+        received = etree.Element('received')
+        received.text = str(len(post))
+        return received
+
+
+class XmlFailure(XmlBench):
+
+    def rest_GET(self, request):
+        raise ValueError('benchmark failure')
+
+
+# -- SCENARIOS ----------------------------------------------------------------
+
+PEER = IPv4Address('TCP', '127.0.0.1', 12345)
+HOST = IPv4Address('TCP', '127.0.0.1', 8080)
+
+
+class BenchChannel(object):
+    """
+    The channel (and transport) of a benchmarked request.
+
+    Counts the bytes written instead of keeping them, and drains pull producers
+    right away (a socket would pull one chunk per reactor iteration).
+    """
+    site = None
+    factory = None
+
+    def __init__(self):
+        self.transport = self
+        self.written = 0
+        self.producer = None
+
+    def getPeer(self):
+        return PEER
+
+    def getHost(self):
+        return HOST
+
+    def isSecure(self):
+        return False
+
+    def writeHeaders(self, version, code, reason, headers):
+        lines = [version + b' ' + code + b' ' + reason + b'\r\n']
+        lines.extend(name + b': ' + value + b'\r\n' for name, value in headers)
+        lines.append(b'\r\n')
+        self.write(b''.join(lines))
+
+    def write(self, data):
+        self.written += len(data)
+
+    def writeSequence(self, data):
+        for chunk in data:
+            self.written += len(chunk)
+
+    def registerProducer(self, producer, streaming):
+        self.producer = producer
+        if streaming:
+            return
+        while self.producer is producer:
+            producer.resumeProducing()
+
+    def unregisterProducer(self):
+        self.producer = None
+
+    def requestDone(self, request):
+        pass
+
+    def loseConnection(self):
+        pass
+
+
+class Scenario(object):
+    """
+    One benchmarked request.
+
+    The resource and the body are only built when the scenario runs.
+    """
+
+    def __init__(self, name, build, method=b'GET', body=None, content_type=None, code=OK):
+        """
+        :param name: the name of the scenario
+        :param build: a callable returning the resource to render
+        :param method: the http method of the requests
+        :param body: (optional) a callable returning the body of the requests
+        :param content_type: (optional) the content-type of the requests
+        :param code: the status code the resource must respond with
+        """
+        self.name = name
+        self.build = build
+        self.method = method
+        self.body = body
+        self.content_type = content_type
+        self.code = code
+
+    def setup(self):
+        """
+        Build the resource and the body, return the site to render them with.
+        """
+        self.resource = self.build()
+        self.content = self.body() if self.body is not None else b''
+        self.site = server.Site(self.resource)
+        self.site.displayTracebacks = False
+        return self.site
+
+    def request(self):
+        """
+        Return a new request, ready to render.
+        """
+        channel = BenchChannel()
+        channel.site = self.site
+        request = server.Request(channel)
+        request.site = self.site
+        request.method = self.method
+        request.uri = request.path = b'/bench'
+        request.clientproto = b'HTTP/1.1'
+        request.args = {}
+        request.content = BytesIO(self.content)
+        if self.body is not None:
+            request.requestHeaders.setRawHeaders(b'content-length', [str(len(self.content)).encode('ascii')])
+        if self.content_type is not None:
+            request.requestHeaders.setRawHeaders(b'content-type', [self.content_type])
+        return request
+
+
+def scenarios(sizes=SIZES):
+    """
+    Return the list of every ``Scenario``, with payloads of ``sizes``.
+    """
+    result = []
+    for label, size in sizes:
+        result.extend([
+            Scenario('json-get-%s' % label, lambda size=size: JsonBench(json_payload(size))),
+            Scenario('json-post-%s' % label, JsonBench, b'POST', lambda size=size: json_body(size),
+                     b'application/json'),
+            Scenario('xml-get-%s' % label, lambda size=size: XmlBench(xml_payload(size))),
+            Scenario('xml-post-%s' % label, XmlBench, b'POST', lambda size=size: xml_body(size),
+                     b'application/xml'),
+            Scenario('string-response-%s' % label, lambda size=size: JsonString(json_body(size))),
+            Scenario('form-post-%s' % label, JsonFormPost, b'POST', lambda size=size: form_body(size),
+                     b'application/x-www-form-urlencoded'),
+        ])
+    small = json_payload(100)
+    result.extend([
+        Scenario('json-deferred', lambda: JsonDeferred(small)),
+        Scenario('empty-post', JsonEmptyPost, b'POST', lambda: b'', b'application/json'),
+        Scenario('json-nested-1', lambda: JsonNested(small, 1)),
+        Scenario('json-nested-4', lambda: JsonNested(small, 4)),
+        Scenario('json-error-500', JsonFailure, code=INTERNAL_SERVER_ERROR),
+        Scenario('json-error-400', JsonBench, b'POST', lambda: b'{not json', b'application/json',
+                 code=BAD_REQUEST),
+        Scenario('json-error-404', JsonNotFound, code=NOT_FOUND),
+        Scenario('json-error-405', JsonPutOnly, code=NOT_ALLOWED),
+        Scenario('xml-error-500', XmlFailure, code=INTERNAL_SERVER_ERROR),
+    ])
+    return result
+
+
+# -- MEASURING ----------------------------------------------------------------
+
+def render(resource, request):
+    """
+    Render ``request`` the way ``twisted.web.server.Site`` does, return a
+    Deferred that fires when it's finished or None when it finished synchronously.
+    """
+    request.render(resource)
+    if request.finished:
+        return None
+    return request.notifyFinish()
+
+
+@defer.inlineCallbacks
+def run_requests(scenario, count):
+    """
+    Render ``count`` requests, return the elapsed seconds.
+    """
+    resource = scenario.resource
+    started = default_timer()
+    for _ in range(count):
+        d = render(resource, scenario.request())
+        if d is not None:
+            yield d
+    defer.returnValue(default_timer() - started)
+
+
+@defer.inlineCallbacks
+def measure(scenario, min_time=MIN_TIME, repeat=REPEAT):
+    """
+    Benchmark one scenario, return a dictionary of results.
+    """
+    scenario.setup()
+
+    # check the scenario renders what it's meant to
+    request = scenario.request()
+    d = render(scenario.resource, request)
+    if d is not None:
+        yield d
+    if request.code != scenario.code:
+        raise BenchmarkError('%s responded with %s instead of %s' % (scenario.name, request.code, scenario.code))
+
+    # find a number of requests that takes ``min_time``
+    count = 1
+    while True:
+        elapsed = yield run_requests(scenario, count)
+        if elapsed >= min_time:
+            break
+        count = max(count * 2, int(count * min_time / max(elapsed, 1e-6) * 1.1))
+
+    times = [elapsed]
+    for _ in range(repeat - 1):
+        elapsed = yield run_requests(scenario, count)
+        times.append(elapsed)
+    best = min(times)
+
+    if tracemalloc is not None:
+        memory = 'tracemalloc'
+        alloc, retained = yield measure_memory(scenario)
+    else:
+        memory = 'gc'
+        alloc, retained = yield measure_objects(scenario)
+
+    defer.returnValue({
+        'ops': count / best,
+        'requests': count,
+        'times': times,
+        'memory': memory,
+        'alloc': alloc,
+        'retained': retained,
+        'peak': peak_memory(),
+    })
+
+
+@defer.inlineCallbacks
+def measure_memory(scenario, samples=MEMORY_SAMPLES):
+    """
+    Return the mean bytes allocated at the peak of a request, and still
+    allocated after it finished.
+    """
+    peaks = []
+    retained = []
+    gc.collect()
+    for _ in range(samples):
+        tracemalloc.start()
+        request = scenario.request()
+        d = render(scenario.resource, request)
+        if d is not None:
+            yield d
+        del request, d
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        retained.append(current)
+    defer.returnValue((sum(peaks) // samples, sum(retained) // samples))
+
+
+def _live_objects(exclude=()):
+    """
+    Return a dictionary of id -> size of the objects tracked by the garbage
+    collector, and of the untracked objects (strings, numbers) they refer to.
+    """
+    sizes = {}
+    skip = set(id(obj) for obj in exclude)
+    skip.add(id(sizes))
+    skip.add(id(skip))
+    for obj in gc.get_objects():
+        if id(obj) in sizes or id(obj) in skip:
+            continue
+        sizes[id(obj)] = sys.getsizeof(obj)
+        for ref in gc.get_referents(obj):
+            if not gc.is_tracked(ref) and id(ref) not in sizes:
+                sizes[id(ref)] = sys.getsizeof(ref)
+    return sizes
+
+
+@defer.inlineCallbacks
+def measure_objects(scenario, samples=MEMORY_SAMPLES):
+    """
+    Return the mean bytes of the objects created by a request that are alive
+    when it finishes, and after it was released (python 2 has no tracemalloc).
+    """
+    alive = []
+    retained = []
+    _live_objects()  # the first walk creates a few descriptors of its own
+    for _ in range(samples):
+        gc.collect()
+        before = _live_objects()
+        request = scenario.request()
+        d = render(scenario.resource, request)
+        if d is not None:
+            yield d
+        del d
+        gc.collect()
+        alive.append(_new_bytes(before, _live_objects((before,))))
+        del request
+        gc.collect()
+        retained.append(_new_bytes(before, _live_objects((before,))))
+    defer.returnValue((sum(alive) // samples, sum(retained) // samples))
+
+
+def _new_bytes(before, after):
+    return sum(size for key, size in after.items() if key not in before)
+
+
+def peak_memory():
+    """
+    Return the peak resident memory of this process in bytes, or None.
+    """
+    if _rusage is None:
+        return None
+    peak = _rusage.getrusage(_rusage.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_isolated(name, config):
+    """
+    Benchmark the scenario ``name`` in a new process, return its results.
+    """
+    args = [sys.executable, '-m', 'txrest.bench', '--scenario', name,
+            '--sizes', config['sizes'], '--min-time', str(config['min-time']),
+            '--repeat', str(config['repeat'])]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    process = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, errors = process.communicate()
+    if process.returncode != 0:
+        lines = errors.decode('utf-8', 'replace').strip().splitlines()
+        raise BenchmarkError(lines[-1] if lines else 'exited with status %s' % process.returncode)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+# -- REPORTING ----------------------------------------------------------------
+
+def environment():
+    import twisted
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'twisted': twisted.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def _size(value):
+    if value is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB'):
+        if abs(value) < 1024:
+            return '%.0f%s' % (value, unit)
+        value /= 1024.0
+    return '%.1fGB' % value
+
+
+def report(results, header=True, out=sys.stdout):
+    if header:
+        out.write('%-24s %12s %10s %10s %10s\n' % ('scenario', 'ops/s', 'alloc', 'retained', 'peak'))
+    for name, result in results:
+        if 'error' in result:
+            out.write('%-24s %s\n' % (name, result['error']))
+            continue
+        out.write('%-24s %12.1f %10s %10s %10s\n' % (
+            name, result['ops'], _size(result['alloc']), _size(result['retained']), _size(result['peak'])))
+
+
+def compare(baseline, results, tolerance=TOLERANCE, out=sys.stdout):
+    """
+    Write the changes of ``results`` against ``baseline``, return the names of
+    the scenarios that regressed by more than ``tolerance``.
+    """
+    regressions = []
+    out.write('%-24s %12s %12s %8s %10s %10s\n' % ('scenario', 'base ops/s', 'ops/s', 'change', 'alloc', ''))
+    for name, result in results:
+        base = baseline.get(name)
+        if base is None or 'error' in base or 'error' in result:
+            continue
+        change = result['ops'] / base['ops'] - 1
+        alloc_change = None
+        if base.get('alloc') and result.get('alloc') is not None and base.get('memory') == result.get('memory'):
+            alloc_change = float(result['alloc']) / base['alloc'] - 1
+        regressed = change < -tolerance or (alloc_change is not None and alloc_change > tolerance)
+        if regressed:
+            regressions.append(name)
+        out.write('%-24s %12.1f %12.1f %+7.1f%% %10s %10s\n' % (
+            name, base['ops'], result['ops'], change * 100,
+            '-' if alloc_change is None else '%+.1f%%' % (alloc_change * 100),
+            'REGRESSION' if regressed else ''))
+    return regressions
+
+
+# -- COMMAND LINE -------------------------------------------------------------
+
+class Options(usage.Options):
+    synopsis = 'txrest-bench [options]'
+    longdesc = 'Benchmark rendering txrest resources in process, and compare the results of two runs.'
+    optParameters = [
+        ['filter', 'f', None, 'Only run the scenarios whose name contains one of these (comma separated).'],
+        ['sizes', 's', ','.join(label for label, _ in SIZES), 'The payload sizes (comma separated).'],
+        ['min-time', 't', MIN_TIME, 'The minimum seconds of each timed run.', float],
+        ['repeat', 'r', REPEAT, 'The number of timed runs, the best one is reported.', int],
+        ['save', None, None, 'Save the results to this json file.'],
+        ['load', None, None, 'Load the results from this json file instead of running the scenarios.'],
+        ['compare', 'c', None, 'Compare the results to the results saved in this json file.'],
+        ['tolerance', None, TOLERANCE, 'The slow down (fraction) reported as a regression.', float],
+        ['scenario', None, None, 'Run this scenario in this process and print its results as json.'],
+    ]
+    optFlags = [
+        ['list', 'l', 'List the scenarios.'],
+        ['no-isolate', None, 'Run every scenario in this process.'],
+    ]
+
+    def postOptions(self):
+        known = dict(SIZES)
+        labels = [label.strip() for label in self['sizes'].split(',') if label.strip()]
+        for label in labels:
+            if label not in known:
+                raise usage.UsageError('unknown size %r, use %s' % (label, ', '.join(known)))
+        self['payload-sizes'] = [(label, known[label]) for label in labels]
+
+
+def selected(config):
+    names = [s.strip() for s in (config['filter'] or '').split(',') if s.strip()]
+    return [scenario for scenario in scenarios(config['payload-sizes'])
+            if not names or any(name in scenario.name for name in names)]
+
+
+def _discard(event):
+    pass
+
+
+@defer.inlineCallbacks
+def run(reactor, config):
+    # the error scenarios log (and print tracebacks) on every request, the
+    # output is written to /dev/null so its cost is still measured.
+    log.startLoggingWithObserver(_discard, setStdout=False)
+    stderr, sys.stderr = sys.stderr, open(os.devnull, 'w')
+    try:
+        results = yield _run(config)
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+    defer.returnValue(results)
+
+
+@defer.inlineCallbacks
+def _run(config):
+    if config['scenario'] is not None:
+        for scenario in scenarios(config['payload-sizes']):
+            if scenario.name == config['scenario']:
+                result = yield measure(scenario, config['min-time'], config['repeat'])
+                sys.stdout.write(json.dumps(result) + '\n')
+                defer.returnValue(None)
+        raise usage.UsageError('unknown scenario %r' % config['scenario'])
+
+    results = []
+    for scenario in selected(config):
+        try:
+            if config['no-isolate']:
+                result = yield measure(scenario, config['min-time'], config['repeat'])
+            else:
+                result = run_isolated(scenario.name, config)
+        except Exception as e:
+            result = {'error': '%s: %s' % (e.__class__.__name__, e)}
+        report([(scenario.name, result)], header=not results)
+        results.append((scenario.name, result))
+    defer.returnValue(results)
+
+
+def main(argv=None):
+    """
+    Entry point of the ``txrest-bench`` console script.
+    """
+    config = Options()
+    try:
+        config.parseOptions(argv)
+    except usage.UsageError as e:
+        sys.stderr.write('%s\n%s: error: %s\n' % (config, sys.argv[0], e))
+        sys.exit(2)
+
+    if config['list']:
+        for scenario in selected(config):
+            sys.stdout.write('%s\n' % scenario.name)
+        return
+
+    if config['load'] is not None:
+        with open(config['load']) as f:
+            results = sorted(json.load(f)['results'].items())
+    else:
+        from twisted.internet import reactor
+        outcome = []
+
+        def start():
+            d = run(reactor, config)
+            d.addBoth(outcome.append)
+            d.addBoth(lambda _: reactor.stop())
+
+        reactor.callWhenRunning(start)
+        reactor.run()
+        if isinstance(outcome[0], failure.Failure):
+            outcome[0].raiseException()
+        if config['scenario'] is not None:
+            return
+        results = outcome[0]
+
+    if config['save'] is not None:
+        with open(config['save'], 'w') as f:
+            json.dump({'environment': environment(), 'results': dict(results)}, f, indent=2, sort_keys=True)
+
+    if config['compare'] is not None:
+        with open(config['compare']) as f:
+            baseline = json.load(f)['results']
+        sys.stdout.write('\n')
+        if compare(baseline, results, config['tolerance']):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+``txrest.cache`` module.  An in-memory cache for serialized responses.
+
+A ``ResponseCache`` can be shared by any number of resources, assign it to the
+``RESPONSE_CACHE`` class attribute of a ``RestResource`` to cache the serialized
+bytes of its GET responses::
+
+    from txrest.cache import ResponseCache
+
+    CACHE = ResponseCache(max_bytes=32 * 1024 * 1024, ttl=30)
+
+    class Catalog(JsonResource):
+        RESPONSE_CACHE = CACHE
+        CACHE_HEADERS = (b'accept-language',)
+
+        def rest_GET(self, request):
+            return load_catalog()
+
+        def rest_POST(self, request, post):
+            save_catalog(post)
+            self.invalidate_cache()  # drop the cached GET responses
+            return post
+
+Entries expire after their ttl and the least recently used entries are evicted
+when the total size of the cached bodies exceeds ``max_bytes``.
+"""
+from collections import OrderedDict
+import time
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 60  # seconds
+
+
+class ResponseCache(object):
+    """
+    A TTL + LRU cache bounded by the number of bytes it holds.
+
+    Keys are tuples that start with an ``owner`` (identifying the resource)
+    followed by the request path, everything after that is opaque to the
+    cache.  The owner and path are used to invalidate entries.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, clock=time.time):
+        """
+        :param max_bytes: the maximum total size of cached values
+        :param ttl: default number of seconds an entry stays fresh
+        :param clock: a callable returning the current time (for tests)
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires), oldest first
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Return the cached value for ``key`` or None if it's missing or expired.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[2] <= self.clock():
+            self.size -= entry[1]
+            self.misses += 1
+            return None
+        # re-insert to mark the entry as most recently used
+        self._entries[key] = entry
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, size, ttl=None):
+        """
+        Cache ``value`` under ``key``.
+
+        :param size: the size of value in bytes, values larger than ``max_bytes``
+                     are not cached.
+        :param ttl: seconds the value stays fresh, the cache's ttl when None
+        """
+        if size > self.max_bytes:
+            return
+        self.discard(key)
+        expires = self.clock() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (value, size, expires)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def discard(self, key):
+        """
+        Remove a single entry if it exists.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def invalidate(self, owner=None, path=None):
+        """
+        Remove entries by owner and / or path, remove every entry when
+        both are None.
+
+        :param owner: the first element of the keys to remove
+        :param path: the request path (second element of the keys) to remove
+        """
+        if owner is None and path is None:
+            self.clear()
+            return
+        for key in list(self._entries):
+            if (owner is None or key[0] == owner) and (path is None or key[1] == path):
+                self.discard(key)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        self._entries.clear()
+        self.size = 0
@@ -0,0 +1,57 @@
+"""
+``txrest.coalesce`` module.  Share one in-flight Deferred between many waiters.
+
+Used by ``RestResource`` when ``COALESCE`` is enabled: identical concurrent GET
+requests wait on the handler call of the first request instead of each calling
+the handler themselves.
+"""
+from twisted.internet.defer import Deferred
+from twisted.python import failure
+
+
+class Flight(object):
+    """
+    A single Deferred result shared by any number of waiters.
+
+    Every call to ``join()`` returns a new Deferred that fires with the shared
+    result.  Cancelling a waiter only detaches that waiter, the shared work is
+    cancelled once the last waiter has left.
+
+    :deferred: the shared Deferred (the work being done)
+    :waiters: the Deferreds returned by ``join()`` that haven't fired yet
+    """
+
+    def __init__(self, deferred):
+        """
+        :param deferred: the Deferred of the shared work
+        """
+        self.deferred = deferred
+        self.waiters = []
+        deferred.addBoth(self._fire)
+
+    def join(self):
+        """
+        Return a Deferred that fires with the result of the shared work.
+        """
+        d = Deferred(self._leave)
+        self.waiters.append(d)
+        return d
+
+    def _leave(self, d):
+        """
+        Canceller for a waiter, ``Deferred.cancel`` errbacks it with CancelledError
+        """
+        self.waiters.remove(d)
+        if not self.waiters:
+            # no one is interested in the result anymore
+            self.deferred.cancel()
+
+    def _fire(self, result):
+        waiters, self.waiters = self.waiters, []
+        for d in waiters:
+            if isinstance(result, failure.Failure):
+                d.errback(result)
+            else:
+                d.callback(result)
+        # each waiter handles the failure, don't log it as unhandled
+        return None
@@ -0,0 +1,122 @@
+"""
+``txrest.compress`` module.  Content-Encoding negotiation and (de)compression.
+
+``RestResource`` compresses response bodies larger than ``COMPRESSION_THRESHOLD``
+with the coding the client prefers (see ``negotiate()``), and decompresses
+``gzip`` / ``deflate`` encoded POST and PUT bodies before they are parsed.
+"""
+import io
+import zlib
+
+GZIP = b'gzip'
+DEFLATE = b'deflate'
+CODINGS = (GZIP, DEFLATE)  # in order of preference when the client has none
+CHUNK_SIZE = 64 * 1024  # bytes decompressed at a time
+MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024  # limit for decompressed request bodies
+
+_WBITS = {
+    GZIP: 16 + zlib.MAX_WBITS,  # gzip header and trailer
+    b'x-gzip': 16 + zlib.MAX_WBITS,
+    DEFLATE: zlib.MAX_WBITS,  # zlib stream (RFC 7230 "deflate")
+}
+_negotiated = {}  # accept-encoding header -> coding, the same few headers repeat
+
+
+def negotiate(accept_encoding, codings=CODINGS):
+    """
+    Return the coding from ``codings`` the client prefers, or None when the
+    body should be sent uncompressed.
+
+    :param accept_encoding: the value of the Accept-Encoding request header (or None)
+    :param codings: the codings the server supports, in order of preference
+    """
+    if not accept_encoding:
+        return None
+    key = (accept_encoding, codings)
+    try:
+        return _negotiated[key]
+    except KeyError:
+        pass
+
+    qualities = {}
+    for item in accept_encoding.split(b','):
+        parts = item.split(b';')
+        name = parts[0].strip().lower()
+        q = 1.0
+        for param in parts[1:]:
+            param = param.strip()
+            if param[:2] == b'q=':
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name:
+            qualities[name] = q
+
+    best, best_q = None, 0.0
+    for coding in codings:
+        q = qualities.get(coding, qualities.get(b'*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+
+    if len(_negotiated) > 256:
+        _negotiated.clear()
+    _negotiated[key] = best
+    return best
+
+
+def compress(data, coding, level=6):
+    """
+    Return ``data`` compressed with ``coding``
+
+    :param data: bytes
+    :param coding: ``GZIP`` or ``DEFLATE``
+    :param level: zlib compression level (1 - 9)
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[coding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, coding, level=6):
+    """
+    Compress an iterable of byte strings incrementally.
+
+    Each non-empty compressed chunk is flushed (``Z_SYNC_FLUSH``) so the client
+    receives data as it is produced instead of when zlib's buffer fills up.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[coding])
+    for chunk in chunks:
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def decompress_body(content, coding, limit=MAX_DECOMPRESSED_SIZE):
+    """
+    Return a file-like object with the decompressed contents of ``content``
+
+    :param content: a file-like body (``request.content``)
+    :param coding: the value of the Content-Encoding request header
+    :param limit: raise ValueError when the body decompresses to more bytes
+                  than this (protects against "zip bombs")
+    """
+    wbits = _WBITS.get(coding.strip().lower())
+    if wbits is None:
+        raise ValueError('Unsupported Content-Encoding (%s)' % coding)
+    decompressor = zlib.decompressobj(wbits)
+    body = io.BytesIO()
+    size = 0
+    while True:
+        data = content.read(CHUNK_SIZE)
+        if not data:
+            break
+        while data:
+            piece = decompressor.decompress(data, CHUNK_SIZE)
+            size += len(piece)
+            if size > limit:
+                raise ValueError('Decompressed body exceeds %i bytes' % limit)
+            body.write(piece)
+            data = decompressor.unconsumed_tail
+    body.write(decompressor.flush())
+    body.seek(0)
+    return body
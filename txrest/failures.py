@@ -0,0 +1,92 @@
+"""
+``txrest.failures`` module.  Deduplicated, rate limited traceback logging.
+
+During an incident the same exception can be raised thousands of times a
+second, formatting and logging its traceback every time makes the failure path
+the bottleneck (and floods the logs).  A ``TracebackLog`` logs the traceback of
+a failure the first time it's seen and then at most once every ``interval``
+seconds, with the number of failures that weren't logged in between.  Every
+other failure is logged as a single line (the request and the exception)::
+
+    from txrest import RestResource
+    from txrest.failures import TracebackLog
+
+    RestResource.TRACEBACK_LOG = TracebackLog(interval=10)
+    RestResource.TRACEBACK_LOG = None  # log every traceback
+
+Failures are the same when they come from the same resource and method, have
+the same exception type and were raised from the same line.
+"""
+import time
+from collections import OrderedDict
+
+INTERVAL = 60.0  # seconds between two tracebacks of the same failure
+MAX_SIGNATURES = 1024
+
+
+def failure_signature(fail, resource, method):
+    """
+    Return a hashable signature of a ``twisted.python.failure.Failure``
+
+    :param resource: the fully qualified name of the resource class
+    :param method: the name of the method that failed
+    """
+    origin = None
+    if fail.frames:
+        # [function name, file name, line number, locals, globals]
+        origin = (fail.frames[-1][1], fail.frames[-1][2])
+    return (resource, method, fail.type, origin)
+
+
+class TracebackLog(object):
+    """
+    Decide which failures have their traceback logged.
+
+    :suppressed: the number of failures whose traceback wasn't logged
+    """
+
+    def __init__(self, interval=INTERVAL, max_signatures=MAX_SIGNATURES, clock=time.time):
+        """
+        :param interval: the seconds between two tracebacks of the same failure
+        :param max_signatures: the number of signatures remembered, the oldest is
+                               forgotten first
+        :param clock: a callable returning the current time in seconds
+        """
+        self.interval = interval
+        self.max_signatures = max_signatures
+        self.clock = clock
+        self.suppressed = 0
+        self._seen = OrderedDict()  # signature -> [time last logged, failures not logged since]
+
+    def admit(self, signature):
+        """
+        Count a failure with ``signature``
+
+        :returns: None when its traceback shouldn't be logged, otherwise the
+                  number of failures with the same signature that weren't
+                  logged since the last one that was.
+        """
+        now = self.clock()
+        entry = self._seen.get(signature)
+        if entry is None:
+            if len(self._seen) >= self.max_signatures:
+                self._seen.popitem(last=False)
+            self._seen[signature] = [now, 0]
+            return 0
+        if now - entry[0] < self.interval:
+            entry[1] += 1
+            self.suppressed += 1
+            return None
+        skipped = entry[1]
+        entry[0] = now
+        entry[1] = 0
+        return skipped
+
+    def reset(self):
+        """
+        Forget every signature.
+        """
+        self._seen.clear()
+
+
+DEFAULT_TRACEBACK_LOG = TracebackLog()
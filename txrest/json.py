@@ -3,17 +3,28 @@
 """
 
 from __future__ import absolute_import
-import json
+import re
+import types
+try:
+    from collections.abc import Iterator
+except ImportError:
+    from collections import Iterator
 from unicodedata import normalize
 import logging
 
 from twisted.python import log
 from twisted.web import resource
 
-from txrest import RestResource, DEFAULT_ENCODING
+from txrest import RestResource, DEFAULT_ENCODING, STREAM_CHUNK_SIZE, display_tracebacks, sniff_body
+from txrest.jsoncodec import get_codec
 
 ACCEPT_HEADER = b'application/json'
 CONTENT_TYPE_HEADER = b'application/json; charset=%s'
+JSON_START = (b'{', b'[')  # a JSON POST body must be an object or an array
+NON_SPACE = re.compile(br'\S')
+MAX_ERROR_BODIES = 256  # error page bodies without detail kept for reuse
+
+_error_bodies = {}  # (page class, code, brief, encoding, codec name) -> body
 
 
 class JsonErrorPage(resource.ErrorPage):
@@ -59,7 +70,7 @@ class JsonErrorPage(resource.ErrorPage):
 
     """
 
-    def __init__(self, status, brief, detail, encoding=DEFAULT_ENCODING, is_logged=True):
+    def __init__(self, status, brief, detail, encoding=DEFAULT_ENCODING, is_logged=True, codec=None):
         """
         Note that the signature of this function and the names of the variables have been
         kept identical to the original version of this class.
@@ -71,9 +82,12 @@ class JsonErrorPage(resource.ErrorPage):
         :param detail: Error Description
         :param encoding: Encoding to use when sending response
         :param is_logged: log the error to twisted logging mechanism.
+        :param codec: (optional) the ``txrest.jsoncodec`` codec (or its name) used to
+                      serialize the page, the default codec is used when omitted.
         """
         # arguments are left identical to ErrorPage
         resource.Resource.__init__(self)
+        self.codec = get_codec(codec)
 
         self.code = status
         self.brief = brief
@@ -84,16 +98,10 @@ class JsonErrorPage(resource.ErrorPage):
     def render(self, request):
         """
         Format the exception and return a dictionary.
-        """
-        response = {
-            "code": self.code,
-            "error": self.brief.encode(self.encoding),
-            "detail": unicode(self.detail).encode(self.encoding),
-        }
-
-        if not request.site.displayTracebacks:
-            response['detail'] = None
 
+        Pages that don't show their detail only depend on the code and the
+        brief, their body is serialized once and reused.
+        """
         if self.is_logged:
             # ensure strings get represented in the logs even with nonsense in them
             # (un-encodable strings get saved still)
@@ -109,17 +117,24 @@ class JsonErrorPage(resource.ErrorPage):
         request.setResponseCode(self.code)
         request.setHeader(b'accept', ACCEPT_HEADER)
         request.setHeader(b'content-type', CONTENT_TYPE_HEADER % self.encoding)
-        # dump a dict to get correctly formatted json
-        rstr = json.dumps(
-            response,
-            allow_nan=False,
-            check_circular=False,
-            ensure_ascii=False,
-            encoding=self.encoding,
-            # -- pretty-print --
-            sort_keys=True,
-            indent=4)
-        return rstr
+
+        if display_tracebacks(request):
+            return self._body(unicode(self.detail).encode(self.encoding))
+        key = (self.__class__, self.code, self.brief, self.encoding, self.codec.name)
+        body = _error_bodies.get(key)
+        if body is None:
+            body = self._body(None)
+            if len(_error_bodies) < MAX_ERROR_BODIES:
+                _error_bodies[key] = body
+        return body
+
+    def _body(self, detail):
+        response = {
+            "code": self.code,
+            "error": self.brief.encode(self.encoding),
+            "detail": detail,
+        }
+        return self.codec.dumps(response, self.encoding)
 
     def __str__(self):
         return "%s: [%s] %s - %s" % (self.__class__.__name__, self.code, self.brief, self.detail)
@@ -176,11 +191,30 @@ class JsonResource(RestResource):
     
     When sending a ``POST`` request the body must always be a JSON payload, even if it
     is an empty data structure such as: ``{}`` or ``[]``
+
+    A rest_* method can also return a generator or an iterator, the items are encoded
+    one at a time and streamed to the client as a JSON array using chunked transfer
+    encoding, the full result is never held in memory::
+
+        def rest_GET(self, request):
+            for row in export_rows():
+                yield {"id": row.id, "name": row.name}
     """
     ACCEPT = ACCEPT_HEADER
     CONTENT_TYPE = CONTENT_TYPE_HEADER
     HANDLE_TYPES = (dict, list, tuple)
+    STREAM_TYPES = (types.GeneratorType, Iterator)
     ERROR_CLASS = JsonErrorPage
+    JSON_CODEC = None  # a ``txrest.jsoncodec`` codec name or instance, None uses the default.
+
+    def __init__(self, encoding=DEFAULT_ENCODING, codec=None, *args, **kwargs):
+        """
+        :param encoding: (optional) string encoding to use for requests and responses.
+        :param codec: (optional) the ``txrest.jsoncodec`` codec (or its name) used to
+                      encode and decode JSON, overrides the ``JSON_CODEC`` class attribute.
+        """
+        RestResource.__init__(self, encoding, *args, **kwargs)
+        self.codec = get_codec(codec or self.JSON_CODEC)
 
     def _format_response(self, request, response, encoding):
         """
@@ -193,17 +227,40 @@ class JsonResource(RestResource):
         :param request: ``twisted.web.server.Request`` instance
         :param response: an object returned from a rest_* method.
                          this should be a json-encodable object: (dict, list, tuple)
-        :param encoding: a string that describes the desired encoding to pass into
-                         ``json.dumps(encoding='<encoding>')``
+        :param encoding: a string that describes the desired encoding, passed to
+                         ``self.codec.dumps()``
+        """
+        return self.codec.dumps(response, encoding)
+
+    def _format_stream(self, request, response, encoding):
+        """
+        When a type in STREAM_TYPES is returned, the super-class (RestResource)
+        will call this method.
+
+        Each item produced by the iterator is encoded incrementally and the
+        items are written as a JSON array.  Encoded text is buffered up to
+        ``STREAM_CHUNK_SIZE`` before it is yielded as a byte string.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param response: a generator or iterator returned from a rest_* method.
+                         each item should be a json-encodable object.
+        :param encoding: a string that describes the desired encoding of the chunks
         """
-        rstr = json.dumps(
-            response,
-            allow_nan=False,  # strict compliance to JSON
-            check_circular=False,  # speedup
-            ensure_ascii=False,  # allows the result to be a UNICODE object.
-            encoding=encoding
-        ).encode(encoding)
-        return rstr
+        buf = [b'[']
+        size = 1
+        separator = b''
+        for item in response:
+            buf.append(separator)
+            separator = b','
+            for piece in self.codec.iterencode(item, encoding):
+                buf.append(piece)
+                size += len(piece)
+                if size >= STREAM_CHUNK_SIZE:
+                    yield b''.join(buf)
+                    buf = []
+                    size = 0
+        buf.append(b']')
+        yield b''.join(buf)
 
     def _format_post(self, request, body, encoding):
         """
@@ -216,16 +273,36 @@ class JsonResource(RestResource):
         
         :param request: ``twisted.web.server.Request`` instance
         :param body: (bytes) a byte string that contains the post contents.
-        :param encoding: a string that describes the desired encoding to pass into
-                         ``json.loads(encoding='<encoding>')``
+        :param encoding: a string that describes the desired encoding, passed to
+                         ``self.codec.loads()``
         """
         # a very quick test to deny malformed bodies.
         # TODO support flag for log_post ?
-        char = body.lstrip()[0]
-        if char not in ('{', '['):
+        match = NON_SPACE.search(body)
+        if match is None or body[match.start():match.start() + 1] not in JSON_START:
             raise ValueError('Invalid JSON first character != { or [... \nGot: %s ...' % body[:60])
 
         # this will return strings as Unicode()
-        body_data = json.loads(body, encoding=encoding)
+        body_data = self.codec.loads(body, encoding)
 
         return body_data
+
+    def _parse_body(self, request, content, encoding):
+        """
+        Parse a POST body straight from the file-like ``request.content``
+
+        The first character is checked without copying the body, then the
+        body is decoded with a single read.  (The standard library has no
+        incremental JSON decoder, so this is the one full copy we make)
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param content: a file-like object positioned at the start of the body
+        :param encoding: a string that describes the desired encoding, passed to
+                         ``self.codec.load()``
+        """
+        if sniff_body(content) not in JSON_START:
+            raise ValueError(
+                'Invalid JSON first character != { or [... \nGot: %s ...' % sniff_body(content, 60))
+
+        # this will return strings as Unicode()
+        return self.codec.load(content, encoding)
@@ -0,0 +1,280 @@
+"""
+``txrest.jsoncodec`` module.  Interchangeable JSON encoder/decoder backends.
+
+``JsonResource`` and ``JsonErrorPage`` serialize through a codec object instead
+of calling ``json.dumps`` / ``json.loads`` directly, so a faster JSON library
+can be used when it is installed.  Codecs always return bytes in the requested
+encoding.
+
+Select a codec globally (before resources are created)::
+
+    from txrest import jsoncodec
+    jsoncodec.set_default_codec('auto')  # the fastest library that is installed
+
+Or per resource::
+
+    class MyJsonResource(JsonResource):
+        JSON_CODEC = 'ujson'
+
+When an optional library isn't installed the next codec in ``PREFERENCE`` is
+used instead, the standard library ``json`` module is always available.
+
+Every codec produces the same document: non-ascii characters are written as is
+(not ``\\u`` escaped), ``/`` isn't escaped and NaN / Infinity raise ValueError.
+The differences left between the backends are:
+
+- ``ujson`` and ``orjson`` don't write white-space after ``,`` and ``:``
+- ``orjson`` writes NaN and Infinity as ``null`` instead of raising ValueError
+"""
+from __future__ import absolute_import
+import codecs
+import json
+
+from twisted.python import log
+
+PREFERENCE = ('orjson', 'ujson', 'simplejson', 'json')
+
+
+def _is_utf8(encoding, _cache={}):
+    """
+    Return True when ``encoding`` is an alias of utf-8
+    """
+    try:
+        return _cache[encoding]
+    except KeyError:
+        result = _cache[encoding] = codecs.lookup(encoding).name == 'utf-8'
+        return result
+
+
+class JsonCodec(object):
+    """
+    Base class for JSON codecs.
+
+    :name: the name used to select the codec, see ``get_codec()``
+    :module_name: the module that must be importable for the codec to be used
+    """
+    name = None
+    module_name = None
+
+    def __init__(self):
+        self.module = __import__(self.module_name)
+
+    @classmethod
+    def available(cls):
+        """
+        Return True if the library backing this codec can be imported
+        """
+        try:
+            __import__(cls.module_name)
+        except ImportError:
+            return False
+        return True
+
+    def dumps(self, obj, encoding, pretty=False):
+        """
+        Serialize ``obj`` to JSON bytes in ``encoding``
+
+        :param obj: a json-encodable object
+        :param encoding: the encoding of the returned bytes
+        :param pretty: indent and sort keys (for human readers)
+        """
+        raise NotImplementedError()
+
+    def loads(self, data, encoding):
+        """
+        Deserialize JSON bytes in ``encoding``
+        """
+        raise NotImplementedError()
+
+    def load(self, fp, encoding):
+        """
+        Deserialize JSON from the file-like object ``fp``
+        """
+        return self.loads(fp.read(), encoding)
+
+    def iterencode(self, obj, encoding):
+        """
+        Serialize ``obj`` to an iterable of JSON byte strings in ``encoding``
+
+        Codecs that can't encode incrementally produce a single piece.
+        """
+        yield self.dumps(obj, encoding)
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self.name)
+
+
+class StdlibCodec(JsonCodec):
+    """
+    The standard library ``json`` module.
+
+    The encoders are created once per encoding, a document without unicode
+    strings is returned by the encoder as bytes and isn't encoded again.
+    """
+    name = 'json'
+    module_name = 'json'
+
+    def __init__(self):
+        JsonCodec.__init__(self)
+        self._encoders = {}
+
+    def _encoder(self, encoding, pretty=False):
+        key = (encoding, pretty)
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            options = dict(
+                allow_nan=False,  # strict compliance to JSON
+                check_circular=False,  # speedup
+                ensure_ascii=False,  # allows the result to be a UNICODE object.
+                encoding=encoding)
+            if pretty:
+                options.update(sort_keys=True, indent=4)
+            encoder = self._encoders[key] = self.module.JSONEncoder(**options)
+        return encoder
+
+    def dumps(self, obj, encoding, pretty=False):
+        rstr = self._encoder(encoding, pretty).encode(obj)
+        if not isinstance(rstr, bytes):
+            rstr = rstr.encode(encoding)
+        return rstr
+
+    def loads(self, data, encoding):
+        # this will return strings as Unicode()
+        return self.module.loads(data, encoding=encoding)
+
+    def load(self, fp, encoding):
+        return self.module.load(fp, encoding=encoding)
+
+    def iterencode(self, obj, encoding):
+        for piece in self._encoder(encoding).iterencode(obj):
+            # pieces are unicode, or byte strings that are already encoded
+            if not isinstance(piece, bytes):
+                piece = piece.encode(encoding)
+            yield piece
+
+
+class SimpleJsonCodec(StdlibCodec):
+    """
+    The ``simplejson`` library, api compatible with the standard library.
+    """
+    name = 'simplejson'
+    module_name = 'simplejson'
+
+
+class UJsonCodec(JsonCodec):
+    """
+    The ``ujson`` library.  Does not encode incrementally.
+
+    ``/`` isn't escaped and NaN / Infinity raise ValueError, like the standard
+    library codec (ujson escapes ``/`` and raises OverflowError by default).
+    """
+    name = 'ujson'
+    module_name = 'ujson'
+
+    def __init__(self):
+        JsonCodec.__init__(self)
+        self._options = dict(ensure_ascii=False, escape_forward_slashes=False)
+        try:
+            self.module.dumps(1.0, allow_nan=False)
+        except TypeError:
+            pass  # older versions always raise OverflowError for NaN / Infinity
+        else:
+            self._options['allow_nan'] = False
+
+    def dumps(self, obj, encoding, pretty=False):
+        try:
+            if pretty:
+                rstr = self.module.dumps(obj, sort_keys=True, indent=4, **self._options)
+            else:
+                rstr = self.module.dumps(obj, **self._options)
+        except OverflowError as e:
+            message = str(e).lower()
+            if 'inf' not in message and 'nan' not in message:
+                raise  # an integer that's too large
+            raise ValueError('Out of range float values are not JSON compliant')
+        if isinstance(rstr, bytes):
+            # ujson returns utf-8 byte strings on python 2
+            if _is_utf8(encoding):
+                return rstr
+            rstr = rstr.decode('utf-8')
+        return rstr.encode(encoding)
+
+    def loads(self, data, encoding):
+        if not _is_utf8(encoding):
+            data = data.decode(encoding)
+        return self.module.loads(data)
+
+
+class OrJsonCodec(JsonCodec):
+    """
+    The ``orjson`` library, produces utf-8 bytes natively.  Does not encode incrementally.
+    """
+    name = 'orjson'
+    module_name = 'orjson'
+
+    def dumps(self, obj, encoding, pretty=False):
+        if pretty:
+            rstr = self.module.dumps(obj, option=self.module.OPT_INDENT_2 | self.module.OPT_SORT_KEYS)
+        else:
+            rstr = self.module.dumps(obj)
+        if _is_utf8(encoding):
+            return rstr
+        return rstr.decode('utf-8').encode(encoding)
+
+    def loads(self, data, encoding):
+        if not _is_utf8(encoding):
+            data = data.decode(encoding).encode('utf-8')
+        return self.module.loads(data)
+
+
+CODECS = {
+    OrJsonCodec.name: OrJsonCodec,
+    UJsonCodec.name: UJsonCodec,
+    SimpleJsonCodec.name: SimpleJsonCodec,
+    StdlibCodec.name: StdlibCodec,
+}
+
+_instances = {}
+_default = None
+
+
+def get_codec(name=None):
+    """
+    Return a codec instance.
+
+    :param name: a name from ``CODECS``, ``'auto'`` for the first available
+                 codec in ``PREFERENCE``, a ``JsonCodec`` instance (returned as-is)
+                 or None for the default codec (see ``set_default_codec()``)
+
+    When the library for the requested codec isn't installed the next
+    available codec in ``PREFERENCE`` is returned instead.
+    """
+    if isinstance(name, JsonCodec):
+        return name
+    if name is None:
+        return _default or get_codec(StdlibCodec.name)
+    if name == 'auto':
+        candidates = PREFERENCE
+    elif name in CODECS:
+        candidates = PREFERENCE[PREFERENCE.index(name):]
+    else:
+        raise ValueError('Unknown JSON codec %r, expected one of %s' % (name, ', '.join(PREFERENCE)))
+
+    for candidate in candidates:
+        if candidate in _instances:
+            return _instances[candidate]
+        if CODECS[candidate].available():
+            if name not in ('auto', candidate):
+                log.msg('JSON codec (%s) is not installed, using (%s)' % (name, candidate))
+            codec = _instances[candidate] = CODECS[candidate]()
+            return codec
+
+
+def set_default_codec(name):
+    """
+    Set the codec used by resources and error pages that don't select one.
+
+    :param name: any value accepted by ``get_codec()``
+    """
+    global _default
+    _default = get_codec(name) if name is not None else None
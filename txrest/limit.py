@@ -0,0 +1,176 @@
+"""
+``txrest.limit`` module.  Concurrency limits and load shedding.
+
+Without a limit every request that arrives calls its handler right away, under
+overload the pending Deferreds pile up and every endpoint slows down together.
+A ``ConcurrencyLimit`` caps the number of requests being handled at once, a
+bounded number of requests wait (for at most ``queue_timeout`` seconds) and the
+rest are answered with ``503 Service Unavailable`` immediately::
+
+    from txrest import RestResource
+    from txrest.limit import ConcurrencyLimit
+
+    # every resource together
+    RestResource.GLOBAL_CONCURRENCY_LIMIT = ConcurrencyLimit(500, max_queued=1000)
+
+    class Search(JsonResource):
+        # this resource alone
+        CONCURRENCY_LIMIT = ConcurrencyLimit(20, max_queued=50, queue_timeout=2)
+"""
+from collections import deque
+
+from twisted.internet.defer import Deferred
+
+
+class LimitExceeded(Exception):
+    """
+    Raised when a request can't be admitted by a ``ConcurrencyLimit``
+
+    :retry_after: seconds the client should wait before retrying
+    """
+
+    def __init__(self, message, retry_after):
+        Exception.__init__(self, message)
+        self.retry_after = retry_after
+
+
+class QueueTimeout(LimitExceeded):
+    """
+    A request waited longer than the ``queue_timeout`` of a ``ConcurrencyLimit``
+    """
+    pass
+
+
+class ConcurrencyLimit(object):
+    """
+    Admit at most ``max_concurrent`` requests at a time.
+
+    :active: the number of admitted requests
+    :shed: the number of requests rejected because the queue was full
+    :timeouts: the number of requests that timed out in the queue
+    """
+
+    def __init__(self, max_concurrent, max_queued=0, queue_timeout=None, retry_after=1, clock=None):
+        """
+        :param max_concurrent: the maximum number of requests handled at once
+        :param max_queued: the maximum number of requests waiting to be admitted
+        :param queue_timeout: (optional) seconds a request waits before it's rejected
+        :param retry_after: the Retry-After (seconds) sent with rejected requests
+        :param clock: (optional) an ``IReactorTime`` provider, the reactor by default
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.clock = clock
+        self.active = 0
+        self.shed = 0
+        self.timeouts = 0
+        self._waiting = deque()  # (deferred, timeout call)
+
+    @property
+    def queued(self):
+        return len(self._waiting)
+
+    def acquire(self):
+        """
+        Take a slot.
+
+        :returns: None when a slot was taken, a Deferred that fires when a slot
+                  was taken for a request that has to wait.
+        :raises LimitExceeded: when the queue is full
+        """
+        if self.active < self.max_concurrent:
+            self.active += 1
+            return None
+        if len(self._waiting) >= self.max_queued:
+            self.shed += 1
+            raise LimitExceeded(
+                '%i requests in progress, %i waiting' % (self.active, len(self._waiting)), self.retry_after)
+
+        d = Deferred(self._cancel)
+        timeout = None
+        if self.queue_timeout is not None:
+            clock = self.clock
+            if clock is None:
+                from twisted.internet import reactor as clock
+            timeout = clock.callLater(self.queue_timeout, self._timeout, d)
+        self._waiting.append((d, timeout))
+        return d
+
+    def release(self):
+        """
+        Give a slot back, the next waiting request (if any) takes it.
+        """
+        self.active -= 1
+        if self._waiting and self.active < self.max_concurrent:
+            d, timeout = self._waiting.popleft()
+            if timeout is not None:
+                timeout.cancel()
+            self.active += 1
+            d.callback(None)
+
+    def _remove(self, d):
+        for item in self._waiting:
+            if item[0] is d:
+                self._waiting.remove(item)
+                if item[1] is not None and item[1].active():
+                    item[1].cancel()
+                return
+
+    def _cancel(self, d):
+        # the client went away while waiting
+        self._remove(d)
+
+    def _timeout(self, d):
+        self._remove(d)
+        self.timeouts += 1
+        d.errback(QueueTimeout('waited more than %s secs' % self.queue_timeout, self.retry_after))
+
+
+def release_all(limits):
+    """
+    Release a slot of every limit in ``limits``
+    """
+    for limit in limits:
+        limit.release()
+
+
+def acquire_all(limits):
+    """
+    Take a slot of every limit in ``limits``, in order.
+
+    :returns: None when every slot was taken, a Deferred that fires once every
+              slot was taken (the slots taken so far are released when it fails)
+    :raises LimitExceeded: when one of the queues is full, the slots taken so
+                           far are released
+    """
+    held = []
+    for i, limit in enumerate(limits):
+        try:
+            d = limit.acquire()
+        except LimitExceeded:
+            release_all(held)
+            raise
+        if d is None:
+            held.append(limit)
+            continue
+
+        def acquired(_, limit=limit, rest=limits[i + 1:]):
+            held.append(limit)
+            try:
+                more = acquire_all(rest)
+            except LimitExceeded:
+                release_all(held)
+                raise
+            if more is not None:
+                more.addErrback(failed)
+            return more
+
+        def failed(fail):
+            release_all(held)
+            return fail
+
+        d.addCallbacks(acquired, failed)
+        return d
+    return None
@@ -0,0 +1,556 @@
+"""
+``txrest.load`` module.  Load test a resource tree over HTTP on the loopback interface.
+
+``txrest-bench`` leaves out ``twisted.web.server.Site`` and the HTTP channel,
+``txrest-load`` measures the whole stack: it serves a resource tree with the
+``txrest`` runner in another process and drives it with a number of concurrent
+keep-alive connections::
+
+    txrest-load --connections 50 --duration 30 --path /users myapp.api.root
+    txrest-load --workers 4 --mix requests.json myapp.api.root
+    txrest-load --target 127.0.0.1:8080 --mix requests.json  # a server that's already running
+
+A request mix is a json list of requests, picked at random in proportion to
+their ``weight``.  A ``body`` that isn't a string is sent as json::
+
+    [
+        {"method": "GET", "path": "/users?page=1", "weight": 8},
+        {"method": "POST", "path": "/users", "body": {"name": "joe"}, "weight": 1},
+        {"method": "PUT", "path": "/avatar", "body": "...", "headers": {"content-type": "image/png"}}
+    ]
+
+The report gives the throughput, the error rate (responses >= 400 and lost
+connections) and the p50 / p95 / p99 / p99.9 latencies of every request of the
+mix.  The load generator runs in a single process (one core), give the server
+the other cores with ``--workers``.
+"""
+from __future__ import absolute_import
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from bisect import bisect_right
+from timeit import default_timer
+
+from twisted.internet import defer
+from twisted.protocols.basic import LineReceiver
+from twisted.python import failure, usage
+
+DURATION = 10.0  # seconds
+WARMUP = 2.0  # seconds before the responses are recorded
+CONNECTIONS = 10
+STARTUP_TIMEOUT = 30.0  # seconds the server has to start listening
+PERCENTILES = (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('p99.9', 0.999))
+
+
+class RequestSpec(object):
+    """
+    One request of the mix.
+
+    :label: the method and path, the latencies are reported per label
+    :data: the bytes of the request, once ``encode()`` was called
+    """
+    __slots__ = ('method', 'path', 'body', 'headers', 'weight', 'label', 'data')
+
+    def __init__(self, method, path, body=None, headers=None, weight=1):
+        """
+        :param method: the http method
+        :param path: the path and query string
+        :param body: (optional) bytes, text, or a json serializable object
+        :param headers: (optional) a dictionary of header name -> value
+        :param weight: the relative frequency of the request in the mix
+        """
+        self.method = method.upper()
+        self.path = path
+        self.weight = weight
+        self.label = '%s %s' % (self.method, path)
+        self.headers = dict((name.lower(), value) for name, value in (headers or {}).items())
+        if body is None:
+            body = b''
+        elif not isinstance(body, (bytes, type(u''))):
+            body = json.dumps(body)
+            self.headers.setdefault('content-type', 'application/json')
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        if body or self.method in ('POST', 'PUT'):
+            self.headers['content-length'] = str(len(body))
+        self.body = body
+        self.data = None
+
+    def encode(self, host):
+        """
+        Build the bytes of the request sent to ``host`` (once, before the run)
+        """
+        lines = ['%s %s HTTP/1.1' % (self.method, self.path), 'Host: %s' % host]
+        lines.extend('%s: %s' % item for item in sorted(self.headers.items()))
+        self.data = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + self.body
+
+
+def load_mix(path):
+    """
+    Return the list of ``RequestSpec`` of the json request mix file ``path``
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise usage.UsageError('%s must contain a list of requests' % path)
+    return [RequestSpec(entry.get('method', 'GET'), entry.get('path', '/'), entry.get('body'),
+                        entry.get('headers'), entry.get('weight', 1)) for entry in entries]
+
+
+def percentile(ordered, fraction):
+    """
+    Return the ``fraction`` percentile (nearest rank) of a sorted list.
+    """
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LabelStats(object):
+    """
+    The responses to one request of the mix.
+    """
+    __slots__ = ('latencies', 'codes', 'errors', 'lost')
+
+    def __init__(self):
+        self.latencies = []
+        self.codes = {}
+        self.errors = 0  # responses >= 400
+        self.lost = 0  # connections lost before the response
+
+    def summary(self, elapsed):
+        ordered = sorted(self.latencies)
+        requests = len(ordered) + self.lost
+        result = {
+            'requests': requests,
+            'rps': requests / elapsed if elapsed else 0.0,
+            'errors': self.errors + self.lost,
+            'error_rate': float(self.errors + self.lost) / requests if requests else 0.0,
+            'codes': dict((str(code), count) for code, count in self.codes.items()),
+            'mean': sum(ordered) / len(ordered) if ordered else None,
+            'max': ordered[-1] if ordered else None,
+        }
+        for name, fraction in PERCENTILES:
+            result[name] = percentile(ordered, fraction)
+        return result
+
+
+class LoadRun(object):
+    """
+    The state of a load test shared by its connections.
+    """
+
+    def __init__(self, specs, host, duration=DURATION, warmup=WARMUP, requests=None, seed=None):
+        """
+        :param specs: the list of ``RequestSpec`` of the mix
+        :param host: the value of the Host header
+        :param duration: the seconds the responses are recorded
+        :param warmup: the seconds before the responses are recorded
+        :param requests: (optional) stop after this many recorded responses
+        :param seed: (optional) the seed of the request picker
+        """
+        self.specs = specs
+        for spec in specs:
+            spec.encode(host)
+        self.duration = duration
+        self.warmup = warmup
+        self.requests = requests
+        self.recorded = 0
+        self.stats = dict((spec.label, LabelStats()) for spec in specs)
+        self.random = random.Random(seed)
+        self._cumulative = []
+        total = 0
+        for spec in specs:
+            total += spec.weight
+            self._cumulative.append(total)
+        self._total = total
+        self.started = None
+        self.record_from = None
+        self.stop_at = None
+
+    def start(self):
+        self.started = default_timer()
+        self.record_from = self.started + self.warmup
+        self.stop_at = self.record_from + self.duration
+
+    @property
+    def elapsed(self):
+        """
+        The seconds the responses have been recorded for.
+        """
+        if self.record_from is None:
+            return 0.0
+        return max(0.0, min(default_timer(), self.stop_at) - self.record_from)
+
+    def done(self):
+        if self.requests is not None and self.recorded >= self.requests:
+            return True
+        return default_timer() >= self.stop_at
+
+    def pick(self):
+        if len(self.specs) == 1:
+            return self.specs[0]
+        return self.specs[bisect_right(self._cumulative, self.random.random() * self._total)]
+
+    def record(self, spec, code, started, now):
+        if started < self.record_from:
+            return
+        stats = self.stats[spec.label]
+        stats.latencies.append(now - started)
+        stats.codes[code] = stats.codes.get(code, 0) + 1
+        if code >= 400:
+            stats.errors += 1
+        self.recorded += 1
+
+    def lost(self, spec, started):
+        if started >= self.record_from:
+            self.stats[spec.label].lost += 1
+            self.recorded += 1
+
+    def summary(self):
+        elapsed = self.elapsed
+        labels = dict((label, stats.summary(elapsed)) for label, stats in self.stats.items())
+        total = LabelStats()
+        for stats in self.stats.values():
+            total.latencies.extend(stats.latencies)
+            total.errors += stats.errors
+            total.lost += stats.lost
+            for code, count in stats.codes.items():
+                total.codes[code] = total.codes.get(code, 0) + count
+        return {'elapsed': elapsed, 'total': total.summary(elapsed), 'requests': labels}
+
+
+class _IdentityBody(object):
+    """
+    Discard a response body of ``length`` bytes, ``done`` is called with the
+    bytes received after the body.
+    """
+
+    def __init__(self, length, done):
+        self.remaining = length
+        self.done = done
+
+    def dataReceived(self, data):
+        if len(data) < self.remaining:
+            self.remaining -= len(data)
+            return
+        rest = data[self.remaining:]
+        self.remaining = 0
+        self.done(rest)
+
+
+class _ChunkedBody(object):
+    """
+    Discard a response body sent with chunked transfer encoding, ``done`` is
+    called with the bytes received after the body.
+    """
+
+    def __init__(self, done):
+        self.done = done
+        self.buffer = b''  # an incomplete chunk size or trailer line
+        self.remaining = 0  # bytes left of the current chunk and its CRLF
+        self.trailer = False
+
+    def dataReceived(self, data):
+        if self.buffer:
+            data = self.buffer + data
+            self.buffer = b''
+        while data:
+            if self.remaining:
+                if len(data) < self.remaining:
+                    self.remaining -= len(data)
+                    return
+                data = data[self.remaining:]
+                self.remaining = 0
+                continue
+            line, separator, rest = data.partition(b'\r\n')
+            if not separator:
+                self.buffer = data
+                return
+            data = rest
+            if self.trailer:
+                if not line:
+                    self.done(data)
+                    return
+                continue
+            size = int(line.split(b';', 1)[0], 16)
+            if size:
+                self.remaining = size + 2
+            else:
+                self.trailer = True  # the last chunk, trailers end with an empty line
+
+
+class LoadProtocol(LineReceiver):
+    """
+    A keep-alive connection sending one request after another.
+    """
+    delimiter = b'\r\n'
+    MAX_LENGTH = 64 * 1024
+
+    def __init__(self, run):
+        self.run = run
+        self.finished = defer.Deferred()
+        self.spec = None
+        self.started = None
+
+    def connectionMade(self):
+        self.send()
+
+    def send(self):
+        if self.run.done():
+            self.spec = None
+            self.transport.loseConnection()
+            return
+        self.spec = self.run.pick()
+        self.code = None
+        self.length = None
+        self.chunked = False
+        self.close = False
+        self.decoder = None
+        self.started = default_timer()
+        self.transport.write(self.spec.data)
+
+    def lineReceived(self, line):
+        if self.code is None:
+            # HTTP/1.1 200 OK
+            self.code = int(line.split(None, 2)[1])
+            return
+        if line:
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'content-length':
+                self.length = int(value)
+            elif name == b'transfer-encoding':
+                self.chunked = value.strip().lower() == b'chunked'
+            elif name == b'connection':
+                self.close = value.strip().lower() == b'close'
+            return
+
+        # end of the headers
+        if self.spec.method == 'HEAD' or self.code in (204, 304) or (self.length == 0 and not self.chunked):
+            self.responseDone(b'')
+        elif self.chunked:
+            self.decoder = _ChunkedBody(self.responseDone)
+            self.setRawMode()
+        elif self.length is not None:
+            self.decoder = _IdentityBody(self.length, self.responseDone)
+            self.setRawMode()
+        else:
+            # the body ends when the server closes the connection
+            self.close = True
+            self.setRawMode()
+
+    def rawDataReceived(self, data):
+        if self.decoder is not None:
+            self.decoder.dataReceived(data)
+
+    def responseDone(self, rest):
+        self.run.record(self.spec, self.code, self.started, default_timer())
+        self.spec = None
+        if self.close:
+            self.transport.loseConnection()
+            return
+        self.setLineMode(rest)
+        if self.spec is None:
+            self.send()
+
+    def connectionLost(self, reason):
+        if self.spec is not None:
+            if self.decoder is None and self.close:
+                self.run.record(self.spec, self.code, self.started, default_timer())
+            else:
+                self.run.lost(self.spec, self.started)
+        self.finished.callback(None)
+
+
+@defer.inlineCallbacks
+def drive(reactor, run, host, port, connections):
+    """
+    Keep ``connections`` connections busy until ``run`` is done, reconnecting
+    the connections the server closes.
+    """
+    from twisted.internet.endpoints import TCP4ClientEndpoint, connectProtocol
+
+    @defer.inlineCallbacks
+    def connection():
+        endpoint = TCP4ClientEndpoint(reactor, host, port)
+        while not run.done():
+            proto = LoadProtocol(run)
+            try:
+                yield connectProtocol(endpoint, proto)
+            except Exception:
+                # the server refused the connection, don't spin
+                yield _sleep(reactor, 0.1)
+                continue
+            yield proto.finished
+
+    run.start()
+    yield defer.DeferredList([connection() for _ in range(connections)])
+
+
+def _sleep(reactor, seconds):
+    d = defer.Deferred()
+    reactor.callLater(seconds, d.callback, None)
+    return d
+
+
+# -- SERVER -------------------------------------------------------------------
+
+def free_port():
+    """
+    Return a free TCP port on the loopback interface.
+    """
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def start_server(root, port, workers):
+    """
+    Serve ``root`` with the ``txrest`` runner on ``127.0.0.1:port``, return
+    the server process once it accepts connections.
+    """
+    args = [sys.executable, '-m', 'txrest.runner', '--interface', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--stats-interval', '0', root]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    with open(os.devnull, 'w') as devnull:
+        server = subprocess.Popen(args, env=env, stdout=devnull)
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('the server exited with status %s' % server.returncode)
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return server
+        except socket.error:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError('the server did not listen on port %i within %i secs' % (port, STARTUP_TIMEOUT))
+
+
+# -- REPORTING ----------------------------------------------------------------
+
+def _ms(seconds):
+    return '-' if seconds is None else '%.2f' % (seconds * 1000)
+
+
+def report(summary, out=sys.stdout):
+    total = summary['total']
+    out.write('%i requests in %.1f secs, %.1f requests/sec, %i errors (%.2f%%)\n\n' % (
+        total['requests'], summary['elapsed'], total['rps'], total['errors'], total['error_rate'] * 100))
+    names = [name for name, _ in PERCENTILES]
+    out.write('%-32s %9s %10s %8s %s %9s  (latency ms)\n' % (
+        'request', 'requests', 'req/s', 'errors', ' '.join('%9s' % name for name in names), 'max'))
+    rows = sorted(summary['requests'].items()) + [('total', total)]
+    for label, stats in rows:
+        out.write('%-32s %9i %10.1f %8i %s %9s\n' % (
+            label[:32], stats['requests'], stats['rps'], stats['errors'],
+            ' '.join('%9s' % _ms(stats[name]) for name in names), _ms(stats['max'])))
+    out.write('\nstatus codes: %s\n' % ', '.join(
+        '%s: %i' % item for item in sorted(total['codes'].items())))
+
+
+# -- COMMAND LINE -------------------------------------------------------------
+
+class Options(usage.Options):
+    synopsis = 'txrest-load [options] [<root resource>]'
+    longdesc = ('Serve the resource tree <root resource> (the fully qualified name of a Resource, '
+                'or of a callable returning one) on 127.0.0.1 and drive it with concurrent '
+                'keep-alive connections.')
+    optParameters = [
+        ['connections', 'c', CONNECTIONS, 'The number of concurrent connections.', int],
+        ['duration', 'd', DURATION, 'The seconds to record responses for.', float],
+        ['warmup', None, WARMUP, 'The seconds to send requests for before recording.', float],
+        ['requests', 'n', None, 'Stop after this many recorded responses.', int],
+        ['method', 'm', 'GET', 'The http method of the --path requests.'],
+        ['mix', None, None, 'A json file with the list of requests to send.'],
+        ['workers', 'w', 0, 'The number of server worker processes, 0 serves from a single process.', int],
+        ['port', 'p', None, 'The port to serve on, a free port by default.', int],
+        ['target', 't', None, 'The host:port of a running server, instead of serving <root resource>.'],
+        ['seed', None, None, 'The seed of the request picker.', int],
+        ['save', None, None, 'Save the results to this json file.'],
+    ]
+
+    def __init__(self):
+        usage.Options.__init__(self)
+        self['paths'] = []
+
+    def opt_path(self, path):
+        """
+        A path to request (repeat it for several paths), / by default.
+        """
+        self['paths'].append(path)
+
+    def parseArgs(self, root=None):
+        self['root'] = root
+
+    def postOptions(self):
+        if (self['root'] is None) == (self['target'] is None):
+            raise usage.UsageError('give either a <root resource> or --target')
+        if self['mix'] is not None:
+            self['specs'] = load_mix(self['mix'])
+        else:
+            self['specs'] = [RequestSpec(self['method'], path) for path in self['paths'] or ['/']]
+
+
+def run(config, host, port):
+    """
+    Drive the server on ``host:port``, return the summary of the run.
+    """
+    from twisted.internet import reactor
+
+    load = LoadRun(config['specs'], '%s:%i' % (host, port), config['duration'], config['warmup'],
+                   config['requests'], config['seed'])
+    outcome = []
+
+    def start():
+        d = drive(reactor, load, host, port, config['connections'])
+        d.addBoth(outcome.append)
+        d.addBoth(lambda _: reactor.stop())
+
+    reactor.callWhenRunning(start)
+    reactor.run()
+    if isinstance(outcome[0], failure.Failure):
+        outcome[0].raiseException()
+    return load.summary()
+
+
+def main(argv=None):
+    """
+    Entry point of the ``txrest-load`` console script.
+    """
+    config = Options()
+    try:
+        config.parseOptions(argv)
+    except usage.UsageError as e:
+        sys.stderr.write('%s\n%s: error: %s\n' % (config, sys.argv[0], e))
+        sys.exit(2)
+
+    server = None
+    if config['target'] is not None:
+        host, _, port = config['target'].rpartition(':')
+        host, port = host or '127.0.0.1', int(port)
+    else:
+        host, port = '127.0.0.1', config['port'] or free_port()
+        server = start_server(config['root'], port, config['workers'])
+    try:
+        summary = run(config, host, port)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report(summary)
+    if config['save'] is not None:
+        with open(config['save'], 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+``txrest.metrics`` module.  In-process request metrics and a resource that serves them.
+
+A ``MetricsRegistry`` is a ``txrest.timing.MetricsSink`` that keeps counters, an
+in-flight gauge and a latency histogram per resource and http method.  Serve
+them with a ``MetricsResource`` (JSON, or the Prometheus text format with
+``?format=prometheus``)::
+
+    from txrest import RestResource
+    from txrest.metrics import MetricsRegistry, MetricsResource
+
+    registry = MetricsRegistry()
+    RestResource.METRICS = registry  # every resource
+
+    root.putChild(b'metrics', MetricsResource(registry))
+"""
+from bisect import bisect_left
+
+from txrest import DEFAULT_ENCODING
+from txrest.json import JsonResource
+from txrest.mixin import StringResponse
+from txrest.timing import MetricsSink, PHASES
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+PROMETHEUS_CONTENT_TYPE = b'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram(object):
+    """
+    A histogram with fixed bucket boundaries.
+
+    ``observe()`` only increments existing counters, nothing is allocated per
+    observation.
+
+    :buckets: the upper bounds of the buckets, in ascending order
+    :counts: the number of observations per bucket (not cumulative), the last
+             counter is the ``+Inf`` bucket
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Return a list of ``(upper bound, cumulative count)``, the last bound is None (``+Inf``)
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (None,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class EndpointMetrics(object):
+    """
+    The metrics of one http method of one resource.
+    """
+    __slots__ = ('requests', 'in_flight', 'codes', 'failures', 'disconnects', 'latency', 'phases')
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.in_flight = 0
+        self.codes = {}
+        self.failures = 0
+        self.disconnects = 0
+        self.latency = Histogram(buckets)
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+
+class MetricsRegistry(MetricsSink):
+    """
+    Collects the metrics of every resource that uses it as its ``METRICS`` sink.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, watchdog=None):
+        """
+        :param buckets: the latency histogram bucket bounds (seconds)
+        :param watchdog: (optional) a ``txrest.watchdog.ReactorWatchdog`` whose
+                         stalls are served with the metrics
+        """
+        self.buckets = tuple(buckets)
+        self.watchdog = watchdog
+        self.endpoints = {}  # (resource, method) -> EndpointMetrics
+
+    def endpoint(self, resource, method):
+        """
+        Return the ``EndpointMetrics`` of a resource and http method
+        """
+        key = (resource, method)
+        metrics = self.endpoints.get(key)
+        if metrics is None:
+            metrics = self.endpoints[key] = EndpointMetrics(self.buckets)
+        return metrics
+
+    def started(self, resource, method):
+        metrics = self.endpoint(resource, method)
+        metrics.requests += 1
+        metrics.in_flight += 1
+
+    def failed(self, resource, method, failure):
+        self.endpoint(resource, method).failures += 1
+
+    def disconnected(self, resource, method):
+        self.endpoint(resource, method).disconnects += 1
+
+    def record(self, resource, method, code, phases, duration):
+        metrics = self.endpoint(resource, method)
+        metrics.in_flight -= 1
+        if code is not None:
+            metrics.codes[code] = metrics.codes.get(code, 0) + 1
+        metrics.latency.observe(duration)
+        totals = metrics.phases
+        for name, seconds in phases.items():
+            totals[name] = totals.get(name, 0.0) + seconds
+
+    def snapshot(self):
+        """
+        Return the metrics as a JSON serializable dictionary.
+        """
+        resources = {}
+        for (resource, method), metrics in sorted(self.endpoints.items()):
+            latency = metrics.latency
+            resources.setdefault(resource, {})[method] = {
+                'requests': metrics.requests,
+                'in_flight': metrics.in_flight,
+                'codes': dict((str(code), count) for code, count in metrics.codes.items()),
+                'failures': metrics.failures,
+                'disconnects': metrics.disconnects,
+                'latency': {
+                    'count': latency.count,
+                    'sum': latency.sum,
+                    'buckets': [['+Inf' if bound is None else bound, count]
+                                for bound, count in latency.cumulative()],
+                },
+                'phases': dict((name, seconds) for name, seconds in metrics.phases.items() if seconds),
+            }
+        snapshot = {'resources': resources}
+        watchdog = self.watchdog
+        if watchdog is not None:
+            snapshot['reactor'] = {
+                'stalls': watchdog.stalls,
+                'max_lag': watchdog.max_lag,
+                'threshold': watchdog.threshold,
+                'offenders': watchdog.worst(),
+            }
+        return snapshot
+
+    def prometheus(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        counters = (
+            ('txrest_requests_total', 'counter', 'Requests received.', 'requests'),
+            ('txrest_requests_in_flight', 'gauge', 'Requests being handled.', 'in_flight'),
+            ('txrest_failures_total', 'counter', 'Requests that failed with an exception.', 'failures'),
+            ('txrest_disconnects_total', 'counter', 'Clients that disconnected before the response.',
+             'disconnects'),
+        )
+        endpoints = sorted(self.endpoints.items())
+        lines = []
+        for name, kind, help, attr in counters:
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for (resource, method), metrics in endpoints:
+                lines.append('%s{%s} %s' % (name, _labels(resource, method), getattr(metrics, attr)))
+
+        lines.append('# HELP txrest_responses_total Responses by status code.')
+        lines.append('# TYPE txrest_responses_total counter')
+        for (resource, method), metrics in endpoints:
+            labels = _labels(resource, method)
+            for code, count in sorted(metrics.codes.items()):
+                lines.append('txrest_responses_total{%s,code="%s"} %i' % (labels, code, count))
+
+        lines.append('# HELP txrest_request_duration_seconds Request latency.')
+        lines.append('# TYPE txrest_request_duration_seconds histogram')
+        for (resource, method), metrics in endpoints:
+            labels = _labels(resource, method)
+            for bound, count in metrics.latency.cumulative():
+                lines.append('txrest_request_duration_seconds_bucket{%s,le="%s"} %i' % (
+                    labels, '+Inf' if bound is None else repr(bound), count))
+            lines.append('txrest_request_duration_seconds_sum{%s} %r' % (labels, metrics.latency.sum))
+            lines.append('txrest_request_duration_seconds_count{%s} %i' % (labels, metrics.latency.count))
+
+        lines.append('# HELP txrest_phase_seconds_total Time spent in each phase of the requests.')
+        lines.append('# TYPE txrest_phase_seconds_total counter')
+        for (resource, method), metrics in endpoints:
+            labels = _labels(resource, method)
+            for phase in PHASES:
+                lines.append('txrest_phase_seconds_total{%s,phase="%s"} %r' % (
+                    labels, phase, metrics.phases.get(phase, 0.0)))
+
+        watchdog = self.watchdog
+        if watchdog is not None:
+            offenders = sorted(watchdog.offenders.items())
+            lines.append('# HELP txrest_reactor_stalls_total Reactor stalls by the code that was running.')
+            lines.append('# TYPE txrest_reactor_stalls_total counter')
+            for (resource, method, phase), stats in offenders:
+                lines.append('txrest_reactor_stalls_total{%s,phase="%s"} %i' % (
+                    _labels(resource, method or ''), phase or '', stats[0]))
+            lines.append('# HELP txrest_reactor_stall_seconds_total Time the reactor was stalled.')
+            lines.append('# TYPE txrest_reactor_stall_seconds_total counter')
+            for (resource, method, phase), stats in offenders:
+                lines.append('txrest_reactor_stall_seconds_total{%s,phase="%s"} %r' % (
+                    _labels(resource, method or ''), phase or '', stats[1]))
+            lines.append('# HELP txrest_reactor_stall_max_seconds The longest reactor stall.')
+            lines.append('# TYPE txrest_reactor_stall_max_seconds gauge')
+            lines.append('txrest_reactor_stall_max_seconds %r' % watchdog.max_lag)
+        lines.append('')
+        return '\n'.join(lines).encode('utf-8')
+
+
+def _labels(resource, method):
+    return 'resource="%s",method="%s"' % (
+        resource.replace('\\', '\\\\').replace('"', '\\"'), method.replace('"', '\\"'))
+
+
+@StringResponse.mixin
+class MetricsResource(JsonResource):
+    """
+    Serve the metrics of a ``MetricsRegistry`` as JSON, or in the Prometheus
+    text format with the query argument ``format=prometheus``.
+    """
+    isLeaf = True
+    METRICS = None  # don't measure the metrics endpoint itself
+
+    def __init__(self, registry, encoding=DEFAULT_ENCODING):
+        """
+        :param registry: the ``MetricsRegistry`` to serve
+        """
+        JsonResource.__init__(self, encoding)
+        self.registry = registry
+
+    def rest_GET(self, request):
+        if request.args.get(b'format') == [b'prometheus']:
+            request.setHeader(b'content-type', PROMETHEUS_CONTENT_TYPE)
+            return self.registry.prometheus()
+        return self.registry.snapshot()
@@ -1,5 +1,20 @@
 import types
-from txrest import RestResource
+import traceback
+import weakref
+import multiprocessing
+from collections import deque, namedtuple
+from functools import partial
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from twisted.internet.defer import Deferred
+from twisted.python import log
+
+from txrest import RestResource, sniff_body
+from txrest.limit import LimitExceeded
 
 
 class ResourceMixin(object):
@@ -66,7 +81,20 @@ class EmptyPost(ResourceMixin):
     The value of the ``post`` parameter passed into any function will be ``None``
     when empty, or white-space POST bodies are present.
     """
-    methods = ['_format_post']  # override these methods if we are mixed in.
+    methods = ['_format_post', '_parse_body']  # override these methods if we are mixed in.
+
+    def _parse_body(self, request, content, encoding):
+        """
+        Return None for an empty body without reading the whole body.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param content: a file-like object positioned at the start of the body
+        :param encoding: the desired encoding to decode the body with.
+        """
+        if not sniff_body(content):
+            return None
+        else:
+            return super(self.__class__, self)._parse_body(request, content, encoding)
 
     def _format_post(self, request, body, encoding):
         """
@@ -91,7 +119,26 @@ class FormEncodedPost(ResourceMixin):
     """
     WWW_FORM = 'application/x-www-form-urlencoded'
     FORM_DATA = 'multipart/form-data'
-    methods = ['_format_post']  # override _format_post
+    methods = ['_format_post', '_parse_body']  # override _format_post
+
+    @staticmethod
+    def _form_encoded(request):
+        content_type = request.getHeader('Content-Type')
+        return (True if (content_type == FormEncodedPost.WWW_FORM or
+                         FormEncodedPost.FORM_DATA in content_type) else False)
+
+    def _parse_body(self, request, content, encoding):
+        """
+        Forward request.args, the body is only parsed when it isn't a form.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param content: a file-like object positioned at the start of the body
+        :param encoding: the desired encoding to decode the body with.
+        """
+        if FormEncodedPost._form_encoded(request):
+            return request.args
+        else:
+            return super(self.__class__, self)._parse_body(request, content, encoding)
 
     def _format_post(self, request, body, encoding):
         """
@@ -102,11 +149,7 @@ class FormEncodedPost(ResourceMixin):
         :param encoding: a string that describes the desired encoding to pass into
                          ``json.loads(encoding='<encoding>')``
         """
-        content_type = request.getHeader('Content-Type')
-
-        form_encoded = (True if (content_type == FormEncodedPost.WWW_FORM or
-                                 FormEncodedPost.FORM_DATA in content_type) else False)
-        if form_encoded:
+        if FormEncodedPost._form_encoded(request):
             return request.args
         else:
             return super(self.__class__, self)._format_post(request, body, encoding)
@@ -139,3 +182,278 @@ class StringResponse(ResourceMixin):
             return response.encode(encoding)
         else:
             return super(self.__class__, self)._format_response(request, response, encoding)
+
+
+# -- HANDLER EXECUTION --------------------------------------------------------
+
+class RequestInfo(namedtuple('RequestInfo', ('method', 'uri', 'path', 'args', 'headers', 'client'))):
+    """
+    The fields of a ``twisted.web.server.Request`` passed to handlers that run in
+    another process (the request itself can't be sent to a worker).
+
+    :headers: a dictionary of lower-case header name -> last value
+    :client: the address of the client (or None)
+    """
+    __slots__ = ()
+
+
+def request_info(request):
+    """
+    Return the ``RequestInfo`` of a ``twisted.web.server.Request``
+    """
+    headers = {}
+    for name, values in request.requestHeaders.getAllRawHeaders():
+        headers[name.lower()] = values[-1]
+    if hasattr(request, 'getClientAddress'):
+        client = getattr(request.getClientAddress(), 'host', None)
+    else:
+        client = request.getClientIP()
+    return RequestInfo(request.method, request.uri, request.path, request.args, headers, client)
+
+
+class ProcessPoolFull(LimitExceeded):
+    """
+    Raised when a ``ProcessPool`` already has ``max_queued`` calls waiting, the
+    client is answered with a 503 (see ``RestResource.on_failure``)
+    """
+    pass
+
+
+class ProcessHandlerError(Exception):
+    """
+    A handler raised an exception in a worker process, the message is the
+    formatted traceback from the worker.
+    """
+    pass
+
+
+def _call_in_worker(payload):
+    """
+    Run a pickled ``(func, args)`` call, executed in the worker processes.
+
+    The result is pickled here (not by multiprocessing) so an unpicklable
+    result is reported as an error instead of never being delivered.
+    """
+    try:
+        func, args = pickle.loads(payload)
+        result = (True, func(*args))
+    except BaseException:
+        # SystemExit would kill the worker and the call would never be answered
+        result = (False, traceback.format_exc())
+    try:
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return pickle.dumps((False, traceback.format_exc()), pickle.HIGHEST_PROTOCOL)
+
+
+_POOLS = weakref.WeakSet()  # every ProcessPool, see ``start_process_pools``
+
+
+def start_process_pools():
+    """
+    Start every ``ProcessPool`` that was created, call it before ``reactor.run()``
+    """
+    for pool in list(_POOLS):
+        pool.start()
+
+
+class ProcessPool(object):
+    """
+    Run CPU bound ``rest_*`` handlers in a pool of worker processes.
+
+    The reactor (and the GIL) limit a server to a single core, handlers that
+    do heavy computation can run in other processes instead.  The handler must
+    be a module level function (it's sent to the workers by name), it receives
+    a ``RequestInfo`` and the post data, and returns the data structure that
+    is serialized on the reactor as usual::
+
+        POOL = ProcessPool(processes=4, initializer=load_model, maxtasksperchild=500)
+
+        def predict(request, post):
+            return {'label': MODEL.predict(post['features'])}
+
+        class Predict(JsonResource):
+            isLeaf = True
+            rest_POST = POOL.handler(predict)
+
+        POOL.start()
+        reactor.run()
+
+    The workers are forked by ``start``, which must be called before the
+    reactor runs: a fork of a running reactor inherits its sockets and threads.
+    (``txrest.runner`` starts every pool of a worker with ``start_process_pools``)
+
+    Calls wait in the pool's own queue until a worker is free.  When the client
+    disconnects the Deferred is cancelled (see ``RestResource.on_connection_closed``)
+    and a queued call is removed without ever reaching a worker; a call that is
+    already running completes and its result is discarded.  Calls beyond
+    ``max_queued`` are answered with a 503.
+
+    A call that hasn't returned after ``timeout`` seconds fails with
+    ``ProcessHandlerError``.  Its worker is still busy, the call keeps its slot
+    until the worker answers; a worker that was killed (out of memory, SIGKILL)
+    never answers, the slot is given back after another ``timeout`` seconds.
+
+    :running: the number of calls sent to a worker that haven't returned
+    :lost: the number of calls that timed out
+    """
+
+    def __init__(self, processes=None, initializer=None, initargs=(), maxtasksperchild=None,
+                 max_queued=1024, timeout=300, retry_after=1, clock=None):
+        """
+        :param processes: the number of workers, defaults to the number of cpus
+        :param initializer: (optional) called with ``initargs`` when each worker starts,
+                            use it to warm up workers (import modules, load data)
+        :param initargs: arguments passed to ``initializer``
+        :param maxtasksperchild: (optional) replace a worker after it ran this many calls
+        :param max_queued: the maximum number of calls waiting for a worker
+        :param timeout: seconds a call may run in a worker, None waits forever
+        :param retry_after: the Retry-After (seconds) sent when the queue is full
+        :param clock: (optional) an ``IReactorTime`` provider, the reactor by default
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self.initializer = initializer
+        self.initargs = initargs
+        self.maxtasksperchild = maxtasksperchild
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.clock = clock
+        self.lost = 0
+        self._queue = deque()  # (payload, deferred) waiting for a worker
+        self._running = {}  # deferred -> the timeout call (or None) of a call sent to a worker
+        self._pool = None
+        _POOLS.add(self)
+
+    @property
+    def running(self):
+        return len(self._running)
+
+    def start(self):
+        """
+        Start (and warm up) the worker processes, call it before ``reactor.run()``
+        """
+        if self._pool is not None:
+            return
+        from twisted.internet import reactor
+        if reactor.running:
+            log.msg('%r started while the reactor is running, the workers inherit '
+                    'its sockets and threads' % (self,))
+        self._pool = multiprocessing.Pool(
+            self.processes, self.initializer, self.initargs, self.maxtasksperchild)
+        reactor.addSystemEventTrigger('during', 'shutdown', self.stop)
+
+    def stop(self):
+        """
+        Terminate the worker processes, queued calls are cancelled.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        queue, self._queue = self._queue, deque()
+        running, self._running = self._running, {}
+        for d, timeout in running.items():
+            if timeout is not None and timeout.active():
+                timeout.cancel()
+            d.cancel()
+        for _, d in queue:
+            d.cancel()
+
+    def submit(self, func, *args):
+        """
+        Call ``func(*args)`` in a worker process.
+
+        :returns: a cancellable Deferred that fires with the result
+        :raises ProcessPoolFull: when ``max_queued`` calls are already waiting
+        :raises RuntimeError: when the pool wasn't started
+        """
+        if self._pool is None:
+            raise RuntimeError('%r is not running, call its start() before reactor.run()' % (self,))
+        if len(self._queue) >= self.max_queued:
+            raise ProcessPoolFull(
+                '%i calls are waiting for a worker process' % len(self._queue), self.retry_after)
+        # pickling here raises unpicklable arguments in the caller
+        payload = pickle.dumps((func, args), pickle.HIGHEST_PROTOCOL)
+        d = Deferred(self._cancel)
+        self._queue.append((payload, d))
+        self._dispatch()
+        return d
+
+    def handler(self, func):
+        """
+        Return a ``rest_*`` method that calls the module level function
+        ``func(request_info, *post)`` in a worker process.
+        """
+        pool = self
+
+        def rest(resource, request, *post):
+            return pool.submit(func, request_info(request), *post)
+
+        rest.__name__ = func.__name__
+        rest.__doc__ = func.__doc__
+        return rest
+
+    def __repr__(self):
+        return '<%s processes=%i>' % (self.__class__.__name__, self.processes)
+
+    def _call_later(self, delay, f, *args):
+        clock = self.clock
+        if clock is None:
+            from twisted.internet import reactor as clock
+        return clock.callLater(delay, f, *args)
+
+    def _dispatch(self):
+        while self._queue and len(self._running) < self.processes:
+            payload, d = self._queue.popleft()
+            timeout = None
+            if self.timeout is not None:
+                timeout = self._call_later(self.timeout, self._expire, d)
+            self._running[d] = timeout
+            self._pool.apply_async(_call_in_worker, (payload,), callback=partial(self._deliver, d))
+
+    def _deliver(self, d, data):
+        # called in the result handler thread of the multiprocessing pool
+        from twisted.internet import reactor
+        reactor.callFromThread(self._done, d, data)
+
+    def _release(self, d):
+        """
+        Give the slot of the call ``d`` back, return False when it was already given back.
+        """
+        if d not in self._running:
+            return False
+        timeout = self._running.pop(d)
+        if timeout is not None and timeout.active():
+            timeout.cancel()
+        if self._pool is not None:
+            self._dispatch()
+        return True
+
+    def _expire(self, d):
+        # the worker died, or the call takes longer than ``timeout``
+        if d not in self._running:
+            return
+        self.lost += 1
+        # the worker is still busy, keep the slot until it answers (a killed worker never does)
+        self._running[d] = self._call_later(self.timeout, self._release, d)
+        if not d.called:
+            d.errback(ProcessHandlerError(
+                'no result after %s secs, the worker process may have died' % self.timeout))
+
+    def _done(self, d, data):
+        if not self._release(d):
+            return  # the worker answered after its slot was given back
+        if d.called:
+            return  # cancelled or timed out while running, no one is waiting for the result
+        ok, result = pickle.loads(data)
+        if ok:
+            d.callback(result)
+        else:
+            d.errback(ProcessHandlerError(result))
+
+    def _cancel(self, d):
+        for item in self._queue:
+            if item[1] is d:
+                self._queue.remove(item)
+                break
@@ -0,0 +1,69 @@
+"""
+``txrest.offload`` module.  Run CPU heavy work (serialization / parsing) in threads.
+
+``RestResource`` serializes responses and parses request bodies on the reactor
+thread, a single very large payload blocks every other connection while it's
+being encoded.  Resources with an ``OFFLOAD_THRESHOLD`` hand large payloads to
+an ``OffloadPool`` instead, the result is delivered back on the reactor thread.
+
+Every resource shares ``DEFAULT_POOL`` unless it's given a pool of its own::
+
+    from txrest.offload import OffloadPool
+
+    class Export(JsonResource):
+        OFFLOAD_THRESHOLD = 1024 * 1024
+        OFFLOAD_POOL = OffloadPool(size=2, name='export')
+"""
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
+DEFAULT_POOL_SIZE = 4
+
+
+class OffloadPool(object):
+    """
+    A bounded pool of threads, started when it's first used and stopped
+    when the reactor shuts down.
+
+    :size: the maximum number of threads
+    :name: the name of the pool (used for the thread names)
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, name='txrest-offload'):
+        """
+        :param size: maximum number of threads, work beyond that is queued
+        :param name: the name of the pool
+        """
+        self.size = size
+        self.name = name
+        self._pool = None
+
+    def run(self, f, *args, **kwargs):
+        """
+        Call ``f(*args, **kwargs)`` in a thread of the pool.
+
+        :returns: a Deferred that fires (on the reactor thread) with the result of ``f``
+        """
+        from twisted.internet import reactor
+        if self._pool is None:
+            self._start(reactor)
+        return deferToThreadPool(reactor, self._pool, f, *args, **kwargs)
+
+    def _start(self, reactor):
+        self._pool = ThreadPool(0, self.size, self.name)
+        self._pool.start()
+        reactor.addSystemEventTrigger('during', 'shutdown', self.stop)
+
+    def stop(self):
+        """
+        Stop the threads of the pool, waiting for the work in progress.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.stop()
+
+    def __repr__(self):
+        return '<%s %s size=%i>' % (self.__class__.__name__, self.name, self.size)
+
+
+DEFAULT_POOL = OffloadPool()
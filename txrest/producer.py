@@ -0,0 +1,104 @@
+"""
+``txrest.producer`` module.  Producers used to write large or streamed response bodies.
+
+Writing a large body with a single ``request.write()`` copies all of it into the
+transport's buffer, no matter how quickly the client is reading.  The producers
+in this module are registered with the request instead, Twisted only asks them
+for the next chunk when the socket buffer has drained.
+"""
+from zope.interface import implementer
+
+from twisted.internet.interfaces import IPullProducer
+from twisted.internet.defer import Deferred
+from twisted.python import failure
+
+
+class ProducerStopped(Exception):
+    """
+    Raised (as a Failure) when the transport stops a producer before the
+    body was completely written, typically because the client went away.
+    """
+    pass
+
+
+@implementer(IPullProducer)
+class ChunkProducer(object):
+    """
+    Write an iterable of byte strings to a request one chunk at a time.
+
+    Each time the transport is ready for more data ``resumeProducing`` writes
+    the next non-empty chunk.  When the transport's buffer is full Twisted
+    stops asking, so at most one chunk sits in memory per slow client.
+
+    Usage::
+
+        producer = ChunkProducer(request, chunks)
+        d = producer.start()
+        d.addCallback(lambda _: request.finish())
+
+    The deferred returned by ``start()`` fires with None when every chunk has
+    been written (the producer has been unregistered at that point).  It fails
+    with ``ProducerStopped`` if the connection was lost, or with the exception
+    raised while iterating the chunks.
+    """
+
+    def __init__(self, request, chunks):
+        """
+        :param request: ``twisted.web.server.Request`` instance
+        :param chunks: an iterable of bytes
+        """
+        self.request = request
+        self.chunks = iter(chunks)
+        self.deferred = Deferred()
+
+    def start(self):
+        """
+        Register with the request and begin producing.
+        """
+        self.request.registerProducer(self, False)
+        return self.deferred
+
+    def resumeProducing(self):
+        """
+        Write the next chunk, called by the transport when it wants more data.
+        """
+        if self.chunks is None:
+            return
+        try:
+            for chunk in self.chunks:
+                if chunk:
+                    self.request.write(chunk)
+                    return
+        except Exception:
+            self._finish(failure.Failure())
+        else:
+            self._finish(None)
+
+    def stopProducing(self):
+        """
+        Called by the transport when the connection has been lost.
+        """
+        if self.chunks is None:
+            return
+        self.chunks = None
+        # the request lost its channel, there is nothing to unregister from.
+        self.deferred.errback(failure.Failure(ProducerStopped('Connection lost while producing')))
+
+    def _finish(self, result):
+        self.chunks = None
+        self.request.unregisterProducer()
+        if result is None:
+            self.deferred.callback(None)
+        else:
+            self.deferred.errback(result)
+
+
+def slices(data, size):
+    """
+    Split ``data`` into byte strings of at most ``size`` bytes, lazily.
+
+    :param data: bytes
+    :param size: maximum length of each slice
+    """
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
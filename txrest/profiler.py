@@ -0,0 +1,156 @@
+"""
+``txrest.profiler`` module.  Sample profiles of live requests.
+
+Running a server under ``cProfile`` slows down every request.  A
+``RequestProfiler`` only profiles a fraction of the requests (and requests
+carrying a trusted header), and only while their ``rest_*`` method and
+``_format_response`` run.  The profiles are aggregated per resource and method
+and served on demand by a ``ProfilerResource``::
+
+    from txrest import RestResource
+    from txrest.profiler import RequestProfiler, ProfilerResource
+
+    profiler = RequestProfiler(rate=0.01, header=b'x-profile', token=b'secret')
+    RestResource.PROFILER = profiler
+
+    admin.putChild(b'profile', ProfilerResource(profiler))  # keep it off the public tree
+
+``GET /profile`` lists the profiled methods, ``GET /profile?resource=..&method=..``
+returns the ``pstats`` report of one of them and ``DELETE /profile`` discards
+the collected profiles.
+"""
+import hmac
+import random
+import pstats
+
+try:
+    import cProfile as profile
+except ImportError:
+    import profile
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from twisted.web.http import BAD_REQUEST, NOT_FOUND
+
+from txrest import DEFAULT_ENCODING
+from txrest.json import JsonResource
+from txrest.mixin import StringResponse
+
+SORT_KEYS = frozenset(pstats.Stats.sort_arg_dict_default)  # the ``sort`` values of a report
+
+
+class RequestProfiler(object):
+    """
+    Decide which requests are profiled and aggregate their profiles.
+
+    :profiled: a dictionary of (resource, method name) -> number of profiled requests
+    """
+
+    def __init__(self, rate=0.01, header=None, token=None):
+        """
+        :param rate: the fraction of requests to profile (0 - 1)
+        :param header: (optional) the name of a request header that turns on
+                       profiling for a request...
+        :param token: ...when its value is ``token``
+        """
+        self.rate = rate
+        self.header = header
+        self.token = token
+        self.profiled = {}
+        self._stats = {}  # (resource, method name) -> pstats.Stats
+
+    def sample(self, request):
+        """
+        Return a new profile when ``request`` should be profiled, otherwise None.
+        """
+        if self.header is not None and self.token is not None:
+            value = request.getHeader(self.header)
+            # constant time, the token mustn't be guessable one character at a time
+            if value is not None and hmac.compare_digest(value, self.token):
+                return profile.Profile()
+        if self.rate and random.random() < self.rate:
+            return profile.Profile()
+        return None
+
+    def collect(self, resource, method, prof):
+        """
+        Add the profile of a finished request to the aggregate of its resource and method.
+
+        A profile that never ran (no function calls were recorded) is ignored.
+        """
+        key = (resource, method)
+        stats = self._stats.get(key)
+        try:
+            if stats is None:
+                self._stats[key] = pstats.Stats(prof)
+            else:
+                stats.add(prof)
+        except TypeError:
+            return  # pstats refuses a profile without stats
+        self.profiled[key] = self.profiled.get(key, 0) + 1
+
+    def report(self, resource, method, sort='cumulative', limit=40):
+        """
+        Return the ``pstats`` report of a resource and method, or None when it
+        hasn't been profiled.
+        """
+        stats = self._stats.get((resource, method))
+        if stats is None:
+            return None
+        stream = StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def reset(self):
+        """
+        Discard the collected profiles.
+        """
+        self.profiled.clear()
+        self._stats.clear()
+
+
+@StringResponse.mixin
+class ProfilerResource(JsonResource):
+    """
+    Admin resource serving the profiles of a ``RequestProfiler``.
+    """
+    isLeaf = True
+    PROFILER = None  # don't profile the profiler
+    METRICS = None
+
+    def __init__(self, profiler, encoding=DEFAULT_ENCODING):
+        """
+        :param profiler: the ``RequestProfiler`` to serve
+        """
+        JsonResource.__init__(self, encoding)
+        self.profiler = profiler
+
+    def rest_GET(self, request):
+        args = request.args
+        if b'resource' not in args or b'method' not in args:
+            return [{'resource': resource, 'method': method, 'requests': count}
+                    for (resource, method), count in sorted(self.profiler.profiled.items())]
+        sort = args.get(b'sort', [b'cumulative'])[0]
+        if sort not in SORT_KEYS:
+            return self.ERROR_CLASS(BAD_REQUEST, 'Invalid Sort', 'sort must be one of: %s' % (
+                ', '.join(sorted(SORT_KEYS)),))
+        try:
+            limit = int(args.get(b'limit', [40])[0])
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return self.ERROR_CLASS(BAD_REQUEST, 'Invalid Limit', 'limit must be a positive integer')
+        report = self.profiler.report(args[b'resource'][0], args[b'method'][0], sort, limit)
+        if report is None:
+            return self.ERROR_CLASS(NOT_FOUND, 'Not Profiled', 'no profiles of (%s) [%s]' % (
+                args[b'resource'][0], args[b'method'][0]))
+        request.setHeader(b'content-type', b'text/plain; charset=utf-8')
+        return report
+
+    def rest_DELETE(self, request):
+        self.profiler.reset()
+        return {'reset': True}
@@ -0,0 +1,349 @@
+"""
+``txrest.runner`` module.  Serve a resource tree with one process per core.
+
+A single Twisted process only ever uses one core.  The runner forks a number of
+worker processes that accept connections on the same port, every worker runs
+its own reactor and its own copy of the resource tree.  The parent process only
+supervises: it restarts workers that exit and logs the stats each worker reports.
+
+The root resource is given by its fully qualified name, either a ``Resource``
+instance or a callable returning one (called once in each worker)::
+
+    txrest --port 8080 --workers 4 myapp.api.root
+
+The listening socket is created by the parent and inherited by the workers,
+with ``--reuse-port`` each worker binds its own ``SO_REUSEPORT`` socket instead
+and the kernel balances new connections between them.
+
+The reactor is only imported in the workers (after the fork), modules that
+import the reactor must not be imported by the parent.
+"""
+from __future__ import absolute_import
+import errno
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+from twisted.python import log, usage
+from twisted.python.reflect import namedAny
+
+STATS_INTERVAL = 10  # seconds between stats reports
+MIN_UPTIME = 1.0  # a worker exiting sooner than this is restarted with a backoff
+MAX_BACKOFF = 30.0  # the longest delay (seconds) before restarting a crashing worker
+
+
+class Options(usage.Options):
+    synopsis = 'txrest [options] <root resource>'
+    longdesc = ('Serve the resource tree <root resource> (the fully qualified name of a '
+                'Resource, or of a callable returning one) with a pool of worker processes.')
+    optParameters = [
+        ['port', 'p', 8080, 'The port to listen on.', int],
+        ['interface', 'i', '', 'The interface to listen on (all interfaces by default).'],
+        ['workers', 'w', None, 'The number of worker processes, the number of cpus by default. '
+                               '0 serves from this process without forking.', int],
+        ['backlog', 'b', 128, 'The size of the listen queue.', int],
+        ['stats-interval', None, STATS_INTERVAL, 'Seconds between worker stats reports, 0 disables them.', int],
+    ]
+    optFlags = [
+        ['reuse-port', 'r', 'Each worker listens on its own SO_REUSEPORT socket.'],
+    ]
+
+    def parseArgs(self, root):
+        self['root'] = root
+
+    def postOptions(self):
+        if self['workers'] is None:
+            import multiprocessing
+            self['workers'] = multiprocessing.cpu_count()
+        if self['reuse-port'] and not hasattr(socket, 'SO_REUSEPORT'):
+            raise usage.UsageError('SO_REUSEPORT is not supported on this platform')
+
+
+def listen_socket(interface, port, backlog, reuse_port=False):
+    """
+    Return a bound, listening, non-blocking TCP socket.
+    """
+    family = socket.AF_INET6 if ':' in interface else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((interface, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def load_root(name):
+    """
+    Import the root resource named ``name`` (``package.module.attr`` or
+    ``package.module:attr``), calling it when it isn't a resource itself.
+    """
+    from twisted.web.resource import IResource
+    root = namedAny(name.replace(':', '.'))
+    if not IResource.providedBy(root):
+        root = root()
+    return root
+
+
+class WorkerStats(object):
+    """
+    Request counters of a worker, updated by ``StatsSite``.
+
+    :requests: requests received
+    :finished: requests that completed (or whose connection was lost)
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.started = time.time()
+        self.requests = 0
+        self.finished = 0
+
+    def snapshot(self):
+        return {
+            'index': self.index,
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'active': self.requests - self.finished,
+        }
+
+
+def make_site(root, stats):
+    """
+    Return a ``twisted.web.server.Site`` for ``root`` that counts requests in ``stats``
+    """
+    from twisted.web import server
+
+    class StatsSite(server.Site):
+        def getResourceFor(self, request):
+            stats.requests += 1
+            request.notifyFinish().addBoth(self._request_done)
+            return server.Site.getResourceFor(self, request)
+
+        def _request_done(self, _):
+            stats.finished += 1
+
+    return StatsSite(root)
+
+
+def run_worker(config, index, sock, stats_fd=None):
+    """
+    Serve requests in this (worker) process until the reactor stops.
+
+    :param sock: the inherited listening socket, None to bind a new ``SO_REUSEPORT`` socket
+    :param stats_fd: (optional) a pipe to write the stats reports to
+    """
+    from twisted.internet import reactor, task
+    from txrest.mixin import start_process_pools
+
+    if sock is None:
+        sock = listen_socket(config['interface'], config['port'], config['backlog'], reuse_port=True)
+    stats = WorkerStats(index)
+    site = make_site(load_root(config['root']), stats)
+    start_process_pools()  # fork the pools of the tree before the reactor runs
+    reactor.adoptStreamPort(sock.fileno(), sock.family, site)
+    sock.close()  # the reactor has its own copy
+
+    if stats_fd is not None and config['stats-interval']:
+        def report():
+            try:
+                os.write(stats_fd, (json.dumps(stats.snapshot()) + '\n').encode('ascii'))
+            except OSError:
+                pass  # the supervisor went away
+        task.LoopingCall(report).start(config['stats-interval'], now=False)
+
+    log.msg('worker %i (pid %i) serving %s on port %i' % (index, os.getpid(), config['root'], config['port']))
+    log.callWithContext({'system': 'worker-%i' % index}, reactor.run)
+
+
+class Worker(object):
+    """
+    The supervisor's record of a worker process.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.pid = None
+        self.started = None
+        self.restarts = 0
+        self.backoff = 0.0
+        self.restart_at = 0.0
+        self.stats_fd = None
+        self.buffer = b''
+        self.stats = None
+
+
+class Supervisor(object):
+    """
+    Fork the workers, restart them when they exit and log their stats.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.sock = None
+        self.running = True
+        self.workers = [Worker(index) for index in range(config['workers'])]
+
+    def run(self):
+        if not self.config['reuse-port']:
+            self.sock = listen_socket(self.config['interface'], self.config['port'], self.config['backlog'])
+        signal.signal(signal.SIGTERM, self.shutdown)
+        signal.signal(signal.SIGINT, self.shutdown)
+
+        next_report = time.time() + (self.config['stats-interval'] or 0)
+        while self.running:
+            now = time.time()
+            for worker in self.workers:
+                if worker.pid is None and worker.restart_at <= now:
+                    self.spawn(worker)
+            self.read_stats(1.0)
+            self.reap()
+            if self.config['stats-interval'] and time.time() >= next_report:
+                next_report += self.config['stats-interval']
+                self.report()
+        self.stop_workers()
+
+    def spawn(self, worker):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # -- the worker process --
+            os.close(read_fd)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            for other in self.workers:
+                if other.stats_fd is not None:
+                    os.close(other.stats_fd)
+            code = 0
+            try:
+                run_worker(self.config, worker.index, self.sock, write_fd)
+            except Exception:
+                log.err(None, 'worker %i failed' % worker.index)
+                code = 1
+            os._exit(code)
+
+        os.close(write_fd)
+        worker.pid = pid
+        worker.started = time.time()
+        worker.stats_fd = read_fd
+        worker.buffer = b''
+        worker.stats = None
+
+    def read_stats(self, timeout):
+        fds = [worker.stats_fd for worker in self.workers if worker.stats_fd is not None]
+        try:
+            readable = select.select(fds, [], [], timeout)[0] if fds else []
+        except (select.error, OSError) as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            return
+        if not fds:
+            time.sleep(timeout)
+        for worker in self.workers:
+            if worker.stats_fd in readable:
+                data = os.read(worker.stats_fd, 4096)
+                if not data:
+                    os.close(worker.stats_fd)
+                    worker.stats_fd = None
+                    continue
+                lines = (worker.buffer + data).split(b'\n')
+                worker.buffer = lines.pop()
+                if lines:
+                    worker.stats = json.loads(lines[-1].decode('ascii'))
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                return  # ECHILD, no workers
+            if not pid:
+                return
+            for worker in self.workers:
+                if worker.pid == pid:
+                    self.exited(worker, status)
+
+    def exited(self, worker, status):
+        uptime = time.time() - worker.started
+        pid, worker.pid = worker.pid, None
+        if worker.stats_fd is not None:
+            os.close(worker.stats_fd)
+            worker.stats_fd = None
+        if not self.running:
+            return
+        worker.restarts += 1
+        if uptime < MIN_UPTIME:
+            # crashing on start-up, don't fork in a tight loop
+            worker.backoff = min(MAX_BACKOFF, (worker.backoff * 2) or MIN_UPTIME)
+        else:
+            worker.backoff = 0.0
+        worker.restart_at = time.time() + worker.backoff
+        if os.WIFSIGNALED(status):
+            reason = 'was killed by signal %i' % os.WTERMSIG(status)
+        else:
+            reason = 'exited with status %i' % os.WEXITSTATUS(status)
+        log.msg('worker %i (pid %i) %s after %.1f secs, restarting in %.1f secs' % (
+            worker.index, pid, reason, uptime, worker.backoff))
+
+    def report(self):
+        total = 0
+        for worker in self.workers:
+            stats = worker.stats
+            if stats is None or worker.pid is None:
+                log.msg('worker %i: not running (restarts %i)' % (worker.index, worker.restarts))
+                continue
+            total += stats['requests']
+            log.msg('worker %i (pid %i): %i requests, %i active, uptime %.0fs, restarts %i' % (
+                worker.index, stats['pid'], stats['requests'], stats['active'], stats['uptime'],
+                worker.restarts))
+        log.msg('%i workers: %i requests' % (len(self.workers), total))
+
+    def shutdown(self, signum, frame):
+        self.running = False
+
+    def stop_workers(self, timeout=10):
+        for worker in self.workers:
+            if worker.pid is not None:
+                try:
+                    os.kill(worker.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+        deadline = time.time() + timeout
+        while any(worker.pid is not None for worker in self.workers) and time.time() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for worker in self.workers:
+            if worker.pid is not None:
+                os.kill(worker.pid, signal.SIGKILL)
+        self.reap()
+
+
+def main(argv=None):
+    """
+    Entry point of the ``txrest`` console script.
+    """
+    config = Options()
+    try:
+        config.parseOptions(argv)
+    except usage.UsageError as e:
+        sys.stderr.write('%s\n%s: error: %s\n' % (config, sys.argv[0], e))
+        sys.exit(2)
+
+    log.startLogging(sys.stdout)
+    if config['workers'] == 0:
+        sock = listen_socket(config['interface'], config['port'], config['backlog'])
+        run_worker(config, 0, sock)
+    else:
+        Supervisor(config).run()
+
+
+if __name__ == '__main__':
+    main()
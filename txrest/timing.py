@@ -0,0 +1,127 @@
+"""
+``txrest.timing`` module.  Per-request phase timing.
+
+When a resource has ``SERVER_TIMING`` enabled, or a ``METRICS`` sink, every
+request carries a ``PhaseTimer`` (``request.timer``) that records how long
+each phase of the request took:
+
+:read: decompressing / reading the POST or PUT body
+:parse: ``_format_post`` / ``_parse_body``
+:handler: the ``rest_*`` method, until its Deferred fires
+:resource: a Resource returned by a ``rest_*`` method, until it's rendered
+:serialize: ``_format_response``
+:write: writing the body, until the request is finished
+
+``SERVER_TIMING`` sends the phases (completed when the body is written) to the
+client in the ``Server-Timing`` header, a ``MetricsSink`` receives all of them
+when the request is finished::
+
+    class Slow(JsonResource):
+        SERVER_TIMING = True
+        METRICS = LogMetricsSink()
+"""
+import time
+
+from twisted.python import log
+
+PHASES = ('read', 'parse', 'handler', 'resource', 'serialize', 'write')
+
+
+class PhaseTimer(object):
+    """
+    Accumulates the durations (in seconds) of the phases of a request.
+
+    :started: the epoch the timer was created at
+    :phases: a dictionary of phase name -> seconds
+    """
+    __slots__ = ('started', 'phases', '_begun')
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}
+        self._begun = {}
+
+    def begin(self, name):
+        """
+        Mark the start of the phase ``name``
+        """
+        self._begun[name] = time.time()
+
+    def end(self, name):
+        """
+        Mark the end of the phase ``name``, a phase that didn't begin is ignored.
+        """
+        start = self._begun.pop(name, None)
+        if start is not None:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.time() - start)
+
+    def header(self):
+        """
+        Return the value of a ``Server-Timing`` header (durations in milliseconds)
+        """
+        parts = []
+        for name in PHASES:
+            if name in self.phases:
+                parts.append('%s;dur=%.3f' % (name, self.phases[name] * 1000))
+        parts.append('total;dur=%.3f' % ((time.time() - self.started) * 1000))
+        return ', '.join(parts).encode('ascii')
+
+
+class MetricsSink(object):
+    """
+    Receives the phase timings of finished requests.
+
+    Subclass it and assign an instance to the ``METRICS`` class attribute of a
+    ``RestResource`` (or of ``RestResource`` itself, for every resource).
+    """
+
+    def started(self, resource, method):
+        """
+        Called when a request is received, before the rest_* method is called.
+
+        :param resource: the fully qualified name of the resource class
+        :param method: the http method of the request, ``txrest.OTHER_METHOD`` for
+                       methods the resource doesn't allow
+        """
+        pass
+
+    def failed(self, resource, method, failure):
+        """
+        Called when a rest_* method raised (or its Deferred failed), a request
+        whose client disconnected is only counted by ``disconnected``.
+
+        :param failure: ``twisted.python.failure.Failure`` instance
+        """
+        pass
+
+    def disconnected(self, resource, method):
+        """
+        Called when the client disconnected before the response was sent.
+        """
+        pass
+
+    def record(self, resource, method, code, phases, duration):
+        """
+        Called once for every finished request (including requests whose
+        connection was lost).
+
+        :param resource: the fully qualified name of the resource class
+        :param method: the http method of the request, ``txrest.OTHER_METHOD`` for
+                       methods the resource doesn't allow
+        :param code: the http status code of the response, None when the client
+                     disconnected before the response was sent
+        :param phases: a dictionary of phase name -> seconds, see ``PHASES``
+        :param duration: the total duration of the request in seconds
+        """
+        pass
+
+
+class LogMetricsSink(MetricsSink):
+    """
+    Log the phase timings of every request.
+    """
+
+    def record(self, resource, method, code, phases, duration):
+        log.msg('%s %s %s %.1fms (%s)' % (
+            resource, method, code, duration * 1000,
+            ', '.join('%s %.1fms' % (name, phases[name] * 1000) for name in PHASES if name in phases)))
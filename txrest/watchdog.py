@@ -0,0 +1,203 @@
+"""
+``txrest.watchdog`` module.  Detect reactor stalls and attribute them to resources.
+
+Handlers and serialization run on the reactor thread, a ``rest_*`` method that
+blocks (or a huge ``_format_response``) stalls every connection.  A
+``ReactorWatchdog`` measures the lag of a periodic reactor call; a monitor
+thread looks at the reactor thread's stack while a stall is in progress and
+records the resource, ``method_called`` and phase it was executing::
+
+    from txrest.metrics import MetricsRegistry
+    from txrest.watchdog import ReactorWatchdog
+
+    watchdog = ReactorWatchdog(threshold=0.1)
+    watchdog.start()
+    registry = MetricsRegistry(watchdog=watchdog)  # stalls are served with the metrics
+
+The stack is only inspected while the reactor is stalled, the cost for
+requests that don't block is nil.  Only the code objects of the stack are read
+(the locals of another thread's frames aren't safe to touch): a stall is
+attributed to the resource class that defines the function that was running, a
+``rest_*`` method of the resource itself, or the base class whose
+``_format_response`` (for instance) it inherited.
+"""
+import sys
+import threading
+import time
+
+from twisted.python import log
+
+DEFAULT_THRESHOLD = 0.1  # seconds of lag that count as a stall
+DEFAULT_INTERVAL = 0.05  # seconds between reactor ticks
+
+# rest resource methods on the stack -> the phase of the request
+PHASE_FUNCTIONS = {
+    '_call': 'handler',
+    '_read_body': 'read',
+    '_parse_body': 'parse',
+    '_format_post': 'parse',
+    '_format_response': 'serialize',
+    '_serialize_shared': 'serialize',
+    '_format_stream': 'write',
+    '_write_body': 'write',
+    '_write_validated': 'write',
+    'on_response': 'response',
+    'on_failure': 'failure',
+    'render': 'render',
+}
+UNKNOWN = ('unknown', None, None)
+
+
+def is_handler(name):
+    """
+    Return True when ``name`` is the name of a ``rest_*`` method (or the ``rest`` fallback)
+    """
+    from txrest import REST_METHOD, REST_METHOD_PREFIX
+    return name == REST_METHOD or (name.startswith(REST_METHOD_PREFIX) and name != REST_METHOD_PREFIX)
+
+
+def resource_codes():
+    """
+    Return a dictionary of code object -> (resource, method_called) of the
+    methods defined by every ``RestResource`` subclass, method_called is None
+    for the methods that aren't ``rest_*`` methods.
+    """
+    from txrest import RestResource
+    codes = {}
+    classes = [RestResource]
+    seen = set()
+    while classes:
+        cls = classes.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        classes.extend(cls.__subclasses__())
+        fq_name = cls.__module__ + '.' + cls.__name__
+        for name, value in list(vars(cls).items()):
+            code = getattr(getattr(value, '__func__', value), '__code__', None)
+            if code is not None:
+                codes[code] = (fq_name, name if is_handler(name) else None)
+    return codes
+
+
+class ReactorWatchdog(object):
+    """
+    Measure reactor lag and record who caused each stall.
+
+    :stalls: the number of stalls
+    :max_lag: the longest stall (seconds)
+    :offenders: a dictionary of (resource, method_called, phase) -> [stalls, total lag, worst lag]
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, interval=DEFAULT_INTERVAL, log_stalls=True):
+        """
+        :param threshold: seconds of lag that count as a stall
+        :param interval: seconds between reactor ticks (and stack checks)
+        :param log_stalls: log a message for every stall
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.log_stalls = log_stalls
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.offenders = {}
+        self._last_tick = None
+        self._pending = None  # (tick, attribution) captured by the monitor thread
+        self._thread_id = None
+        self._codes = {}  # code object -> (resource, method_called), see ``_attribute``
+        self._loop = None
+        self._running = False
+
+    def start(self, reactor=None):
+        """
+        Start watching, the ticks start when the reactor is running.
+        """
+        if reactor is None:
+            from twisted.internet import reactor
+        reactor.callWhenRunning(self._start, reactor)
+
+    def _start(self, reactor):
+        from twisted.internet import task
+        self._thread_id = threading.current_thread().ident
+        self._last_tick = time.time()
+        self._running = True
+        self._loop = task.LoopingCall(self._tick)
+        self._loop.clock = reactor
+        self._loop.start(self.interval, now=False)
+        monitor = threading.Thread(target=self._monitor, name='txrest-watchdog')
+        monitor.daemon = True
+        monitor.start()
+        reactor.addSystemEventTrigger('before', 'shutdown', self.stop)
+
+    def stop(self):
+        self._running = False
+        if self._loop is not None and self._loop.running:
+            self._loop.stop()
+
+    def _tick(self):
+        # runs on the reactor thread
+        now = time.time()
+        last, self._last_tick = self._last_tick, now
+        lag = now - last - self.interval
+        if lag > self.threshold:
+            pending = self._pending
+            attribution = pending[1] if pending is not None and pending[0] == last else UNKNOWN
+            self._record(attribution, lag)
+        self._pending = None
+
+    def _monitor(self):
+        # runs in the monitor thread
+        while self._running:
+            time.sleep(self.interval)
+            last = self._last_tick
+            if time.time() - last > self.threshold + self.interval:
+                pending = self._pending
+                if pending is None or pending[0] != last:
+                    self._pending = (last, self._attribute())
+
+    def _attribute(self):
+        """
+        Return the (resource, method_called, phase) the reactor thread is executing.
+
+        Runs in the monitor thread, only the code objects of the reactor
+        thread's frames are read.
+        """
+        frame = sys._current_frames().get(self._thread_id)
+        rebuilt = False
+        while frame is not None:
+            code = frame.f_code
+            phase = PHASE_FUNCTIONS.get(code.co_name)
+            if phase is None and is_handler(code.co_name):
+                phase = 'handler'
+            if phase is not None:
+                owner = self._codes.get(code)
+                if owner is None and not rebuilt:
+                    # a resource class defined (or imported) since the last stall
+                    self._codes = resource_codes()
+                    owner = self._codes.get(code)
+                    rebuilt = True
+                if owner is not None:
+                    return owner + (phase,)
+            frame = frame.f_back
+        return UNKNOWN
+
+    def _record(self, attribution, lag):
+        self.stalls += 1
+        self.max_lag = max(self.max_lag, lag)
+        stats = self.offenders.get(attribution)
+        if stats is None:
+            stats = self.offenders[attribution] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += lag
+        stats[2] = max(stats[2], lag)
+        if self.log_stalls:
+            log.msg('reactor stalled for %.3f secs in (%s) [%s] %s' % ((lag,) + attribution))
+
+    def worst(self, limit=10):
+        """
+        Return the ``limit`` offenders with the longest stalls, as dictionaries.
+        """
+        ranked = sorted(self.offenders.items(), key=lambda item: item[1][2], reverse=True)
+        return [{'resource': key[0], 'method': key[1], 'phase': key[2],
+                 'stalls': stats[0], 'total': stats[1], 'worst': stats[2]}
+                for key, stats in ranked[:limit]]
@@ -2,6 +2,7 @@
 This module implements XML-based Rest Resource Endpoint handling.
 """
 from __future__ import absolute_import
+from copy import deepcopy
 from textwrap import dedent
 
 try:
@@ -24,12 +25,13 @@ except ImportError:
 
 from unicodedata import normalize
 import logging
+import re
 
 from twisted.python import log
 from twisted.web import resource
 from twisted.web.http import BAD_REQUEST
 
-from txrest import RestResource, DEFAULT_ENCODING
+from txrest import RestResource, DEFAULT_ENCODING, BODY_CHUNK_SIZE, display_tracebacks, sniff_body
 
 '''
 we don't know which element type the client will be using,
@@ -70,6 +72,10 @@ except ImportError:
 
 ACCEPT_HEADER = b'application/xml'
 CONTENT_TYPE_HEADER = b'application/xml; charset=%s'
+XML_START = re.compile(br'\s*<\?xml')
+MAX_ERROR_BODIES = 256  # error page bodies without detail kept for reuse
+
+_error_bodies = {}  # (page class, code, brief, encoding) -> body
 
 
 class XmlErrorPage(resource.ErrorPage):
@@ -86,7 +92,7 @@ class XmlErrorPage(resource.ErrorPage):
     </ErrorPage>
     ''').strip()
 
-    def __init__(self, status, brief, detail, encoding=DEFAULT_ENCODING, log=True):
+    def __init__(self, status, brief, detail, encoding=DEFAULT_ENCODING, log=True, is_logged=None):
         """
         Note that the signature of this function and the names of the variables have been
         kept identical to the original version of this class.
@@ -98,6 +104,8 @@ class XmlErrorPage(resource.ErrorPage):
         :param detail: Error Description
         :param encoding: Encoding to use when sending response
         :param log: log the error to twisted logging mechanism.
+        :param is_logged: (optional) overrides ``log``, the name ``JsonErrorPage`` and
+                          ``RestResource`` use.
         """
         # arguments are left identical to ErrorPage
         resource.Resource.__init__(self)
@@ -106,17 +114,25 @@ class XmlErrorPage(resource.ErrorPage):
         self.brief = brief
         self.detail = detail
         self.encoding = encoding
-        self.log = log
+        self.log = log if is_logged is None else is_logged
 
-    def render(self, request):
+    @classmethod
+    def _template(cls):
         """
-        Format the exception and return a dictionary.
+        Return the parsed ``XML_TEMPLATE`` of this class, it's only parsed once.
         """
+        template = cls.__dict__.get('_parsed_template')
+        if template is None:
+            template = cls._parsed_template = etree.fromstring(cls.XML_TEMPLATE)
+        return template
 
-        detail = self.detail
-        if not request.site.displayTracebacks:
-            detail = None
+    def render(self, request):
+        """
+        Format the exception and return a dictionary.
 
+        Pages that don't show their detail only depend on the code and the
+        brief, their body is serialized once and reused.
+        """
         if self.log:
             # ensure strings get represented in the logs even with nonsense in them
             # (un-encodable strings get saved still)
@@ -129,17 +145,27 @@ class XmlErrorPage(resource.ErrorPage):
                 logLevel=logging.WARNING
             )
 
-        response = etree.fromstring(self.XML_TEMPLATE)
-        response.xpath('//code')[0].text = str(self.code)
-        response.xpath('//brief')[0].text = self.brief
-        response.xpath('//detail')[0].text = detail
-
         request.setResponseCode(self.code)
         request.setHeader(b'accept', ACCEPT_HEADER)
         request.setHeader(b'content-type', CONTENT_TYPE_HEADER % self.encoding)
+
+        if display_tracebacks(request):
+            return self._body(self.detail)
+        key = (self.__class__, self.code, self.brief, self.encoding)
+        body = _error_bodies.get(key)
+        if body is None:
+            body = self._body(None)
+            if len(_error_bodies) < MAX_ERROR_BODIES:
+                _error_bodies[key] = body
+        return body
+
+    def _body(self, detail):
+        response = deepcopy(self._template())
+        response.find('code').text = str(self.code)
+        response.find('brief').text = self.brief
+        response.find('detail').text = detail
         # serialize xml object to string for output.
-        rstr = etree.tostring(response, pretty_print=True)
-        return rstr
+        return etree.tostring(response)
 
     def __str__(self):
         return "%s: [%s] %s - %s" % (self.__class__.__name__, self.code, self.brief, self.detail)
@@ -168,13 +194,38 @@ class XmlResource(RestResource):
         :param encoding: a string that describes the desired encoding``
         """
         # a very quick test to deny malformed bodies.
-        start = body.lstrip()[:5]
-        if not start.startswith('<?xml'):
+        if XML_START.match(body) is None:
             raise ValueError('Invalid XML post body does not start with != <?xml... \nGot: %s ...' % body[:60])
 
         # parse the post body into an ElementTree object.
         body_data = etree.fromstring(body)
 
+        return body_data
+
+    def _parse_body(self, request, content, encoding):
+        """
+        Parse a POST body straight from the file-like ``request.content``
+
+        The body is fed to the xml parser in chunks of ``BODY_CHUNK_SIZE``
+        so no full copy of the body is ever held in memory.
+
+        :param request: ``twisted.web.server.Request`` instance
+        :param content: a file-like object positioned at the start of the body
+        :param encoding: a string that describes the desired encoding``
+        """
+        # a very quick test to deny malformed bodies.
+        if sniff_body(content, 5) != b'<?xml':
+            raise ValueError(
+                'Invalid XML post body does not start with != <?xml... \nGot: %s ...' % sniff_body(content, 60))
+
+        parser = etree.XMLParser()
+        while True:
+            chunk = content.read(BODY_CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+        return parser.close()
+
     def _format_response(self, request, response, encoding):
         """
         When a type in HANDLE_TYPES is returned, the super-class (RestResource)